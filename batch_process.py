@@ -0,0 +1,188 @@
+import os
+import json
+import cv2
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTENSIONS = (".jpg",".jpeg",".png",".bmp")
+
+## detectors of worker process , built once by initializer (one mediapipe graph per worker)
+_worker = {}
+
+
+def _init_worker(static_image_mode,max_num_faces,with_face,with_hands):
+    from hand_landmark_detection import HandDetector
+    from face_landmark_detection import FaceAnalyzer
+    _worker["hands"] = HandDetector(static_image_mode=static_image_mode,min_detection_confidence=0.7,min_tracking_confidence=0.7) if with_hands else None
+    _worker["face"] = FaceAnalyzer(max_num_faces=max_num_faces) if with_face else None
+
+
+def make_chunks(inputs,chunk_size):
+    """ split video files (by frame range) and image directories (by file list range) into work chunks
+        return list of dict(source , kind , start , end , files)
+        video with unknown frame count (streams , some containers) is one chunk read to its end (end None)
+    """
+    chunks = []
+    for path in inputs:
+        if(os.path.isdir(path)):
+            files = sorted(os.path.join(path,name) for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+            for start in range(0,len(files),chunk_size):
+                chunks.append({"source":path,"kind":"images","start":start,"end":min(start+chunk_size,len(files)),
+                               "files":files[start:start+chunk_size]})
+        else:
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            if(total<=0):
+                chunks.append({"source":path,"kind":"video","start":0,"end":None,"files":None})
+                continue
+            for start in range(0,total,chunk_size):
+                chunks.append({"source":path,"kind":"video","start":start,"end":start+chunk_size,"files":None})
+    return chunks
+
+
+def _read_frames(chunk):
+    """ yield (frame_index , frame) of chunk """
+    if(chunk["kind"]=="images"):
+        for i,path in enumerate(chunk["files"]):
+            frame = cv2.imread(path)
+            if(frame is not None):
+                yield chunk["start"]+i,frame
+    else:
+        cap = cv2.VideoCapture(chunk["source"])
+        cap.set(cv2.CAP_PROP_POS_FRAMES,chunk["start"])
+        index = chunk["start"]
+        while chunk["end"] is None or index<chunk["end"]:
+            ret,frame = cap.read()
+            if(not ret):
+                break
+            yield index,frame
+            index+=1
+        cap.release()
+
+
+def _analyze_frame(frame,with_landmarks,annotate):
+    """ run hand and face analysis on one frame , return result dict """
+    hand_detector = _worker["hands"]
+    face_analyzer = _worker["face"]
+    result = {}
+    if(hand_detector is not None):
+        points = hand_detector.find_hands(frame)
+        num_fingers,fingers_up_flag = hand_detector.count_fingers(points)
+        result["hands"] = {"count":points.count,"fingers":num_fingers,"fingers_up":fingers_up_flag,
+                           "gestures":hand_detector.features(points).gestures}
+        if(with_landmarks):
+            result["hands"]["landmarks"] = points.xy.tolist()
+        if(annotate):
+            hand_detector.draw_fingers(frame,points)
+    if(face_analyzer is not None):
+        previous_blinks = {face_id:state.blink_count for face_id,state in face_analyzer.face_states.items()}
+        face_analyzer.get_face_points(frame)
+        faces = []
+        for state,xy in zip(face_analyzer.analyze(),face_analyzer.face_points.xy):
+            face = {"id":state.face_id,"blink":state.blink_count>previous_blinks.get(state.face_id,0),
+                    "blink_count":state.blink_count,"emotion":state.emotion,"mouth_open":state.mouth_open,
+                    "alignment":state.alignment,"align_angle":state.align_angle}
+            if(with_landmarks):
+                face["landmarks"] = xy.tolist()
+            faces.append(face)
+        result["faces"] = faces
+        if(annotate):
+            face_analyzer.process_frame(frame,detect=False)
+    return result
+
+
+def process_chunk(chunk,with_landmarks=True,annotate_dir=None):
+    """ Analyze all frames of one chunk in worker process
+
+        Face ids , blink counters and hand tracking are local to chunk (tracking restarts at chunk start ,
+        previous chunk of worker can be from other part of video or other file)
+        return list of per frame result dicts
+    """
+    if(_worker.get("face") is not None):
+        _worker["face"].reset()
+    if(_worker.get("hands") is not None):
+        _worker["hands"].reset()
+    writer = None
+    results = []
+    stem = os.path.splitext(os.path.basename(os.path.normpath(chunk["source"])))[0]
+    for index,frame in _read_frames(chunk):
+        result = _analyze_frame(frame,with_landmarks,annotate_dir is not None)
+        result["source"] = chunk["source"]
+        result["frame"] = index
+        results.append(result)
+        if(annotate_dir is not None):
+            if(chunk["kind"]=="images"):
+                out_dir = os.path.join(annotate_dir,stem)
+                os.makedirs(out_dir,exist_ok=True)
+                cv2.imwrite(os.path.join(out_dir,os.path.basename(chunk["files"][index-chunk["start"]])),frame)
+            else:
+                if(writer is None):
+                    h,w = frame.shape[:2]
+                    path = os.path.join(annotate_dir,f"{stem}_{chunk['start']:06d}.mp4")
+                    writer = cv2.VideoWriter(path,cv2.VideoWriter_fourcc(*"mp4v"),30,(w,h))
+                writer.write(frame)
+    if(writer is not None):
+        writer.release()
+    return results
+
+
+def _process_chunk_args(args):
+    return process_chunk(*args)
+
+
+def run_batch(inputs,output,workers=None,chunk_size=300,with_landmarks=True,annotate_dir=None,
+              static_image_mode=False,max_num_faces=1,with_face=True,with_hands=True):
+    """ Process video files / image directories headless over process pool
+        and write one json line per frame into output file
+
+        per frame results : hand count , finger count , flags and gestures , faces (id , blink , emotion , alignment)
+        landmarks are included when with_landmarks is True ,
+        blink_total is running sum of blink events of all faces of source
+
+        return summary dict (frames , chunks , elapsed , fps)
+    """
+    if(annotate_dir is not None):
+        os.makedirs(annotate_dir,exist_ok=True)
+    chunks = make_chunks(inputs,chunk_size)
+    blink_totals = {}
+    frames = 0
+    st = time()
+    with ProcessPoolExecutor(max_workers=workers,initializer=_init_worker,
+                             initargs=(static_image_mode,max_num_faces,with_face,with_hands)) as pool, open(output,"w") as f:
+        ## map keeps chunk order so output stays sorted by source and frame
+        for results in pool.map(_process_chunk_args,[(chunk,with_landmarks,annotate_dir) for chunk in chunks]):
+            for result in results:
+                if("faces" in result):
+                    total = blink_totals.get(result["source"],0)+sum(face["blink"] for face in result["faces"])
+                    blink_totals[result["source"]] = total
+                    result["blink_total"] = total
+                f.write(json.dumps(result)+"\n")
+                frames+=1
+    elapsed = time()-st
+    return {"frames":frames,"chunks":len(chunks),"elapsed":elapsed,"fps":frames/elapsed if elapsed>0 else 0.0}
+
+
+### driver code to process recorded footage headless
+### example : python batch_process.py input.mp4 frames_dir --output results.jsonl --workers 4
+
+if __name__=="__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run hand and face analysis of SmartVisionApp over video files / image directories")
+    parser.add_argument("inputs",nargs="+",help="video files or directories of frames")
+    parser.add_argument("--output",default="results.jsonl",help="json lines output file")
+    parser.add_argument("--workers",type=int,default=None,help="number of worker processes (default cpu count)")
+    parser.add_argument("--chunk-size",type=int,default=300,help="frames per work chunk")
+    parser.add_argument("--annotate-dir",default=None,help="write annotated video chunks / frames into this directory")
+    parser.add_argument("--no-landmarks",action="store_true",help="do not write landmark coordinates")
+    parser.add_argument("--static",action="store_true",help="treat every frame as independent image (no tracking)")
+    parser.add_argument("--max-faces",type=int,default=1)
+    parser.add_argument("--no-face",action="store_true")
+    parser.add_argument("--no-hands",action="store_true")
+    args = parser.parse_args()
+    summary = run_batch(args.inputs,args.output,workers=args.workers,chunk_size=args.chunk_size,
+                        with_landmarks=not args.no_landmarks,annotate_dir=args.annotate_dir,
+                        static_image_mode=args.static,max_num_faces=args.max_faces,
+                        with_face=not args.no_face,with_hands=not args.no_hands)
+    for name,value in summary.items():
+        print(f"{name} : {value}")
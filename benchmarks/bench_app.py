@@ -0,0 +1,36 @@
+""" SmartVisionApp.process of every operation mode and filter , stub detectors and synthetic frames
+    example : python -m pytest benchmarks/bench_app.py
+"""
+import pytest
+from smart_vision_app import SmartVisionApp
+from motion_gate import MotionGate
+from stubs import stub_registry, moving_hands
+
+MODES = ["home","face","hands","draw","filters","hsv","hls","cartoon","gray","histeq","blurry"]
+
+
+def make_app(mode,**kwargs):
+    ## drawing needs pinch gesture of realistic hand so strokes are added while benchmark runs
+    hands = moving_hands(pinch=True,palm=90) if mode=="draw" else moving_hands()
+    app = SmartVisionApp(model_registry=stub_registry(hands),**kwargs)
+    app.set_mode(mode)
+    return app
+
+
+@pytest.mark.parametrize("mode",MODES)
+def test_process(measure,frame,mode):
+    app = make_app(mode)
+    measure(app.process,setup=lambda: (frame.copy(),),rounds=200)
+
+
+@pytest.mark.parametrize("mode",["hands","face"])
+def test_process_infer_every_2(measure,frame,mode):
+    app = make_app(mode,infer_every=2)
+    measure(app.process,setup=lambda: (frame.copy(),),rounds=200)
+
+
+@pytest.mark.parametrize("mode",["hands","face"])
+def test_process_static_scene(measure,frame,mode):
+    ## same frame every round , motion gate skips inference after background is learned
+    app = make_app(mode,motion_gate=MotionGate())
+    measure(app.process,setup=lambda: (frame.copy(),),rounds=200)
@@ -0,0 +1,17 @@
+""" every FilterApplyer filter and cartoon quality tier alone
+    example : python -m pytest benchmarks/bench_filters.py
+"""
+import pytest
+from filters import FilterApplyer, CARTOON_TIERS
+
+
+@pytest.mark.parametrize("filter_name",sorted(FilterApplyer.FILTERS))
+def test_apply_filter(measure,frame,filter_name):
+    applyer = FilterApplyer()
+    measure(applyer.apply_filter,frame,filter_name,True)
+
+
+@pytest.mark.parametrize("quality",list(CARTOON_TIERS))
+def test_cartoon_tier(measure,frame,quality):
+    applyer = FilterApplyer(cartoon_quality=quality)
+    measure(applyer.apply_filter,frame,"cartoon",True)
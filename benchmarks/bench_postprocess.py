@@ -0,0 +1,95 @@
+""" landmark post processing and drawing overlays alone (stub landmarks , no inference)
+    example : python -m pytest benchmarks/bench_postprocess.py
+"""
+import numpy as np
+import pytest
+from landmarks import LandmarkSet
+from landmark_filter import LandmarkSmoother
+from hand_features import HandFeatures, FingerStateClassifier
+from face_geometry import FaceGeometry
+from hand_landmark_detection import HandDetector
+from face_landmark_detection import FaceAnalyzer
+from virtual_drawingpad import VirtualDrawBoard
+from ui_overlay import OverlayCompositor
+from stubs import StubLandmarkSource, HAND_CONNECTIONS, synthetic_hand, synthetic_face, moving_hands
+
+
+@pytest.fixture
+def hands():
+    return LandmarkSet(np.stack([synthetic_hand(150,150),synthetic_hand(400,200)]))
+
+
+@pytest.fixture(params=[1,3],ids=["1face","3faces"])
+def face_analyzer(request,frame):
+    faces = np.stack([synthetic_face(120+200*i,240,seed=i) for i in range(request.param)])
+    analyzer = FaceAnalyzer(max_num_faces=request.param,landmark_source=StubLandmarkSource([faces],jitter=0))
+    analyzer.get_face_points(frame)
+    return analyzer
+
+
+def test_count_fingers(measure,hands):
+    ## new LandmarkSet every round , features are cached per LandmarkSet
+    detector = HandDetector(landmark_source=StubLandmarkSource([hands.xy],HAND_CONNECTIONS))
+    measure(detector.count_fingers,setup=lambda: (LandmarkSet(hands.xy.copy()),),rounds=300)
+
+
+def test_hand_features(measure,hands):
+    classifier = FingerStateClassifier()
+    measure(lambda xy: classifier.classify(HandFeatures(xy)),hands.xy)
+
+
+def test_draw_fingers(measure,frame,hands):
+    detector = HandDetector(landmark_source=StubLandmarkSource([hands.xy],HAND_CONNECTIONS))
+    measure(detector.draw_fingers,setup=lambda: (frame.copy(),hands),rounds=300)
+
+
+def test_face_geometry(measure,face_analyzer):
+    measure(FaceGeometry().measure,face_analyzer.face_points.xy)
+
+
+def test_face_analyze(measure,face_analyzer):
+    def analyze():
+        ## drop cached measurements so every round measures again
+        face_analyzer.face_points = LandmarkSet(face_analyzer.face_points.xy)
+        return face_analyzer.analyze()
+    measure(analyze)
+
+
+def test_face_process_frame(measure,frame,face_analyzer):
+    measure(face_analyzer.process_frame,setup=lambda: (frame.copy(),False,None,False),rounds=300)
+
+
+def test_draw_board(measure,frame):
+    board = VirtualDrawBoard()
+    points = [LandmarkSet(xy) for xy in moving_hands(pinch=True,palm=90)]
+    counter = [0]
+    def setup():
+        counter[0]+=1
+        return frame.copy(),points[counter[0]%len(points)]
+    measure(board.draw,setup=setup,rounds=300)
+
+
+def test_controller(measure,frame):
+    from smart_vision_app import SmartVisionApp
+    from stubs import stub_registry
+    ## home mode with hand hovering over options , measures controller + option overlay
+    app = SmartVisionApp(model_registry=stub_registry([synthetic_hand(585,60)[None]]))
+    measure(app.process,setup=lambda: (frame.copy(),),rounds=300)
+
+
+def test_overlay_blend(measure,frame):
+    overlay = OverlayCompositor()
+    render = lambda layer: [layer.rectangle([550,20+80*i],[620,90+80*i],(0,0,0),-1) for i in range(5)]
+    measure(overlay.apply,setup=lambda: (frame.copy(),"options",render),rounds=300)
+
+
+@pytest.mark.parametrize("num_points",[21*2,468])
+def test_landmark_smoother(measure,num_points):
+    smoother = LandmarkSmoother()
+    rng = np.random.default_rng(0)
+    frames = [LandmarkSet(rng.integers(0,480,(1,num_points,2),dtype=np.int32)) for _ in range(50)]
+    counter = [0]
+    def update():
+        counter[0]+=1
+        return smoother.update(frames[counter[0]%50],t=counter[0]/30)
+    measure(update)
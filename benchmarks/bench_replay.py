@@ -0,0 +1,48 @@
+""" SmartVisionApp driven by LandmarkReplay , replay has to be deterministic
+    example : python -m pytest benchmarks/bench_replay.py
+"""
+import numpy as np
+import pytest
+from smart_vision_app import SmartVisionApp
+from landmark_recording import LandmarkRecorder, LandmarkRecording, LandmarkReplay
+from landmarks import LandmarkSet
+from stubs import HAND_CONNECTIONS, moving_hands, synthetic_face
+
+
+@pytest.fixture(scope="module")
+def recording(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("replay")/"session.svlr")
+    rng = np.random.default_rng(0)
+    face = synthetic_face(400,240)[None]
+    with LandmarkRecorder(path,640,480,{"hand_connections":[list(c) for c in HAND_CONNECTIONS]}) as recorder:
+        for i,hands in enumerate(moving_hands(90)):
+            ## detector jitter , 30 fps capture timestamps
+            jitter = rng.integers(-3,4,hands.shape)
+            recorder.write(LandmarkSet((hands+jitter).astype(np.int32)),LandmarkSet(face+rng.integers(-2,3,face.shape)),i/30)
+    return LandmarkRecording(path)
+
+
+def replay_landmarks(recording,mode):
+    """ replay recording once through new app , return hand and face landmarks of every frame """
+    replay = LandmarkReplay(recording)
+    app = SmartVisionApp(model_registry=replay.model_registry())
+    app.set_mode(mode)
+    hands,faces = [],[]
+    for frame in replay.frames():
+        app.process(frame,timestamp=replay.timestamp)
+        hands.append(app.hand_features.xy.copy())
+        if(mode=="face"):
+            faces.append(app.models.get("face").face_points.xy.copy())
+    return hands,faces
+
+
+@pytest.mark.parametrize("mode",["draw","face"])
+def test_replay_deterministic(recording,mode):
+    first = replay_landmarks(recording,mode)
+    second = replay_landmarks(recording,mode)
+    for a,b in zip(first[0]+first[1],second[0]+second[1]):
+        np.testing.assert_array_equal(a,b)
+
+
+def test_replay(measure,recording):
+    measure(replay_landmarks,recording,"hands")
@@ -0,0 +1,64 @@
+import os
+import sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from time import perf_counter
+from filters import FilterApplyer, CARTOON_TIERS
+
+
+def ssim(image_a,image_b):
+    """ mean structural similarity of two BGR images (computed on gray , gaussian window 11 sigma 1.5) """
+    a = cv2.cvtColor(image_a,cv2.COLOR_BGR2GRAY).astype(np.float64)
+    b = cv2.cvtColor(image_b,cv2.COLOR_BGR2GRAY).astype(np.float64)
+    c1 = (0.01*255)**2
+    c2 = (0.03*255)**2
+    blur = lambda x: cv2.GaussianBlur(x,(11,11),1.5)
+    mu_a = blur(a)
+    mu_b = blur(b)
+    var_a = blur(a*a)-mu_a**2
+    var_b = blur(b*b)-mu_b**2
+    cov = blur(a*b)-mu_a*mu_b
+    ssim_map = ((2*mu_a*mu_b+c1)*(2*cov+c2))/((mu_a**2+mu_b**2+c1)*(var_a+var_b+c2))
+    return float(ssim_map.mean())
+
+
+def natural_frame(width=640,height=480,seed=1):
+    """ synthetic frame with smooth gradients , hard edged shapes and sensor like noise """
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(0,255,(12,16,3),dtype=np.uint8),(width,height),interpolation=cv2.INTER_CUBIC)
+    for _ in range(15):
+        center = tuple(int(v) for v in rng.integers(0,min(width,height),2))
+        color = tuple(int(v) for v in rng.integers(0,255,3))
+        cv2.circle(frame,center,int(rng.integers(10,80)),color,-1)
+    return cv2.add(frame,rng.integers(0,20,frame.shape,dtype=np.uint8))
+
+
+def time_filter(fn,image,repeat=10):
+    fn(image)
+    st = perf_counter()
+    for _ in range(repeat):
+        fn(image)
+    return (perf_counter()-st)/repeat
+
+
+### driver code : time and similarity (PSNR / SSIM vs current full quality output) of cartoon tiers
+### candidate tiers can be added below to evaluate new settings
+### example : python benchmarks/cartoon_bench.py
+
+if __name__=="__main__":
+    CARTOON_TIERS.setdefault("candidate_2pass_half",{"scale":0.5,"median":5,"d":5,"passes":2})
+    CARTOON_TIERS.setdefault("candidate_quarter",{"scale":0.25,"median":5,"d":5,"passes":1})
+    CARTOON_TIERS.setdefault("candidate_full_2pass",{"scale":1.0,"median":9,"d":5,"passes":2})
+    image = natural_frame()
+    reference = FilterApplyer().make_cartoon(image)
+    reference_time = time_filter(FilterApplyer().make_cartoon,image)
+    print(f"{'tier':<24}{'ms':>8}{'speedup':>9}{'PSNR dB':>9}{'SSIM':>8}")
+    for tier in CARTOON_TIERS:
+        applyer = FilterApplyer(cartoon_quality=tier)
+        fn = lambda im: applyer.apply_filter(im,"cartoon")[0]
+        output = fn(image)
+        elapsed = time_filter(fn,image)
+        psnr = cv2.PSNR(reference,output)
+        print(f"{tier:<24}{elapsed*1e3:>8.1f}{reference_time/elapsed:>8.1f}x{psnr:>9.1f}{ssim(reference,output):>8.3f}")
@@ -0,0 +1,40 @@
+import os
+import sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+import tracemalloc
+from stubs import synthetic_frame
+
+
+@pytest.fixture(scope="session")
+def frame():
+    return synthetic_frame()
+
+
+@pytest.fixture
+def measure(benchmark):
+    """ benchmark fn(*args) and store throughput , p95/p99 latency and peak traced memory in extra_info
+
+        peak_memory is measured by tracemalloc over one extra call (python + numpy allocations)
+        setup :- optional function returning args tuple , called before every round (not timed)
+    """
+    def run(fn,*args,setup=None,rounds=100):
+        if(setup is None):
+            result = benchmark(fn,*args)
+        else:
+            result = benchmark.pedantic(fn,setup=lambda: (setup(),{}),rounds=rounds,warmup_rounds=5)
+        call_args = args if setup is None else setup()
+        tracemalloc.start()
+        try:
+            fn(*call_args)
+            benchmark.extra_info["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        if(benchmark.stats is not None):
+            data = np.asarray(benchmark.stats.stats.data,dtype=np.float64)
+            p50,p95,p99 = np.percentile(data,[50,95,99])
+            benchmark.extra_info.update({"fps":1.0/max(float(data.mean()),1e-12),"p50":float(p50),"p95":float(p95),"p99":float(p99)})
+        return result
+    return run
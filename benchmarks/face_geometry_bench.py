@@ -0,0 +1,51 @@
+import os
+import sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from timeit import repeat
+from face_geometry import FaceGeometry, FACE_PAIRS, FACE_POLYLINES, FACE_ALIGNMENT_POINTS
+
+
+def legacy_measure(points):
+    """ previous per-call path of FaceAnalyzer : separate scipy euclidean call per pair / lip segment """
+    from scipy.spatial.distance import euclidean
+    result = {}
+    for name,(i1,i2) in FACE_PAIRS.items():
+        result[name] = euclidean(points[i1],points[i2])
+    for name,line in FACE_POLYLINES.items():
+        total = 0
+        for i in range(len(line)-1):
+            total+=euclidean(points[line[i]],points[line[i+1]])
+        result[name+"_mean"] = total/(len(line)-1)
+    left = np.array(points[FACE_ALIGNMENT_POINTS[0]])
+    right = np.array(points[FACE_ALIGNMENT_POINTS[1]])
+    v0 = np.array([right[0],left[1]])-left
+    v1 = right-left
+    result["align_angle"] = np.degrees(np.arctan2(np.linalg.det([v0,v1]),np.dot(v0,v1)))
+    return result
+
+
+def random_faces(n_faces,seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(100,400,size=(n_faces,468,2)).astype(np.int32)
+
+
+### driver code : compare batched FaceGeometry against per-call scipy path
+### example : python benchmarks/face_geometry_bench.py
+
+if __name__=="__main__":
+    geometry = FaceGeometry()
+    for n_faces in (1,2,4):
+        xy = random_faces(n_faces)
+        face_lists = [face.tolist() for face in xy]
+        batched = geometry.measure(xy)
+        for f,points in enumerate(face_lists):
+            legacy = legacy_measure(points)
+            for name,value in legacy.items():
+                assert abs(batched[name][f]-value) < 1e-3 , (name,batched[name][f],value)
+
+        number = 200
+        legacy_time = min(repeat(lambda: [legacy_measure(p) for p in face_lists],number=number,repeat=5))/number
+        batched_time = min(repeat(lambda: geometry.measure(xy),number=number,repeat=5))/number
+        print(f"faces : {n_faces}  per-call : {legacy_time*1e6:8.1f} us  batched : {batched_time*1e6:8.1f} us  speedup : {legacy_time/batched_time:5.1f}x")
@@ -0,0 +1,71 @@
+import os
+import sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+import tracemalloc
+from time import perf_counter
+from filters import FilterApplyer
+
+
+def legacy_filter(image,filter_name):
+    """ previous FilterApplyer.apply_filter path : eval dispatch , new arrays every call ,
+        gray converted back to BGR by caller
+    """
+    if(filter_name in ["gray","hsv","hls"]):
+        image = cv2.cvtColor(image,eval(f"cv2.COLOR_BGR2{filter_name.upper()}"))
+        if(filter_name=="gray"):
+            image = cv2.cvtColor(image,cv2.COLOR_GRAY2BGR)
+        return image
+    elif(filter_name=="cartoon"):
+        return FilterApplyer().make_cartoon(image)
+    elif(filter_name=="blurry"):
+        return cv2.medianBlur(image,7)
+    elif(filter_name=="histeq"):
+        image = cv2.equalizeHist(cv2.cvtColor(image,cv2.COLOR_BGR2GRAY))
+        return cv2.cvtColor(image,cv2.COLOR_GRAY2BGR)
+
+
+def synthetic_frame(width=640,height=480,seed=0):
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(0,255,(height//8,width//8,3),dtype=np.uint8),(width,height))
+    cv2.circle(frame,(width//2,height//2),80,(40,180,220),-1)
+    return frame
+
+
+def measure(fn,image,repeat=30):
+    """ return (mean seconds per frame , peak bytes allocated by one call) """
+    fn(image)
+    st = perf_counter()
+    for _ in range(repeat):
+        fn(image)
+    elapsed = (perf_counter()-st)/repeat
+    tracemalloc.start()
+    before,_ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn(image)
+    _,peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed,peak-before
+
+
+### driver code : time and allocations per frame of every filter , legacy path vs compiled graph
+### example : python benchmarks/filters_bench.py
+
+if __name__=="__main__":
+    image = synthetic_frame()
+    applyer = FilterApplyer()
+    applyer.register_filter("gray_histeq_blur",["gray","histeq","blurry"])
+    print(f"{'filter':<18}{'legacy ms':>10}{'legacy alloc':>14}{'graph ms':>10}{'graph alloc':>13}")
+    for name in ["gray","hsv","hls","cartoon","blurry","histeq","gray_histeq_blur"]:
+        if(name=="gray_histeq_blur"):
+            legacy = lambda im: cv2.medianBlur(legacy_filter(im,"histeq"),7)
+        else:
+            legacy = lambda im,name=name: legacy_filter(im,name)
+        compiled = lambda im,name=name: applyer.apply_filter(im,name,as_bgr=True)[0]
+        expected = legacy(image)
+        assert np.array_equal(expected,compiled(image)) , name
+        legacy_time,legacy_alloc = measure(legacy,image)
+        graph_time,graph_alloc = measure(compiled,image)
+        print(f"{name:<18}{legacy_time*1e3:>10.2f}{legacy_alloc/1024:>11.0f} KB{graph_time*1e3:>10.2f}{graph_alloc/1024:>10.0f} KB")
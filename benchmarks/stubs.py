@@ -0,0 +1,111 @@
+""" synthetic frames and stub landmark sources used by benchmark suite (no camera , no mediapipe) """
+import cv2
+import numpy as np
+from landmarks import LandmarkSet
+from landmark_recording import HAND_POINTS, FACE_POINTS
+from model_registry import ModelRegistry
+
+## mediapipe hand skeleton , stub detectors don't import mediapipe
+HAND_CONNECTIONS = [(0,1),(1,2),(2,3),(3,4),(0,5),(5,6),(6,7),(7,8),(5,9),(9,10),(10,11),(11,12),
+                    (9,13),(13,14),(14,15),(15,16),(13,17),(0,17),(17,18),(18,19),(19,20)]
+
+
+def synthetic_frame(width=640,height=480,seed=0):
+    """ noisy gradient frame with shapes , deterministic for given seed """
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(0,255,(12,16,3),dtype=np.uint8),(width,height),interpolation=cv2.INTER_CUBIC)
+    for _ in range(10):
+        center = tuple(int(v) for v in rng.integers(0,min(width,height),2))
+        cv2.circle(frame,center,int(rng.integers(10,60)),tuple(int(v) for v in rng.integers(0,255,3)),-1)
+    return cv2.add(frame,rng.integers(0,20,frame.shape,dtype=np.uint8))
+
+
+def synthetic_hand(x,y,spread=40,pinch=False):
+    """ (21,2) hand landmarks with wrist at (x,y+100) , index tip near (x,y)
+        pinch puts middle finger tip next to index tip (drawing gesture)
+    """
+    angles = np.linspace(-0.6,0.6,5)
+    hand = np.empty((HAND_POINTS,2),dtype=np.float64)
+    hand[0] = (x,y+100)
+    for finger,angle in enumerate(angles):
+        for joint in range(4):
+            length = 30+joint*(spread/2)
+            hand[1+finger*4+joint] = (x+np.sin(angle)*length,y+100-np.cos(angle)*length)
+    hand[8] = (x,y)
+    hand[12] = (x+10,y+5) if pinch else (x+spread,y-10)
+    return hand.astype(np.int32)
+
+
+def synthetic_face(x,y,size=160,seed=0):
+    """ (468,2) face landmarks spread over ellipse centered at (x,y) """
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(0,2*np.pi,FACE_POINTS)
+    radius = np.sqrt(rng.uniform(0,1,FACE_POINTS))
+    face = np.stack([x+np.cos(angle)*radius*size*0.4,y+np.sin(angle)*radius*size*0.5],axis=-1)
+    return face.astype(np.int32)
+
+
+class StubLandmarkSource:
+    """ landmark_source of HandDetector / FaceAnalyzer , returns scripted landmarks
+
+        frames :- list of (n,N,2) arrays , detect() returns next one (cycling) with small jitter
+    """
+    def __init__(self,frames,connections=(),jitter=2,seed=0):
+        self.frames = [np.asarray(frame,dtype=np.int32) for frame in frames]
+        self.connections = np.array(connections,dtype=np.intp).reshape(-1,2)
+        self.__rng = np.random.default_rng(seed)
+        self.__jitter = jitter
+        self.calls = 0
+
+    def detect(self,image,roi=None):
+        xy = self.frames[self.calls%len(self.frames)]
+        self.calls+=1
+        if(self.__jitter and len(xy)):
+            xy = xy+self.__rng.integers(-self.__jitter,self.__jitter+1,xy.shape,dtype=np.int32)
+        return LandmarkSet(xy.copy())
+
+    def close(self):
+        pass
+
+
+def realistic_hand(x,y,palm=90,pinch=False):
+    """ (21,2) hand landmarks with adult hand proportions , index tip at (x,y)
+        palm :- wrist to middle finger base distance in pixels (~90 px at arm length in 640x480 frame)
+        pinch puts middle finger tip against index tip (finger width apart) , otherwise index and
+        middle finger are spread in V
+    """
+    L = float(palm)
+    wrist = np.array([x+0.38*L,y+1.65*L])
+    ## finger base offsets from wrist and base -> tip vectors , in palm lengths
+    bases = np.array([[-0.38,-0.9],[-0.12,-1.0],[0.13,-0.95],[0.38,-0.85]])*L
+    tips = np.array([[0.0,-0.75],[0.0,-0.85],[0.05,-0.8],[0.1,-0.6]])*L
+    index_tip = wrist+bases[0]+tips[0]
+    tips[1] = index_tip+[(0.2 if pinch else 0.6)*L,0.0]-wrist-bases[1]
+    hand = np.empty((HAND_POINTS,2),dtype=np.float64)
+    hand[0] = wrist
+    hand[1:5] = wrist+np.array([[-0.25,-0.25],[-0.45,-0.45],[-0.6,-0.6],[-0.72,-0.75]])*L
+    for finger in range(4):
+        for joint,fraction in enumerate((0.0,0.45,0.75,1.0)):
+            hand[5+finger*4+joint] = wrist+bases[finger]+tips[finger]*fraction
+    return np.rint(hand).astype(np.int32)
+
+
+def moving_hands(num_frames=60,pinch=False,palm=None):
+    """ one hand moving along a line inside drawing area
+        palm :- use realistic_hand of this palm size (None uses synthetic_hand)
+    """
+    if(palm is not None):
+        return [realistic_hand(60+3*i,120+i,palm=palm,pinch=pinch)[None] for i in range(num_frames)]
+    return [synthetic_hand(60+3*i,120+i,pinch=pinch)[None] for i in range(num_frames)]
+
+
+def stub_registry(hand_frames=None,face_frames=None,max_num_faces=1):
+    """ ModelRegistry with stub "hands" and "face" models (no mediapipe) """
+    from hand_landmark_detection import HandDetector
+    from face_landmark_detection import FaceAnalyzer
+    hand_frames = moving_hands() if hand_frames is None else hand_frames
+    face_frames = [synthetic_face(400,240)[None]] if face_frames is None else face_frames
+    registry = ModelRegistry(idle_timeout=None)
+    registry.register("hands",lambda: HandDetector(landmark_source=StubLandmarkSource(hand_frames,HAND_CONNECTIONS)),releasable=False)
+    registry.register("face",lambda: FaceAnalyzer(max_num_faces=max_num_faces,landmark_source=StubLandmarkSource(face_frames,seed=1)),releasable=False)
+    return registry
@@ -0,0 +1,14 @@
+import os
+import sys
+## application modules and benchmark stubs (stubs.py) are imported by tests
+BENCHMARKS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,BENCHMARKS)
+sys.path.insert(0,os.path.dirname(BENCHMARKS))
+
+import pytest
+from stubs import synthetic_frame
+
+
+@pytest.fixture(scope="session")
+def frame():
+    return synthetic_frame()
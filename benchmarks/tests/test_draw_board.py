@@ -0,0 +1,20 @@
+""" VirtualDrawBoard pinch threshold on realistic hands
+    example : python -m pytest benchmarks/tests/test_draw_board.py
+"""
+import pytest
+from landmarks import LandmarkSet
+from hand_features import HandFeatures, FingerStateClassifier
+from virtual_drawingpad import VirtualDrawBoard
+from stubs import moving_hands, realistic_hand
+
+
+@pytest.mark.parametrize("palm",[40,90,200])
+@pytest.mark.parametrize("pinch",[True,False])
+def test_pinch_threshold(frame,palm,pinch):
+    ## default pinch threshold (palm sizes) on realistic hand near or far from camera :
+    ## index and middle tips together draw , V spread does not
+    board = VirtualDrawBoard()
+    for xy in moving_hands(10,pinch=pinch,palm=palm):
+        board.draw(frame.copy(),LandmarkSet(xy))
+    assert len(board.export_strokes())==int(pinch)
+    assert FingerStateClassifier().classify(HandFeatures(realistic_hand(300,150,palm=palm,pinch=pinch))).fingers_up.all()
@@ -0,0 +1,74 @@
+""" SharedFrameRing and MultiProcessVisionApp with stub worker models (no mediapipe)
+    example : python -m pytest benchmarks/tests/test_frame_ring.py
+"""
+import numpy as np
+import pytest
+from shared_frame_ring import SharedFrameRing, MultiProcessVisionApp
+from stubs import StubLandmarkSource, HAND_CONNECTIONS, synthetic_frame, synthetic_hand, synthetic_face
+
+## worker factories are module level functions , they are sent to worker processes
+
+def hands_in_draw_area():
+    from hand_landmark_detection import HandDetector
+    return HandDetector(landmark_source=StubLandmarkSource([synthetic_hand(150,150)[None]],HAND_CONNECTIONS,jitter=0))
+
+
+def hands_on_face_option():
+    ## index and middle finger tips inside "face" option , gesture selects face mode
+    from hand_landmark_detection import HandDetector
+    return HandDetector(landmark_source=StubLandmarkSource([synthetic_hand(570,120,pinch=True)[None]],HAND_CONNECTIONS,jitter=0))
+
+
+def stub_face():
+    from face_landmark_detection import FaceAnalyzer
+    return FaceAnalyzer(landmark_source=StubLandmarkSource([synthetic_face(400,240)[None]],jitter=0))
+
+
+def test_ring_roundtrip():
+    ring = SharedFrameRing((48,64,3),slots=2)
+    other = SharedFrameRing(*ring.spec)
+    try:
+        frame = synthetic_frame(64,48)
+        ring.write(1,7,frame)
+        ## attached ring sees same memory , no copy
+        np.testing.assert_array_equal(other.view(1),frame)
+        assert other.seq(1)==7 and other.seq(0)==-1
+        other.view(0)[:] = 5
+        assert (ring.view(0)==5).all()
+    finally:
+        other.close()
+        ring.close()
+
+
+@pytest.mark.parametrize("mode",["home","hsv"])
+def test_process(mode):
+    frame = synthetic_frame()
+    with MultiProcessVisionApp(frame.shape,slots=2,factories={"hands":hands_in_draw_area,"face":stub_face}) as vision:
+        vision.app.set_mode(mode)
+        image,filtered = vision.process(frame)
+    assert image.shape==frame.shape
+    np.testing.assert_array_equal(vision.app.hand_features.xy[0],synthetic_hand(150,150))
+    assert (filtered is not None)==(mode=="hsv")
+
+
+def test_mode_change_in_flight():
+    frame = synthetic_frame()
+    faces = []
+    slots = 4
+    with MultiProcessVisionApp(frame.shape,slots=slots,factories={"hands":hands_on_face_option,"face":stub_face}) as vision:
+        process = vision.app.process
+        def recorded(image,filtered_image=None):
+            process(image,filtered_image=filtered_image)
+            faces.append(vision.app.models.get("face").face_points.count if vision.app.mode=="face" else None)
+        vision.app.process = recorded
+        ## ring full of frames submitted in home mode , gesture switches to face mode after select_frames
+        ## frames (switching frame has no face analysis)
+        for _ in range(2):
+            for _ in range(slots):
+                assert vision.submit(frame) is not None
+            while vision.in_flight:
+                vision.collect(timeout=5.0)
+    assert vision.app.mode=="face"
+    ## frames in flight when mode changed got face analysis
+    select = vision.app.select_frames
+    assert faces==[None]*(select-1)+[0]+[1]*(2*slots-select)
@@ -0,0 +1,41 @@
+""" FingerStateClassifier keeps finger state hysteresis per tracked hand id
+    example : python -m pytest benchmarks/tests/test_hand_features.py
+"""
+import numpy as np
+from hand_features import HandFeatures, FingerStateClassifier
+from stubs import realistic_hand
+
+INDEX = 1
+
+
+def hand_with_index(x,extension):
+    """ realistic hand with index tip moved so its extension is given number of palm sizes """
+    hand = realistic_hand(x,150).astype(np.float64)
+    palm = HandFeatures(hand[None]).palm_size[0]
+    direction = (hand[7]-hand[5])/np.linalg.norm(hand[7]-hand[5])
+    hand[8] = hand[5]+direction*extension*palm
+    return np.rint(hand).astype(np.int32)
+
+
+def index_up(classifier,hands,ids):
+    return classifier.classify(HandFeatures(np.stack(hands)),ids).fingers_up[:,INDEX].tolist()
+
+
+def test_states_follow_hand_ids():
+    classifier = FingerStateClassifier()
+    ## hand 1 index up , hand 2 index down
+    assert index_up(classifier,[hand_with_index(150,0.9),hand_with_index(400,0.3)],[1,2])==[True,False]
+    ## both inside hysteresis band (states are kept) , detector swapped hand order
+    assert index_up(classifier,[hand_with_index(400,0.55),hand_with_index(150,0.55)],[2,1])==[False,True]
+    ## third hand appears , states of other hands are kept
+    assert index_up(classifier,[hand_with_index(150,0.55),hand_with_index(600,0.55),hand_with_index(400,0.55)],[1,3,2])==[True,False,False]
+    ## hand 2 leaves , hand 1 keeps its state
+    assert index_up(classifier,[hand_with_index(150,0.55)],[1])==[True]
+
+
+def test_states_by_position_without_ids():
+    classifier = FingerStateClassifier()
+    assert index_up(classifier,[hand_with_index(150,0.9)],None)==[True]
+    assert index_up(classifier,[hand_with_index(150,0.55)],None)==[True]
+    classifier.reset()
+    assert index_up(classifier,[hand_with_index(150,0.55)],None)==[False]
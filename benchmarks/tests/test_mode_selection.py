@@ -0,0 +1,27 @@
+""" option selection with finger tips needs select_frames consecutive frames on same option
+    example : python -m pytest benchmarks/tests/test_mode_selection.py
+"""
+from smart_vision_app import SmartVisionApp
+from stubs import stub_registry, synthetic_frame, synthetic_hand
+
+## index and middle finger tips on "face" option / inside drawing area
+ON_FACE = synthetic_hand(570,120,pinch=True)[None]
+AWAY = synthetic_hand(150,150)[None]
+
+
+def modes(hand_frames,num_frames):
+    app = SmartVisionApp(model_registry=stub_registry(hand_frames))
+    frame = synthetic_frame()
+    result = []
+    for _ in range(num_frames):
+        app.process(frame.copy())
+        result.append(app.mode)
+    return result
+
+
+def test_flicker_does_not_switch():
+    assert modes([ON_FACE,ON_FACE,AWAY],12)==["home"]*12
+
+
+def test_switch_after_select_frames():
+    assert modes([AWAY,ON_FACE,ON_FACE,ON_FACE],5)==["home"]*3+["face"]*2
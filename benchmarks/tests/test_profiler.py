@@ -0,0 +1,24 @@
+""" Profiler summaries and Prometheus export
+    example : python -m pytest benchmarks/tests/test_profiler.py
+"""
+from profiler import Profiler
+
+
+def prometheus_values(text):
+    return {line.split(" ")[0]:float(line.split(" ")[1]) for line in text.splitlines() if not line.startswith("#")}
+
+
+def test_prometheus_totals_are_monotonic():
+    profiler = Profiler(window=3)
+    labels = '{mode="home",span="filter"}'
+    previous = (0.0,0.0)
+    for duration in (5.0,5.0,5.0,1.0,1.0,1.0,1.0):
+        profiler.record("filter",duration)
+        values = prometheus_values(profiler.prometheus_text())
+        current = (values[f"smart_vision_span_seconds_count{labels}"],values[f"smart_vision_span_seconds_sum{labels}"])
+        assert current[0]>previous[0] and current[1]>previous[1]
+        previous = current
+    assert previous==(7,19.0)
+    ## quantiles and window count follow rolling window
+    summary = profiler.summary()["home"]["filter"]
+    assert summary["count"]==3 and summary["p99"]==1.0 and summary["total_count"]==7
@@ -0,0 +1,192 @@
+""" VisionServer with stub detectors on ephemeral port , local VisionClient sends synthetic frames
+    example : python -m pytest benchmarks/tests/test_server.py
+"""
+import asyncio
+import threading
+import numpy as np
+import pytest
+from vision_server import VisionServer, VisionClient, MicroBatcher
+from hand_landmark_detection import HandDetector
+from face_landmark_detection import FaceAnalyzer
+from stubs import StubLandmarkSource, HAND_CONNECTIONS, synthetic_frame, synthetic_hand, synthetic_face
+
+
+class GatedLandmarkSource(StubLandmarkSource):
+    """ stub source whose detect() blocks (on executor thread) until gate is set """
+    def __init__(self,frames,gate,connections=()):
+        super().__init__(frames,connections,jitter=0)
+        self.gate = gate
+
+    def detect(self,image,roi=None):
+        self.gate.wait(5)
+        return super().detect(image,roi)
+
+
+def stub_factories(gate=None):
+    hands = [synthetic_hand(200,150)[None]]
+    face = [synthetic_face(400,240)[None]]
+    if(gate is None):
+        hand_source = lambda: StubLandmarkSource(hands,HAND_CONNECTIONS,jitter=0)
+    else:
+        hand_source = lambda: GatedLandmarkSource(hands,gate,HAND_CONNECTIONS)
+    return {"hands":lambda: HandDetector(landmark_source=hand_source()),
+            "face":lambda: FaceAnalyzer(landmark_source=StubLandmarkSource(face,jitter=0))}
+
+
+def serve(test,**options):
+    """ run coroutine test(server , client) against server on ephemeral port """
+    async def main():
+        server = VisionServer(port=0,factories=options.pop("factories",None) or stub_factories(),**options)
+        await server.start()
+        client = await VisionClient.connect(port=server.port)
+        try:
+            return await test(server,client)
+        finally:
+            await client.close()
+            await server.stop()
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="module")
+def small_frame():
+    return synthetic_frame(320,240)
+
+
+def test_hands(small_frame):
+    async def test(server,client):
+        return await client.request("hands",small_frame,"raw")
+    result,payload = serve(test)
+    assert result["count"]==1 and payload==b""
+    assert len(result["fingers_up"])==5 and result["fingers"]==sum(result["fingers_up"])
+    np.testing.assert_array_equal(result["landmarks"],synthetic_hand(200,150)[None])
+
+
+def test_face(small_frame):
+    async def test(server,client):
+        return await client.request("face",small_frame,"raw")
+    result,_ = serve(test)
+    assert len(result["faces"])==1
+    face = result["faces"][0]
+    assert face["blink_count"]==0 and len(face["landmarks"])==468
+
+
+@pytest.mark.parametrize("frame_format",["raw","jpeg"])
+def test_filter(small_frame,frame_format):
+    async def test(server,client):
+        return await client.request("filter",small_frame,frame_format,filter="gray",reply_format="raw")
+    result,payload = serve(test)
+    assert result["filter"]=="gray" and result["shape"]==[240,320,3]
+    image = np.frombuffer(payload,dtype=np.uint8).reshape(result["shape"])
+    ## gray output , all channels equal
+    assert (image[...,0]==image[...,1]).all()
+
+
+def test_app(small_frame):
+    async def test(server,client):
+        draw,_ = await client.request("app",small_frame,"raw",mode="draw")
+        face,payload = await client.request("app",small_frame,"raw",mode="face",return_image=True,reply_format="raw")
+        home,_ = await client.request("app",small_frame,"raw")
+        return draw,face,payload,home
+    draw,face,payload,home = serve(test)
+    assert draw["mode"]=="draw" and "faces" not in draw
+    np.testing.assert_array_equal(draw["hands"],synthetic_hand(200,150)[None])
+    assert face["mode"]=="face" and len(face["faces"])==1
+    assert len(payload)==240*320*3
+    ## mode is kept by session of connection
+    assert home["mode"]=="face"
+
+
+def test_pipelined(small_frame):
+    async def test(server,client):
+        results = await asyncio.gather(*[client.request("hands",small_frame,"raw",landmarks=False) for _ in range(20)])
+        stats,_ = await client.request("stats")
+        return results,stats
+    results,stats = serve(test,max_pending=8,max_delay=0.02)
+    assert [result["count"] for result,_ in results]==[1]*20
+    assert stats["requests"]==21 and stats["batchers"]["hands"]["items"]==20
+    ## concurrent requests were batched
+    assert stats["batchers"]["hands"]["batches"]<20
+
+
+def test_backpressure(small_frame):
+    gate = threading.Event()
+    max_pending = 2
+    async def test(server,client):
+        requests = [asyncio.ensure_future(client.request("hands",small_frame,"raw")) for _ in range(10)]
+        await asyncio.sleep(0.3)
+        ## detector is blocked , server stops reading requests once max_pending are in flight
+        read = server.requests
+        gate.set()
+        results = await asyncio.gather(*requests)
+        return read,results
+    read,results = serve(test,max_pending=max_pending,factories=stub_factories(gate))
+    ## pending queue , request awaited by responder and request waiting to be queued
+    assert read<=max_pending+2
+    assert len(results)==10
+
+
+def test_errors(small_frame):
+    async def test(server,client):
+        errors = []
+        for op,params in [("nothing",{}),("app",{"mode":"unknown"})]:
+            with pytest.raises(RuntimeError) as error:
+                await client.request(op,small_frame,"raw",**params)
+            errors.append(str(error.value))
+        ## connection still serves requests after errors
+        result,_ = await client.request("hands",small_frame,"raw")
+        return errors,result
+    errors,result = serve(test)
+    assert "unknown op" in errors[0] and "unknown mode" in errors[1]
+    assert result["count"]==1
+
+
+def test_micro_batcher():
+    async def main():
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(1)
+        batcher = MicroBatcher(lambda instance,items: [instance*item for item in items],[10],executor,max_batch=4,max_delay=0.05)
+        batcher.start()
+        try:
+            return await asyncio.gather(*[batcher.submit(i) for i in range(8)]),batcher.stats()
+        finally:
+            await batcher.stop()
+            executor.shutdown()
+    results,stats = asyncio.run(main())
+    assert results==[10*i for i in range(8)]
+    assert stats["items"]==8 and stats["batches"]==2
+
+
+def test_app_gesture_mode(small_frame):
+    ## index and middle finger tips inside "face" option select face mode
+    factories = stub_factories()
+    factories["hands"] = lambda: HandDetector(landmark_source=StubLandmarkSource([synthetic_hand(285,65,pinch=True)[None]],HAND_CONNECTIONS,jitter=0))
+    async def test(server,client):
+        return await asyncio.gather(*[client.request("app",small_frame,"raw",landmarks=False) for _ in range(8)])
+    results = [result for result,_ in serve(test,factories=factories,max_pending=8)]
+    modes = [result["mode"] for result in results]
+    assert "face" in modes
+    switch = modes.index("face")
+    ## requests pipelined behind the switching request run face detection
+    assert all(len(result["faces"])==1 for result in results[switch+1:])
+    assert results[switch]["faces"]==[]
+
+
+@pytest.mark.parametrize("in_flight",[False,True])
+def test_stop_with_open_connections(small_frame,caplog,in_flight):
+    ## connections closing or waiting for responses while server stops are dropped without asyncio errors
+    gate = threading.Event()
+    async def test(server,client):
+        request = asyncio.ensure_future(client.request("hands",small_frame,"raw"))
+        await asyncio.sleep(0.1)
+        if(not in_flight):
+            gate.set()
+            await request
+            await client.close()
+        await server.stop()
+        gate.set()
+        if(in_flight):
+            with pytest.raises(ConnectionError):
+                await request
+    with caplog.at_level("ERROR",logger="asyncio"):
+        serve(test,factories=stub_factories(gate))
+    assert not caplog.records
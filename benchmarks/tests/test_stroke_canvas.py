@@ -0,0 +1,41 @@
+""" StrokeCanvas output matches full redraw of its strokes after add , undo and clear
+    example : python -m pytest benchmarks/tests/test_stroke_canvas.py
+"""
+import cv2
+import numpy as np
+from stroke_canvas import StrokeCanvas
+
+AREA = [[50,100],[600,420]]
+
+
+def redraw(strokes,thickness,shape=(480,640,3)):
+    image = np.zeros(shape,dtype=np.uint8)
+    for stroke in strokes:
+        cv2.polylines(image,[stroke.reshape(-1,1,2)],False,(255,255,0),thickness)
+    return image
+
+
+def test_matches_full_redraw():
+    rng = np.random.default_rng(0)
+    canvas = StrokeCanvas(AREA,thickness=3)
+    for _ in range(3):
+        for i in range(40):
+            canvas.add_point(rng.integers(AREA[0],AREA[1]),new_stroke=i%10==0)
+        np.testing.assert_array_equal(canvas.composite(np.zeros((480,640,3),np.uint8)),redraw(canvas.export(),3))
+        canvas.undo()
+        np.testing.assert_array_equal(canvas.composite(np.zeros((480,640,3),np.uint8)),redraw(canvas.export(),3))
+        canvas.clear()
+        assert not canvas.composite(np.zeros((480,640,3),np.uint8)).any()
+
+
+def test_generation_wraps_around():
+    canvas = StrokeCanvas(AREA)
+    for _ in range(np.iinfo(np.uint16).max-1):
+        canvas.clear()
+    ## stroke of last generation before wrap around must not show again
+    canvas.add_point((100,150))
+    canvas.add_point((200,150))
+    canvas.clear()
+    canvas.add_point((300,300))
+    canvas.add_point((310,300))
+    np.testing.assert_array_equal(canvas.composite(np.zeros((480,640,3),np.uint8)),redraw(canvas.export(),2))
@@ -0,0 +1,58 @@
+""" UI panels follow frame size (no fixed 640x480 pixel positions)
+    example : python -m pytest benchmarks/tests/test_ui_layout.py
+"""
+import numpy as np
+import pytest
+from ui_layout import UiLayout, LAYOUT
+from landmarks import LandmarkSet
+from virtual_drawingpad import VirtualDrawBoard
+from hand_landmark_detection import HandDetector
+from stubs import StubLandmarkSource, HAND_CONNECTIONS, synthetic_frame, synthetic_hand
+
+SIZES = [(240,320),(480,640),(720,1280)]
+
+
+@pytest.mark.parametrize("shape",SIZES)
+def test_rects_inside_frame(shape):
+    layout = UiLayout()
+    for name,item in LAYOUT.items():
+        rects = layout.rect(name,shape)
+        for (x1,y1),(x2,y2) in (rects.values() if isinstance(rects,dict) else [rects]):
+            assert 0<=x1<x2<=shape[1] and 0<=y1<y2<=shape[0],name
+
+
+@pytest.mark.parametrize("shape",SIZES)
+def test_panels_drawn_inside_frame(shape):
+    ## white status box and fingers panel are drawn at their scaled layout position
+    h,w = shape
+    frame = np.zeros((h,w,3),dtype=np.uint8)
+    board = VirtualDrawBoard()
+    hand = LandmarkSet((synthetic_hand(150,150)*[w/640,h/480]).astype(np.int32)[None])
+    board.draw(frame,hand)
+    (x1,y1),(x2,y2) = UiLayout().rect("draw_status",shape)
+    assert (frame[y1:y2,x1:x2]==255).all(axis=-1).mean()>0.5
+    ## status text is inside its box
+    assert ((frame[y1:y2,x1:x2]!=255).any(axis=-1)).any()
+    detector = HandDetector(landmark_source=StubLandmarkSource([hand.xy],HAND_CONNECTIONS))
+    frame = np.zeros((h,w,3),dtype=np.uint8)
+    detector.draw_fingers(frame,hand)
+    (x1,y1),(x2,y2) = UiLayout().rect("fingers_panel",shape)
+    assert (frame[y1:y2,x1:x2]==255).all(axis=-1).mean()>0.5
+
+
+def test_filter_and_face_panels_at_small_frame():
+    from smart_vision_app import SmartVisionApp
+    from stubs import stub_registry
+    app = SmartVisionApp(model_registry=stub_registry())
+    frame = synthetic_frame(320,240)
+    app.set_mode("gray")
+    app.process(frame.copy())
+    (x1,y1),(x2,y2) = UiLayout().rect("filter_label",(240,320))
+    label = app.filtered_image[y1:y2,x1:x2]
+    ## black label box with green text
+    assert (label[...,1]>200).any() and (label==0).all(axis=-1).mean()>0.5
+    app.set_mode("face")
+    image = app.process(frame.copy())
+    (x1,y1),(x2,y2) = UiLayout().rect("face_panel",(240,320))
+    panel = image[y1:y2,x1:x2]
+    assert (panel==255).all(axis=-1).mean()>0.5 and (panel==0).all(axis=-1).any()
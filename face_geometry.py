@@ -0,0 +1,72 @@
+import numpy as np
+
+## landmark pairs and polylines used by FaceAnalyzer features
+FACE_PAIRS = {"mouth":(12,15),"left_eye":(153,158),"right_eye":(374,386)}
+FACE_POLYLINES = {"lips_upper":[76,183,42,41,38,12,268,271,272,407,306],
+                  "lips_lower":[76,96,89,179,86,15,316,403,319,325,306]}
+FACE_ALIGNMENT_POINTS = (161,388)
+
+
+class FaceGeometry:
+    """ Compute all distances , contour lengths and angles needed by FaceAnalyzer
+        for all detected faces in one vectorized pass
+
+        Index arrays of every landmark pair and polyline are prepared once in constructor,
+        measure() then works on (n_faces,468,2) landmark array
+    """
+    def __init__(self,pairs=FACE_PAIRS,polylines=FACE_POLYLINES,alignment_points=FACE_ALIGNMENT_POINTS):
+        self.__pair_names = list(pairs.keys())
+        pair_index = np.array(list(pairs.values()),dtype=np.intp).reshape(-1,2)
+        self.__pair_a = pair_index[:,0]
+        self.__pair_b = pair_index[:,1]
+
+        ## all polyline segments are concatenated so one distance call covers every contour
+        self.__polyline_names = list(polylines.keys())
+        starts,ends,offsets = [],[],[]
+        for name in self.__polyline_names:
+            line = polylines[name]
+            offsets.append(len(starts))
+            starts.extend(line[:-1])
+            ends.extend(line[1:])
+        self.__segment_start = np.array(starts,dtype=np.intp)
+        self.__segment_end = np.array(ends,dtype=np.intp)
+        self.__segment_offsets = np.array(offsets,dtype=np.intp)
+        self.__segment_counts = np.diff(np.append(self.__segment_offsets,len(starts)))
+        self.__align_left,self.__align_right = alignment_points
+
+    def measure(self,xy):
+        """ Takes 1 parameter:
+            xy :- landmark points of all faces - np.ndarray (n_faces,468,2)
+
+            return dict of arrays , every array has one value per face:
+            - pair distances (mouth , left_eye , right_eye)
+            - <polyline>_length and <polyline>_mean (mean segment length)
+            - align_angle (degrees) and align_dy (vertical distance between eye corners)
+        """
+        points = np.asarray(xy,dtype=np.float32)
+        result = {}
+
+        diff = points[:,self.__pair_a]-points[:,self.__pair_b]
+        distances = np.sqrt(np.einsum("fpk,fpk->fp",diff,diff))
+        for i,name in enumerate(self.__pair_names):
+            result[name] = distances[:,i]
+
+        diff = points[:,self.__segment_start]-points[:,self.__segment_end]
+        segments = np.sqrt(np.einsum("fsk,fsk->fs",diff,diff))
+        if(segments.shape[0]):
+            lengths = np.add.reduceat(segments,self.__segment_offsets,axis=1)
+        else:
+            lengths = np.zeros((0,len(self.__polyline_names)),dtype=np.float32)
+        for i,name in enumerate(self.__polyline_names):
+            result[name+"_length"] = lengths[:,i]
+            result[name+"_mean"] = lengths[:,i]/self.__segment_counts[i]
+
+        left = points[:,self.__align_left]
+        right = points[:,self.__align_right]
+        v1 = right-left
+        ## reference vector is horizontal (third point = [right_x , left_y]) so det and dot reduce to
+        ## v0x*v1y and v0x*v1x
+        v0x = v1[:,0]
+        result["align_angle"] = np.degrees(np.arctan2(v0x*v1[:,1],v0x*v1[:,0]))
+        result["align_dy"] = v1[:,1]
+        return result
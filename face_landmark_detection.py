@@ -1,8 +1,26 @@
 import cv2
 # from numpy.core.fromnumeric import nonzero
-import mediapipe as mp
 import numpy as np
-from scipy.spatial.distance import euclidean
+from landmarks import landmarks_to_array, detect_in_roi
+from face_geometry import FaceGeometry, FACE_POLYLINES
+from face_tracker import FaceTracker
+from ui_overlay import OverlayCompositor
+from landmark_filter import hysteresis
+from vision_events import BlinkEvent, EmotionChangedEvent
+from ui_layout import UiLayout
+
+
+class FaceState:
+    """ Analysis state of one tracked face (kept per face id) """
+    def __init__(self,face_id):
+        self.face_id = face_id
+        self.blink_count = 0
+        self.blink_prev_status = 0
+        self.mouth_open = None
+        self.emotion = "None"
+        self.alignment = None
+        self.align_angle = None
+
 
 class FaceAnalyzer:
     """ This class responsible to detect face landmarks and mark them
@@ -10,17 +28,50 @@ class FaceAnalyzer:
         - detect eye blink
         - recognize face expression
         - check mouth is open or not
-        
+
+        Every detected face gets stable id from FaceTracker and own FaceState
+        (blink counter , mouth state , emotion , alignment).
+        Features are evaluated for all faces together in batched numpy operations
+
+        landmark_source :- object with detect(image,roi) -> LandmarkSet and connections , replaces
+                           mediapipe inference (e.g. recorded landmarks , see landmark_recording.py)
+        events :- EventBus , blink and emotion change events are emitted into it (None disables events)
+        static_image_mode :- run face detection on every image (no tracking between frames) , use it
+                             when images are unrelated (e.g. frames of different clients) - bool
+
+        layout :- UiLayout of info panel (shared with SmartVisionApp)
+
+        ROI crops (see roi_scheduler.py) run on second graph in static image mode , built on first ROI ,
+        tracking graph sees only full frames (crop position and size change between frames)
+
     """
-    def __init__(self):
-        self.__mp_draw = mp.solutions.drawing_utils
-        self.__mp_face_mesh = mp.solutions.face_mesh
-        self.__face_detector = self.__mp_face_mesh.FaceMesh(static_image_mode=False,min_detection_confidence = 0.6,min_tracking_confidence = 0.6)
+    def __init__(self,max_num_faces=1,min_detection_confidence=0.6,min_tracking_confidence=0.6,overlay=None,blink_threshold=7,blink_margin=0.5,landmark_source=None,events=None,static_image_mode=False,layout=None):
+        self.__landmark_source = landmark_source
+        self.__layout = layout if layout is not None else UiLayout()
+        self.events = events
+        if(landmark_source is None):
+            ## mediapipe is imported here so importing this module stays cheap
+            import mediapipe as mp
+            self.__mp_draw = mp.solutions.drawing_utils
+            self.__mp_face_mesh = mp.solutions.face_mesh
+            ## options are kept , reset() builds new graph with them
+            self.__graph_options = {"static_image_mode":static_image_mode,"max_num_faces":max_num_faces,
+                                    "min_detection_confidence":min_detection_confidence,
+                                    "min_tracking_confidence":min_tracking_confidence}
+            self.__face_detector = self.__mp_face_mesh.FaceMesh(**self.__graph_options)
+            self.__roi_detector = None
+            self.__mesh_connections = np.array(sorted(self.__mp_face_mesh.FACEMESH_CONTOURS),dtype=np.intp)
+        else:
+            self.__face_detector = landmark_source
+            self.__mesh_connections = np.asarray(landmark_source.connections,dtype=np.intp).reshape(-1,2)
         self.__face_mesh_marks = []
         self.face_points = None
-        self.__blink_count = 0
-        self.__blink_prev_status = 0
-        self.__mouth_open = None
+        self.face_ids = []
+        self.face_states = {}
+        self.__tracker = FaceTracker()
+        self.__blink_threshold = blink_threshold
+        self.__blink_margin = blink_margin
+        self.__overlay = overlay if overlay is not None else OverlayCompositor()
         self.left_eye_points = [[144,160],
                     [145,159],
                     [153,158],
@@ -32,129 +83,206 @@ class FaceAnalyzer:
                             [373,387],
                             [388,390] ]
 
-        self.__lips_upper_points = [76,183,42,41,38,12,268,271,272,407,306]
-        self.__lips_lower_points = [76,96,89,179,86,15,316,403,319,325,306]
+        self.__lips_upper_points = FACE_POLYLINES["lips_upper"]
+        self.__lips_lower_points = FACE_POLYLINES["lips_lower"]
+        self.__geometry = FaceGeometry()
+        self.__measurements = None
+        self.__measured_points = None
+
+    def close(self):
+        """ release mediapipe graphs """
+        self.__face_detector.close()
+        if(self.__landmark_source is None and self.__roi_detector is not None):
+            self.__roi_detector.close()
+            self.__roi_detector = None
+
+    def __roi_graph(self):
+        """ graph of ROI crops , every crop is detected as independent image """
+        if(self.__roi_detector is None):
+            self.__roi_detector = self.__mp_face_mesh.FaceMesh(**dict(self.__graph_options,static_image_mode=True))
+        return self.__roi_detector
+
+    def reset(self):
+        """ forget faces of previous frames : new mediapipe graph (no tracking state) , tracked faces
+            and their states (blink counters etc)
+        """
+        if(self.__landmark_source is None):
+            self.__face_detector.close()
+            self.__face_detector = self.__mp_face_mesh.FaceMesh(**self.__graph_options)
+        self.__tracker.reset()
+        self.face_ids = []
+        self.face_states = {}
+
+    def measurements(self):
+        """ Distances , lip contour lengths and alignment angle of all detected faces
+            computed in one vectorized pass (cached until face_points change)
+        """
+        if(self.__measured_points is not self.face_points):
+            self.__measurements = self.__geometry.measure(self.face_points.xy)
+            self.__measured_points = self.face_points
+        return self.__measurements
+
+    def __states(self):
+        """ FaceState objects of faces detected in current frame (same order as face_points) """
+        return [self.face_states[face_id] for face_id in self.face_ids]
 
     def draw_lips_points(self):
         """ Use face landmark points and compute distance between upper lip and lower lip
-            and check mouth is open or not
+            and check mouth is open or not (for all faces)
+            return boolean array , one value per face
         """
-        points = self.face_points
-        ## compute distance between two point one point is of upper lip and second point is of lower lip
-        d = euclidean(points[12],points[15])
-        ## here 15 is threshold distance 
-        if(d>15):
-            self.__mouth_open = True
-        else:
-            self.__mouth_open =False
+        ## distance between two point one point is of upper lip and second point is of lower lip
+        ## here 15 is threshold distance
+        mouth_open = self.measurements()["mouth"]>15
+        for state,status in zip(self.__states(),mouth_open):
+            state.mouth_open = bool(status)
+        return mouth_open
 
     @classmethod
     def find_angle(cls,v0,v1):
-        angle = np.math.atan2(np.linalg.det([v0,v1]),np.dot(v0,v1))
-        return np.degrees(angle)
+        """ signed angle (degrees) between vectors v0 and v1 , works on arrays of vectors too """
+        v0 = np.asarray(v0,dtype=np.float64)
+        v1 = np.asarray(v1,dtype=np.float64)
+        det = v0[...,0]*v1[...,1] - v0[...,1]*v1[...,0]
+        dot = v0[...,0]*v1[...,0] + v0[...,1]*v1[...,1]
+        return np.degrees(np.arctan2(det,dot))
 
 
     def face_alignment_detection(self,image):
-        left_eye_point = np.array(self.face_points[161])
-        right_eye_point = np.array(self.face_points[388])
-        third_point = np.array([right_eye_point[0],left_eye_point[1]])
-        angel = FaceAnalyzer.find_angle(third_point-left_eye_point , right_eye_point-left_eye_point)
-        rotated_status = None
-        d = right_eye_point[1] - left_eye_point[1]
-        if(d>0 and d>10):
-            rotated_status = "right-rotated",str(round(angel,2))
-        elif(d<0 and d<-10):
-            rotated_status = "left-rotated",str(round(angel,2))
-        else:
-            rotated_status = "straight",str(round(angel,2))
+        """ return list of (rotated_status , angle) , one tuple per face """
+        measurements = self.measurements()
+        d = measurements["align_dy"]
+        status = np.select([d>10,d<-10],["right-rotated","left-rotated"],"straight")
+        rotated_status = []
+        for state,align,angel in zip(self.__states(),status,measurements["align_angle"]):
+            state.alignment = str(align)
+            state.align_angle = str(round(float(angel),2))
+            rotated_status.append((state.alignment,state.align_angle))
         return rotated_status
 
         # cv2.line(image,left_eye_point,right_eye_point,(0,255,0),3)
 
     def eye_blink_detect(self):
-        """ Use face landmark points to recognize eye blink event and 
-            maintain eye blink counter
+        """ Use face landmark points to recognize eye blink event and
+            maintain eye blink counter of every face
         """
-        points = self.face_points
-        
-        left_dist = euclidean(points[153],points[158])
-        right_dist = euclidean(points[374],points[386])
-        if(left_dist<7 and right_dist<7):
-            if(self.__blink_prev_status==0):
-                self.__blink_count+=1
-            self.__blink_prev_status=1
-        else:
-            self.__blink_prev_status = 0
-            
+        measurements = self.measurements()
+        states = self.__states()
+        ## both eyes closed , with hysteresis on previous status of every face to avoid flicker around threshold
+        eye_open = np.maximum(measurements["left_eye"],measurements["right_eye"])
+        previous = np.array([state.blink_prev_status for state in states],dtype=bool)
+        closed = hysteresis(eye_open,previous,self.__blink_threshold-self.__blink_margin,self.__blink_threshold+self.__blink_margin,above=False)
+        for state,status in zip(states,closed):
+            if(status):
+                if(state.blink_prev_status==0):
+                    state.blink_count+=1
+                    if(self.events is not None):
+                        self.events.emit(BlinkEvent(state.face_id,state.blink_count))
+                state.blink_prev_status=1
+            else:
+                state.blink_prev_status = 0
+
     def face_emotion_detection(self):
         """
             Use face landmark points to identify user face expression
             some lips and eyes landmarks points were used to identify expression
+            return list of emotions , one per face
 
         """
-        points = self.face_points
-        emotion = "None"
-
-        if(self.__mouth_open):
-            left_dist = euclidean(points[153],points[158])
-            right_dist = euclidean(points[374],points[386])
-            if(left_dist>9.5 and right_dist>9.5):
-                emotion = "surprise"
+        measurements = self.measurements()
+        mouth_open = np.array([bool(state.mouth_open) for state in self.__states()],dtype=bool)
+
+        surprise = (measurements["left_eye"]>9.5) & (measurements["right_eye"]>9.5)
+        ## mean segment length of upper and lower lip contours
+        diff = measurements["lips_lower_mean"]-measurements["lips_upper_mean"]
+        closed_emotion = np.select([diff < -0.10,(-0.10 < diff) & (diff < 0.015)],["sad","normal"],"happy")
+        emotion = np.where(mouth_open,np.where(surprise,"surprise","None"),closed_emotion)
+        for state,value in zip(self.__states(),emotion):
+            value = str(value)
+            if(self.events is not None and value!=state.emotion):
+                self.events.emit(EmotionChangedEvent(state.face_id,state.emotion,value))
+            state.emotion = value
+        return [str(value) for value in emotion]
+
+    def get_face_points(self,image,with_z=False,with_visibility=False,roi=None,scale=None):
+        """ Get input image and find face landmark points and save them inside face_points instance variable
+            face_points is LandmarkSet , xy array of shape (n_faces,468,2)
+            (face_points[153] style indexing still gives (x,y) of flattened points)
+            face_ids keeps tracked id of every detected face
+
+            roi :- [x1,y1,x2,y2] run detection only on this crop , points are mapped back to image coordinates
+            scale :- (sx,sy) , image is resized copy of display frame , points are multiplied by scale
+                     (faces are tracked in display coordinates)
+        """
+        def detect(crop):
+            detector = self.__face_detector if roi is None else self.__roi_graph()
+            results = detector.process(crop)
+            h,w = crop.shape[:2]
+            ## Total 468 landmarks
+            self.__face_mesh_marks = list(results.multi_face_landmarks or [])
+            return landmarks_to_array(self.__face_mesh_marks,w,h,468,with_z,with_visibility)
+        if(self.__landmark_source is not None):
+            self.face_points = self.__landmark_source.detect(image,roi)
         else:
-            lips_upper_dist = 0
-            lips_lower_dist= 0
-            for i in range(len(self.__lips_upper_points)-1):
-                lips_upper_dist+=euclidean( points[self.__lips_upper_points[i]],points[self.__lips_upper_points[i+1]])
-                lips_lower_dist+=euclidean( points[self.__lips_lower_points[i]],points[self.__lips_lower_points[i+1]])
-            lips_upper_dist = lips_upper_dist/(len(self.__lips_upper_points)-1)
-            lips_lower_dist = lips_lower_dist/(len(self.__lips_lower_points)-1)   
-            diff = lips_lower_dist-lips_upper_dist
-            if(diff < -0.10):
-                emotion = "sad"
-            elif( -0.10 < diff < 0.015 ):
-                emotion = "normal"
-            else:
-                emotion = "happy"
-        return emotion
+            self.face_points = detect_in_roi(detect,image,roi)
+            if(scale is not None):
+                self.face_points.scale(*scale)
+        self.__update_tracks()
+        return self.face_points
 
-    def get_face_points(self,image):
-        """ Get input image and find face landmark points and save them inside face_points instance variable"""
-        self.face_points = []
-        self.__face_mesh_marks = []
-        results = self.__face_detector.process(image)
-        ## Total 468 landmarks 
-        if(results.multi_face_landmarks):
-            for face in results.multi_face_landmarks:
-                for lm in face.landmark:
-                    x = lm.x
-                    y = lm.y
-                    h,w,c = image.shape
-                    relative_x = int(x*w)
-                    relative_y = int(y*h)
-                    self.face_points.append([relative_x,relative_y])
-
-                self.__face_mesh_marks.append(face)
-
-
-    def process_frame(self,image,draw_mesh = False):
+    def __update_tracks(self):
+        """ assign tracked ids to detected faces and keep states only of live tracks """
+        ids = self.__tracker.update(FaceTracker.boxes_from_points(self.face_points.xy))
+        self.face_ids = ids.tolist()
+        for face_id in self.face_ids:
+            if(face_id not in self.face_states):
+                self.face_states[face_id] = FaceState(face_id)
+        active = set(self.__tracker.active_ids)
+        for face_id in list(self.face_states):
+            if(face_id not in active):
+                del self.face_states[face_id]
+
+    def analyze(self):
+        """ run all features for all detected faces , return list of FaceState (one per face) """
+        if(self.face_points.count):
+            self.eye_blink_detect()
+            self.draw_lips_points()
+            self.face_alignment_detection(None)
+            self.face_emotion_detection()
+        return self.__states()
+
+    def process_frame(self,image,draw_mesh = False,roi=None,detect=True):
         """
             Take input image and manage all features of FaceAnalyzer
             call to all available features
+
+            detect :- run landmark detection , False reuses face_points of last get_face_points call - bool
         """
-        self.get_face_points(image)
-        cv2.rectangle(image,[20,30],[230,200],(255,255,255),-1)
-        if(len(self.face_points)):
-            self.eye_blink_detect()
-            self.draw_lips_points()
-            align_status,align_angle = self.face_alignment_detection(image)
-            emotion = self.face_emotion_detection()
-            cv2.putText(image,"Emotion : "+emotion,[30,50],cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1) 
-            cv2.putText(image,"Alignment : "+align_status,[30,80],cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1) 
-            cv2.putText(image,"Align Angle : "+align_angle,[30,110],cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1) 
-
-        cv2.putText(image,"Blink : "+str(self.__blink_count),[30,140],cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1) 
-        cv2.putText(image,"Mouth Open : "+str(self.__mouth_open),[30,170],cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1) 
-        if(draw_mesh):
-            for face_lm in self.__face_mesh_marks:
-                self.__mp_draw.draw_landmarks(image,face_lm,self.__mp_face_mesh.FACEMESH_CONTOURS )
+        if(detect):
+            self.get_face_points(image,roi=roi)
+        states = self.analyze()
+        panel = self.__layout.rect("face_panel",image.shape)
+        scale = UiLayout.text_scale(image.shape)
+        thickness = max(1,int(scale))
+        self.__overlay.apply(image,"face_panel",lambda layer: layer.rectangle(panel[0],panel[1],(255,255,255),-1))
+
+        def panel_line(row,text):
+            """ text of info panel row (30 px apart at 640x480) """
+            cv2.putText(image,text,(panel[0][0]+int(10*scale),panel[0][1]+int((20+30*row)*scale)),cv2.FONT_HERSHEY_SIMPLEX, 0.5*scale, (0, 0, 0), thickness)
+
+        ## info panel shows first (oldest) tracked face , other faces get small label
+        primary = min(self.face_states.values(),key=lambda state:state.face_id) if self.face_states else None
+        if(len(states)):
+            panel_line(0,"Emotion : "+primary.emotion)
+            panel_line(1,"Alignment : "+str(primary.alignment))
+            panel_line(2,"Align Angle : "+str(primary.align_angle))
+        if(len(states)>1):
+            for state,box in zip(states,FaceTracker.boxes_from_points(self.face_points.xy).astype(int)):
+                cv2.putText(image,f"ID {state.face_id} : {state.emotion} , blink {state.blink_count}",(int(box[0]),max(int(box[1])-int(8*scale),int(12*scale))),cv2.FONT_HERSHEY_SIMPLEX, 0.45*scale, (0, 255, 255), thickness)
+
+        panel_line(3,"Blink : "+str(primary.blink_count if primary else 0))
+        panel_line(4,"Mouth Open : "+str(primary.mouth_open if primary else None))
+        if(draw_mesh and self.face_points.count):
+            lines = self.face_points.xy[:,self.__mesh_connections].reshape(-1,2,1,2)
+            cv2.polylines(image,list(lines),False,(255,255,255),1)
         return image
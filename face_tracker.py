@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class FaceTracker:
+    """ Lightweight IoU / centroid tracker which gives stable ids to detected faces across frames
+
+        iou_threshold :- minimum IoU to match face box with track box - float
+        max_distance :- centroid distance (pixels) accepted as match when IoU is too small - float
+        max_missed :- number of frames a track survives without matching face - int
+    """
+    def __init__(self,iou_threshold=0.3,max_distance=80,max_missed=10):
+        self.__iou_threshold = iou_threshold
+        self.__max_distance = max_distance
+        self.__max_missed = max_missed
+        self.__track_ids = np.empty(0,dtype=np.int64)
+        self.__track_boxes = np.empty((0,4),dtype=np.float32)
+        self.__track_missed = np.empty(0,dtype=np.int64)
+        self.__next_id = 0
+
+    @property
+    def active_ids(self):
+        return self.__track_ids.tolist()
+
+    @classmethod
+    def boxes_from_points(cls,xy):
+        """ bounding boxes [x1,y1,x2,y2] of (n_faces,N,2) landmark array """
+        xy = np.asarray(xy)
+        if(not len(xy)):
+            return np.empty((0,4),dtype=np.float32)
+        return np.concatenate([xy.min(axis=1),xy.max(axis=1)],axis=1).astype(np.float32)
+
+    @classmethod
+    def iou(cls,boxes_a,boxes_b):
+        """ pairwise IoU matrix of shape (len(boxes_a),len(boxes_b)) """
+        a = boxes_a[:,None,:]
+        b = boxes_b[None,:,:]
+        w = np.clip(np.minimum(a[...,2],b[...,2])-np.maximum(a[...,0],b[...,0]),0,None)
+        h = np.clip(np.minimum(a[...,3],b[...,3])-np.maximum(a[...,1],b[...,1]),0,None)
+        inter = w*h
+        area_a = (a[...,2]-a[...,0])*(a[...,3]-a[...,1])
+        area_b = (b[...,2]-b[...,0])*(b[...,3]-b[...,1])
+        union = area_a+area_b-inter
+        return np.where(union>0,inter/np.maximum(union,1e-6),0.0)
+
+    def update(self,boxes):
+        """ Takes 1 parameter:
+            boxes :- face boxes of current frame - np.ndarray (n_faces,4)
+
+            return face ids - np.ndarray (n_faces,) , same order as boxes
+        """
+        boxes = np.asarray(boxes,dtype=np.float32).reshape(-1,4)
+        n = len(boxes)
+        ids = np.full(n,-1,dtype=np.int64)
+        matched_tracks = np.zeros(len(self.__track_ids),dtype=bool)
+
+        if(n and len(self.__track_ids)):
+            iou = FaceTracker.iou(boxes,self.__track_boxes)
+            centers = (boxes[:,:2]+boxes[:,2:])/2
+            track_centers = (self.__track_boxes[:,:2]+self.__track_boxes[:,2:])/2
+            dist = np.linalg.norm(centers[:,None,:]-track_centers[None,:,:],axis=-1)
+            valid = (iou>=self.__iou_threshold) | (dist<=self.__max_distance)
+            ## greedy assignment , best IoU first then nearest centroid
+            order = np.lexsort((dist.ravel(),-iou.ravel()))
+            for flat_index in order:
+                if(not valid.flat[flat_index]):
+                    continue
+                d,t = divmod(int(flat_index),len(self.__track_ids))
+                if(ids[d]>=0 or matched_tracks[t]):
+                    continue
+                ids[d] = self.__track_ids[t]
+                matched_tracks[t] = True
+
+        ## update matched tracks , age unmatched tracks and drop expired ones
+        self.__track_missed[~matched_tracks]+=1
+        self.__track_missed[matched_tracks] = 0
+        track_index = {int(track_id):i for i,track_id in enumerate(self.__track_ids)}
+        for d in np.flatnonzero(ids>=0):
+            self.__track_boxes[track_index[int(ids[d])]] = boxes[d]
+        keep = self.__track_missed<=self.__max_missed
+        new = ids<0
+        new_ids = np.arange(self.__next_id,self.__next_id+int(new.sum()),dtype=np.int64)
+        self.__next_id+=len(new_ids)
+        ids[new] = new_ids
+        self.__track_ids = np.concatenate([self.__track_ids[keep],new_ids])
+        self.__track_boxes = np.concatenate([self.__track_boxes[keep],boxes[new]])
+        self.__track_missed = np.concatenate([self.__track_missed[keep],np.zeros(len(new_ids),dtype=np.int64)])
+        return ids
+
+    def reset(self):
+        self.__track_ids = np.empty(0,dtype=np.int64)
+        self.__track_boxes = np.empty((0,4),dtype=np.float32)
+        self.__track_missed = np.empty(0,dtype=np.int64)
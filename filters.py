@@ -1,38 +1,230 @@
 import cv2
 import numpy as np
 
+
+def _gray_op(shape):
+    """ BGR -> GRAY , skipped when input is already gray """
+    if(len(shape)==2):
+        return None
+    return shape[:2],lambda src,dst: cv2.cvtColor(src,cv2.COLOR_BGR2GRAY,dst=dst)
+
+
+def _bgr_op(shape):
+    """ GRAY -> BGR , skipped when input already has 3 channels """
+    if(len(shape)==3):
+        return None
+    return shape+(3,),lambda src,dst: cv2.cvtColor(src,cv2.COLOR_GRAY2BGR,dst=dst)
+
+
+def _cvt_op(shape,code):
+    if(len(shape)!=3):
+        raise ValueError("color conversion filter needs 3 channel input")
+    return shape,lambda src,dst: cv2.cvtColor(src,code,dst=dst)
+
+
+def _equalize_op(shape):
+    if(len(shape)!=2):
+        raise ValueError("equalize filter needs gray input , add ('gray',) op before it")
+    return shape,lambda src,dst: cv2.equalizeHist(src,dst=dst)
+
+
+def _median_op(shape,ksize):
+    return shape,lambda src,dst: cv2.medianBlur(src,ksize,dst=dst)
+
+
+def _gaussian_op(shape,ksize):
+    return shape,lambda src,dst: cv2.GaussianBlur(src,(ksize,ksize),0,dst=dst)
+
+
+def _bilateral_op(shape,d,sigma_color,sigma_space):
+    return shape,lambda src,dst: cv2.bilateralFilter(src,d,sigma_color,sigma_space,dst=dst)
+
+
+## quality / speed tiers of cartoon filter
+## scale :- resolution of bilateral color pass (downsample - filter - upsample)
+## median :- median blur kernel of edge mask (kernels above 5 use much slower path in opencv)
+## d , passes :- bilateral kernel diameter and number of passes
+## numbers from benchmarks/cartoon_bench.py on 640x480 frame (time , PSNR / SSIM vs quality tier):
+## quality ~50 ms , balanced ~18 ms (~41 dB / 0.996) , realtime ~5 ms (~31 dB / 0.983)
+CARTOON_TIERS = {"quality":{"scale":1.0,"median":9,"d":9,"passes":1},
+                 "balanced":{"scale":0.5,"median":9,"d":5,"passes":1},
+                 "realtime":{"scale":0.5,"median":5,"d":5,"passes":1}}
+
+
+def _cartoon_op(shape,quality="quality"):
+    """ cartoon effect (see FilterApplyer.make_cartoon) with all intermediate buffers preallocated
+        quality :- one of CARTOON_TIERS
+    """
+    if(len(shape)!=3):
+        raise ValueError("cartoon filter needs 3 channel input")
+    tier = CARTOON_TIERS[quality]
+    h,w = shape[:2]
+    gray = np.empty(shape[:2],dtype=np.uint8)
+    gray_blur = np.empty_like(gray)
+    edges = np.empty_like(gray)
+    edges_bgr = np.empty(shape,dtype=np.uint8)
+    color = np.empty(shape,dtype=np.uint8)
+    small_size = (max(1,int(w*tier["scale"])),max(1,int(h*tier["scale"])))
+    scaled = small_size!=(w,h)
+    ## ping-pong buffers of bilateral passes (at downscaled size for faster tiers)
+    work = [np.empty((small_size[1],small_size[0],3),dtype=np.uint8) for _ in range(2)]
+
+    def smooth_color(src):
+        if(scaled):
+            src = cv2.resize(src,small_size,dst=work[0],interpolation=cv2.INTER_AREA)
+        for i in range(tier["passes"]):
+            out = work[(i+1)%2]
+            cv2.bilateralFilter(src,tier["d"],200,200,dst=out)
+            src = out
+        if(scaled):
+            return cv2.resize(src,(w,h),dst=color,interpolation=cv2.INTER_LINEAR)
+        return src
+
+    def run(src,dst):
+        cv2.cvtColor(src,cv2.COLOR_BGR2GRAY,dst=gray)
+        cv2.medianBlur(gray,tier["median"],dst=gray_blur)
+        cv2.adaptiveThreshold(gray_blur,255,cv2.ADAPTIVE_THRESH_MEAN_C,cv2.THRESH_BINARY,9,9,dst=edges)
+        color_smooth = smooth_color(src)
+        ## edges are 0/255 so AND with 3 channel edge image keeps color only on non edge pixels
+        cv2.cvtColor(edges,cv2.COLOR_GRAY2BGR,dst=edges_bgr)
+        return cv2.bitwise_and(color_smooth,edges_bgr,dst=dst)
+    return shape,run
+
+
+## op name -> builder(input shape , *params) returning (output shape , function(src,dst)) or None to skip op
+FILTER_OPS = {"gray":_gray_op,
+              "bgr":_bgr_op,
+              "cvt":_cvt_op,
+              "equalize":_equalize_op,
+              "median":_median_op,
+              "gaussian":_gaussian_op,
+              "bilateral":_bilateral_op,
+              "cartoon":_cartoon_op}
+
+
+class FilterGraph:
+    """ Declarative filter pipeline , list of ops like [("gray",),("equalize",),("median",7)]
+
+        compile(shape) resolves ops once into callable which writes every op into
+        preallocated buffer (dst=) , output buffers are rotated between output_buffers
+        arrays so previous outputs stay valid for a few frames
+    """
+    def __init__(self,ops):
+        self.ops = [tuple(op) for op in ops]
+
+    def __add__(self,other):
+        return FilterGraph(self.ops+other.ops)
+
+    def compile(self,shape,output_buffers=2):
+        """ Takes 2 parameters:
+            1) shape :- shape of input image - tuple
+            2) output_buffers :- number of rotating output buffers - int
+
+            return function(image) -> filtered image
+        """
+        shape = tuple(shape)
+        steps = []
+        for op in self.ops:
+            step = FILTER_OPS[op[0]](shape,*op[1:])
+            if(step is None):
+                continue
+            shape,fn = step
+            steps.append((fn,np.empty(shape,dtype=np.uint8)))
+        outputs = [np.empty(shape,dtype=np.uint8) for _ in range(max(1,output_buffers))]
+        if(steps):
+            last_fn = steps[-1][0]
+            steps = steps[:-1]
+        else:
+            last_fn = lambda src,dst: np.copyto(dst,src)
+        state = {"next":0}
+
+        def run(image):
+            src = image
+            for fn,buffer in steps:
+                fn(src,buffer)
+                src = buffer
+            out = outputs[state["next"]]
+            state["next"] = (state["next"]+1)%len(outputs)
+            last_fn(src,out)
+            return out
+        return run
+
+
 class FilterApplyer:
     
     """  This class Apply different filters on video frames
         Some default and specialized filters implemented in this class
+
+        Every filter is FilterGraph , compiled once per (filter , input shape) and cached
+        new filters / chains can be added with register_filter , e.g.
+            applyer.register_filter("soft_histeq",["gray","histeq","blurry"])
         """
-    def __init__(self):
+    FILTERS = {"gray":[("gray",)],
+               "hsv":[("cvt",cv2.COLOR_BGR2HSV)],
+               "hls":[("cvt",cv2.COLOR_BGR2HLS)],
+               "cartoon":[("cartoon",)],
+               "blurry":[("median",7)],
+               "histeq":[("gray",),("equalize",),("bgr",)]}
+
+    def __init__(self,output_buffers=2,cartoon_quality="quality"):
         self.__default_filters = ["gray","hsv","hls"] 
         self.__special_filters = ["cartoon","blurry","histeq"]
+        self.__graphs = {name:FilterGraph(ops) for name,ops in FilterApplyer.FILTERS.items()}
+        self.__compiled = {}
+        self.__output_buffers = output_buffers
+        self.cartoon_quality = None
+        self.set_cartoon_quality(cartoon_quality)
 
-    def apply_filter(self,image,filter_name="gray"):
+    def set_cartoon_quality(self,quality):
+        """ select quality / speed tier of cartoon filter ("quality","balanced","realtime" see CARTOON_TIERS) """
+        if(quality not in CARTOON_TIERS):
+            raise ValueError(f"unknown cartoon quality {quality} , available : {list(CARTOON_TIERS)}")
+        if(quality!=self.cartoon_quality):
+            self.cartoon_quality = quality
+            self.register_filter("cartoon",[("cartoon",quality)])
+
+    def register_filter(self,name,steps):
         """ Takes 2 parameters:
+            1) name :- name of new filter - str
+            2) steps :- list of filter names and / or op tuples , e.g. ["gray","histeq",("median",5)]
+        """
+        ops = []
+        for step in steps:
+            if(isinstance(step,str)):
+                ops.extend(self.__graphs[step].ops)
+            else:
+                ops.append(tuple(step))
+        self.__graphs[name] = FilterGraph(ops)
+        self.__compiled = {key:fn for key,fn in self.__compiled.items() if key[0]!=name}
+        if(name not in self.__default_filters+self.__special_filters):
+            self.__special_filters.append(name)
+
+    def get_filter(self,filter_name,shape,as_bgr=False):
+        """ return compiled function of filter for input shape """
+        key = (filter_name,as_bgr,tuple(shape))
+        fn = self.__compiled.get(key)
+        if(fn is None):
+            graph = self.__graphs[filter_name]
+            if(as_bgr):
+                graph = graph+FilterGraph([("bgr",)])
+            fn = graph.compile(shape,self.__output_buffers)
+            self.__compiled[key] = fn
+        return fn
+
+    def apply_filter(self,image,filter_name="gray",as_bgr=False):
+        """ Takes 3 parameters:
             1) image :- input image - np.ndarray 
             2) filter_name :- Name of filter - str
+            3) as_bgr :- convert single channel output (gray) to BGR - bool
             
             return 2 things :
             1) image :- output image after applying filter - np.ndarray
+               (preallocated buffer , reused after output_buffers calls)
             2) filter_name :- Name of filter - str
             
         """
-        if(filter_name in self.__default_filters):
-            image = cv2.cvtColor(image,eval(f"cv2.COLOR_BGR2{filter_name.upper()}"))
-            return image,filter_name
-        elif(filter_name in self.__special_filters):
-            if(filter_name=="cartoon"):
-                image = self.make_cartoon(image)
-                return image,filter_name
-            elif(filter_name=="blurry"):
-                image = cv2.medianBlur(image,7)
-                return image,filter_name
-            elif(filter_name=="histeq"):
-                image = cv2.equalizeHist(self.apply_filter(image,"gray")[0])
-                return cv2.cvtColor(image,cv2.COLOR_GRAY2BGR),filter_name
+        if(filter_name in self.__graphs):
+            return self.get_filter(filter_name,image.shape,as_bgr)(image),filter_name
         else:
             return image,"Normal"
     
@@ -0,0 +1,254 @@
+import cv2
+import numpy as np
+from threading import Thread, Event
+from queue import Queue, Empty, Full
+from time import time, sleep
+from profiler import Profiler
+
+
+class CameraSource:
+    """ Read frames from a webcam (default source of SmartVisionApp) """
+    def __init__(self,index=0,width=640,height=480,flip=True):
+        self.__cap = cv2.VideoCapture(index)
+        self.__cap.set(3,width)
+        self.__cap.set(4,height)
+        self.__flip = flip
+
+    def read(self):
+        """ return next frame or None when camera stops giving frames """
+        ret,frame = self.__cap.read()
+        if(not ret):
+            return None
+        if(self.__flip):
+            frame = cv2.flip(frame,1)
+        return frame
+
+    def release(self):
+        self.__cap.release()
+
+
+class VideoFileSource:
+    """ Read frames from a recorded video file
+        loop :- restart from first frame when file ends - bool
+    """
+    def __init__(self,path,loop=False,flip=False):
+        self.path = path
+        self.__cap = cv2.VideoCapture(path)
+        self.__loop = loop
+        self.__flip = flip
+
+    def read(self):
+        ret,frame = self.__cap.read()
+        if(not ret and self.__loop):
+            self.__cap.set(cv2.CAP_PROP_POS_FRAMES,0)
+            ret,frame = self.__cap.read()
+        if(not ret):
+            return None
+        if(self.__flip):
+            frame = cv2.flip(frame,1)
+        return frame
+
+    def release(self):
+        self.__cap.release()
+
+
+class SyntheticSource:
+    """ Generate synthetic frames (moving gradient + box) so pipeline can be benchmarked
+        without camera or video file
+
+        num_frames :- total frames to generate (None means endless) - int
+        fps :- simulate camera frame rate, None means generate as fast as possible - float
+    """
+    def __init__(self,width=640,height=480,num_frames=300,fps=None):
+        self.__width = width
+        self.__height = height
+        self.__num_frames = num_frames
+        self.__interval = 1.0/fps if fps else 0
+        self.__count = 0
+        self.__last_time = 0
+        gradient = np.linspace(0,255,width,dtype=np.uint8)
+        self.__background = np.dstack([np.tile(gradient,(height,1))]*3)
+
+    def read(self):
+        if(self.__num_frames is not None and self.__count>=self.__num_frames):
+            return None
+        if(self.__interval):
+            wait = self.__last_time + self.__interval - time()
+            if(wait>0):
+                sleep(wait)
+            self.__last_time = time()
+        frame = self.__background.copy()
+        x = (self.__count*5) % max(1,self.__width-100)
+        cv2.rectangle(frame,(x,self.__height//3),(x+100,self.__height//3+100),(0,200,255),-1)
+        self.__count+=1
+        return frame
+
+    def release(self):
+        pass
+
+
+class FramePipeline:
+    """ Run capture , processing and display stages of application in pipelined manner
+
+        capture thread --> [bounded queue] --> processing thread --> [bounded queue] --> sink (caller thread)
+
+        source :- object with read() and release() methods (CameraSource, VideoFileSource, SyntheticSource)
+        process_fn :- function(frame) -> processed frame
+        sink_fn :- function(frame,info) called on caller thread , return False to stop pipeline
+        queue_size :- capacity of each queue - int
+        drop_stale :- when queue is full drop oldest frame instead of blocking producer - bool
+                      keeps latency bounded when processing falls behind camera
+        profiler :- Profiler which records "capture" and "display" spans - Profiler
+    """
+    def __init__(self,source,process_fn,sink_fn=None,queue_size=2,drop_stale=True,profiler=None):
+        self.__profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.__source = source
+        self.__process_fn = process_fn
+        self.__sink_fn = sink_fn
+        self.__drop_stale = drop_stale
+        self.__capture_queue = Queue(maxsize=queue_size)
+        self.__output_queue = Queue(maxsize=queue_size)
+        self.__stop_event = Event()
+        self.__capture_done = Event()
+        self.__process_done = Event()
+        self.__threads = []
+        self.__counters = {"captured":0,"processed":0,"displayed":0,"dropped_capture":0,"dropped_output":0}
+        self.__latency_sum = 0.0
+        self.__process_time_sum = 0.0
+        self.__start_time = None
+        self.__end_time = None
+
+    def __put(self,queue,item,counter_name):
+        """ put item into queue , follow drop stale policy when queue is full """
+        while not self.__stop_event.is_set():
+            if(self.__drop_stale):
+                try:
+                    queue.put_nowait(item)
+                    return
+                except Full:
+                    try:
+                        queue.get_nowait()
+                        self.__counters[counter_name]+=1
+                    except Empty:
+                        pass
+            else:
+                try:
+                    queue.put(item,timeout=0.1)
+                    return
+                except Full:
+                    pass
+
+    def __capture_loop(self):
+        seq = 0
+        try:
+            while not self.__stop_event.is_set():
+                with self.__profiler.span("capture"):
+                    frame = self.__source.read()
+                if(frame is None):
+                    break
+                self.__counters["captured"]+=1
+                self.__put(self.__capture_queue,(seq,time(),frame),"dropped_capture")
+                seq+=1
+        finally:
+            self.__capture_done.set()
+
+    def __process_loop(self):
+        try:
+            while not self.__stop_event.is_set():
+                try:
+                    seq,capture_time,frame = self.__capture_queue.get(timeout=0.05)
+                except Empty:
+                    if(self.__capture_done.is_set() and self.__capture_queue.empty()):
+                        break
+                    continue
+                st = time()
+                output = self.__process_fn(frame)
+                process_time = time()-st
+                self.__counters["processed"]+=1
+                self.__process_time_sum+=process_time
+                info = {"seq":seq,"capture_time":capture_time,"process_time":process_time}
+                self.__put(self.__output_queue,(output if output is not None else frame,info),"dropped_output")
+        finally:
+            self.__process_done.set()
+
+    def start(self):
+        """ start capture and processing threads """
+        self.__start_time = time()
+        self.__threads = [Thread(target=self.__capture_loop,name="capture",daemon=True),
+                          Thread(target=self.__process_loop,name="process",daemon=True)]
+        for t in self.__threads:
+            t.start()
+
+    def stop(self):
+        """ stop all stages and release source """
+        self.__stop_event.set()
+        for t in self.__threads:
+            t.join(timeout=1.0)
+        self.__source.release()
+        if(self.__end_time is None):
+            self.__end_time = time()
+
+    def run(self):
+        """ start pipeline and run sink stage on caller thread until source ends or sink returns False
+            (GUI calls like imshow/waitKey must stay on main thread)
+        """
+        self.start()
+        try:
+            while True:
+                try:
+                    output,info = self.__output_queue.get(timeout=0.05)
+                except Empty:
+                    if(self.__process_done.is_set() and self.__output_queue.empty()):
+                        break
+                    continue
+                info["latency"] = time()-info["capture_time"]
+                self.__latency_sum+=info["latency"]
+                self.__counters["displayed"]+=1
+                if(self.__sink_fn is not None):
+                    with self.__profiler.span("display"):
+                        keep_running = self.__sink_fn(output,info)
+                    if(keep_running is False):
+                        break
+        finally:
+            self.__end_time = time()
+            self.stop()
+        return self.stats()
+
+    def stats(self):
+        """ return counters , throughput and mean latency of pipeline """
+        stats = dict(self.__counters)
+        elapsed = ((self.__end_time or time()) - self.__start_time) if self.__start_time else 0
+        stats["elapsed"] = elapsed
+        stats["throughput_fps"] = stats["displayed"]/elapsed if elapsed>0 else 0.0
+        stats["mean_latency"] = self.__latency_sum/stats["displayed"] if stats["displayed"] else 0.0
+        stats["mean_process_time"] = self.__process_time_sum/stats["processed"] if stats["processed"] else 0.0
+        return stats
+
+
+### driver code to benchmark pipeline headless
+### example : python frame_pipeline.py --frames 300
+### example : python frame_pipeline.py --video input.mp4
+
+if __name__=="__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless benchmark of SmartVisionApp frame pipeline")
+    parser.add_argument("--video",default=None,help="video file used as frame source (default synthetic frames)")
+    parser.add_argument("--frames",type=int,default=300,help="number of synthetic frames")
+    parser.add_argument("--fps",type=float,default=None,help="simulated camera fps of synthetic source")
+    parser.add_argument("--queue-size",type=int,default=2)
+    parser.add_argument("--no-drop",action="store_true",help="block producer instead of dropping stale frames")
+    parser.add_argument("--profile",action="store_true",help="print per stage latency percentiles (Prometheus text)")
+    parser.add_argument("--profile-jsonl",default=None,help="append per stage latency percentiles to this json lines file")
+    args = parser.parse_args()
+
+    from smart_vision_app import SmartVisionApp
+    profiler = Profiler(enabled=args.profile or args.profile_jsonl is not None)
+    vision_app = SmartVisionApp(profiler=profiler)
+    source = VideoFileSource(args.video) if args.video else SyntheticSource(num_frames=args.frames,fps=args.fps)
+    pipeline = FramePipeline(source,vision_app.process,queue_size=args.queue_size,drop_stale=not args.no_drop,profiler=profiler)
+    for name,value in pipeline.run().items():
+        print(f"{name} : {value}")
+    if(args.profile):
+        print(profiler.prometheus_text())
+    if(args.profile_jsonl):
+        profiler.export_jsonl(args.profile_jsonl)
@@ -0,0 +1,97 @@
+import numpy as np
+from landmark_filter import hysteresis
+
+## landmark chains of every finger (thumb , index , middle , ring , pinky) starting at wrist ,
+## joint angles are measured at 3 inner points of every chain
+FINGER_CHAINS = np.array([[0,1,2,3,4],[0,5,6,7,8],[0,9,10,11,12],[0,13,14,15,16],[0,17,18,19,20]])
+## finger extension pairs , thumb tip to middle finger base and base to tip of other fingers
+EXTENSION_PAIRS = np.array([[4,9],[5,8],[9,12],[13,16],[17,20]])
+FINGER_NAMES = ("thumb","index","middle","ring","pinky")
+
+## gesture of finger up code (thumb is highest bit) , other codes are "other"
+GESTURES = {0b00000:"fist",0b11111:"open_palm",0b01000:"point",0b01100:"victory",0b10000:"thumbs_up",
+            0b11000:"gun",0b01001:"rock",0b10001:"call",0b01111:"four",0b01110:"three"}
+_GESTURE_TABLE = np.array([GESTURES.get(code,"other") for code in range(32)],dtype=object)
+_CODE_WEIGHTS = np.array([16,8,4,2,1])
+_UPPER = np.triu_indices(21,1)
+
+
+class HandFeatures:
+    """ Scale invariant features of all hands of one frame , computed in one vectorized pass
+
+        xy :- (n_hands,21,2) float32 pixel coordinates
+        palm_size :- (n_hands,) larger of wrist to middle finger base and index base to pinky base distance
+        distances :- (n_hands,21,21) distances of all landmark pairs divided by palm_size
+        angles :- (n_hands,5,3) joint angles in degrees of every finger (180 = straight)
+        fingers_up :- (n_hands,5) bool finger states , set by FingerStateClassifier
+        gestures :- gesture name of every hand , set by FingerStateClassifier
+    """
+    __slots__ = ("xy","palm_size","distances","angles","fingers_up","gestures")
+
+    def __init__(self,points):
+        xy = np.asarray(getattr(points,"xy",points),dtype=np.float32).reshape(-1,21,2)
+        self.xy = xy
+        diff = xy[:,:,None,:]-xy[:,None,:,:]
+        distances = np.sqrt((diff*diff).sum(axis=-1))
+        self.palm_size = np.maximum(np.maximum(distances[:,0,9],distances[:,5,17]),1.0)
+        self.distances = distances/self.palm_size[:,None,None]
+        chains = xy[:,FINGER_CHAINS]
+        v1 = chains[:,:,:-2]-chains[:,:,1:-1]
+        v2 = chains[:,:,2:]-chains[:,:,1:-1]
+        norms = np.maximum(np.linalg.norm(v1,axis=-1)*np.linalg.norm(v2,axis=-1),1e-6)
+        self.angles = np.degrees(np.arccos(np.clip((v1*v2).sum(axis=-1)/norms,-1.0,1.0)))
+        self.fingers_up = np.zeros((xy.shape[0],5),dtype=bool)
+        self.gestures = []
+
+    @property
+    def count(self):
+        return self.xy.shape[0]
+
+    def distance(self,i,j):
+        """ normalized distance between landmarks i and j of every hand , shape (n_hands,) """
+        return self.distances[:,i,j]
+
+    def vector(self):
+        """ (n_hands,225) feature vector , 210 unique normalized distances and 15 joint angles / 180 """
+        return np.concatenate([self.distances[:,_UPPER[0],_UPPER[1]],self.angles.reshape(-1,15)/180.0],axis=1)
+
+
+class FingerStateClassifier:
+    """ Finger up / down states and gesture of all hands in one numpy pass
+
+        finger is up when its extension (EXTENSION_PAIRS distance / palm size) crosses threshold+margin ,
+        down again below threshold-margin , and its middle joint is straighter than min_angle
+
+        threshold , margin :- extension in palm sizes - float
+        min_angle :- degrees , finger bent more than this is down - float
+
+        hysteresis state is kept per hand id (tracked hand ids of SmartVisionApp) , so finger states
+        follow hands when detector changes their order and other hands appearing or leaving don't reset them
+    """
+    def __init__(self,threshold=0.55,margin=0.05,min_angle=100.0):
+        self.min_angle = min_angle
+        self.on = threshold+margin
+        self.off = threshold-margin
+        ## {hand id : (5,) bool extended state}
+        self.__extended = {}
+
+    def classify(self,features,ids=None):
+        """ set features.fingers_up and features.gestures , return features
+            ids :- tracked id of every hand (same order as features) , None keys states by hand position
+        """
+        extension = features.distances[:,EXTENSION_PAIRS[:,0],EXTENSION_PAIRS[:,1]]
+        ids = range(features.count) if ids is None else [int(hand_id) for hand_id in ids]
+        previous = np.zeros(extension.shape,dtype=bool)
+        for row,hand_id in enumerate(ids):
+            state = self.__extended.get(hand_id)
+            if(state is not None):
+                previous[row] = state
+        extended = hysteresis(extension,previous,self.on,self.off)
+        ## states of hands not in frame any more are dropped
+        self.__extended = dict(zip(ids,extended))
+        features.fingers_up = extended & (features.angles[:,:,1]>=self.min_angle)
+        features.gestures = _GESTURE_TABLE[features.fingers_up.astype(np.intp) @ _CODE_WEIGHTS].tolist()
+        return features
+
+    def reset(self):
+        self.__extended = {}
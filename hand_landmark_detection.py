@@ -1,71 +1,164 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 from time import time
-from scipy.spatial.distance import euclidean
+from landmarks import LandmarkSet, landmarks_to_array, detect_in_roi
+from ui_overlay import OverlayCompositor
+from hand_features import HandFeatures, FingerStateClassifier
+from vision_events import FingerCountChangedEvent
+from ui_layout import UiLayout
 
 class HandDetector:
     """
         HandDetector class resonsible to detect hands in source image
         and mark hand landmarks points
+
+        landmark_source :- object with detect(image,roi) -> LandmarkSet and connections , replaces
+                           mediapipe inference (e.g. recorded landmarks , see landmark_recording.py)
+        events :- EventBus , finger count change events are emitted into it (None disables events)
+        finger_threshold , finger_margin :- finger extension in palm sizes (scale invariant , see hand_features.py)
+        layout :- UiLayout of fingers panel (shared with SmartVisionApp)
+
+        features(points) computes HandFeatures (normalized distances , joint angles , finger states , gestures)
+        once per frame , count_fingers , VirtualDrawBoard and SmartVisionApp read cached features
+
+        ROI crops (see roi_scheduler.py) run on second graph in static image mode , built on first ROI ,
+        tracking graph sees only full frames (crop position and size change between frames)
     
     """
-    def __init__(self,static_image_mode=False,max_num_hands = 2,min_detection_confidence = 0.6,min_tracking_confidence = 0.6):
-        self.__mpHand = mp.solutions.hands
-        self.__detector = self.__mpHand.Hands(static_image_mode=static_image_mode,
-                                                max_num_hands = max_num_hands,
-                                                min_detection_confidence = min_detection_confidence,
-                                                min_tracking_confidence = min_tracking_confidence)
-        self.__mpDraw = mp.solutions.drawing_utils
-        self.__one_hand_distance_pairs = np.array([[4,9],[5,8],[9,12],[13,16],[17,20]])
+    def __init__(self,static_image_mode=False,max_num_hands = 2,min_detection_confidence = 0.6,min_tracking_confidence = 0.6,overlay=None,finger_threshold=0.55,finger_margin=0.05,landmark_source=None,events=None,layout=None):
+        self.__landmark_source = landmark_source
+        self.__layout = layout if layout is not None else UiLayout()
+        self.events = events
+        self.__num_fingers = 0
+        if(landmark_source is None):
+            ## mediapipe is imported here so importing this module stays cheap
+            import mediapipe as mp
+            self.__mpHand = mp.solutions.hands
+            self.__graph_options = {"static_image_mode":static_image_mode,"max_num_hands":max_num_hands,
+                                    "min_detection_confidence":min_detection_confidence,
+                                    "min_tracking_confidence":min_tracking_confidence}
+            self.__detector = self.__mpHand.Hands(**self.__graph_options)
+            self.__roi_detector = None
+            self.__mpDraw = mp.solutions.drawing_utils
+            self.__hand_connections = np.array(sorted(self.__mpHand.HAND_CONNECTIONS),dtype=np.intp)
+        else:
+            self.__detector = landmark_source
+            self.__hand_connections = np.asarray(landmark_source.connections,dtype=np.intp).reshape(-1,2)
         self.__hand_landmarks = []
+        self.__points = LandmarkSet.empty(21)
+        self.__overlay = overlay if overlay is not None else OverlayCompositor()
+        ## finger is up when extension crosses threshold+margin , down again below threshold-margin
+        self.__classifier = FingerStateClassifier(threshold=finger_threshold,margin=finger_margin)
+        self.__features = None
+        self.__features_points = None
+
 
+    def close(self):
+        """ release mediapipe graphs """
+        self.__detector.close()
+        if(self.__landmark_source is None and self.__roi_detector is not None):
+            self.__roi_detector.close()
+            self.__roi_detector = None
 
-    def find_hands(self,image):
+    def __roi_graph(self):
+        """ graph of ROI crops , every crop is detected as independent image """
+        if(self.__roi_detector is None):
+            self.__roi_detector = self.__mpHand.Hands(**dict(self.__graph_options,static_image_mode=True))
+        return self.__roi_detector
+
+    def reset(self):
+        """ forget hands of previous frames : new mediapipe graph (no tracking state) , finger states and cached features """
+        if(self.__landmark_source is None):
+            self.__detector.close()
+            self.__detector = self.__mpHand.Hands(**self.__graph_options)
+        self.__classifier.reset()
+        self.__features = None
+        self.__features_points = None
+        self.__num_fingers = 0
+
+    def find_hands(self,image,with_z=False,with_visibility=False,roi=None,scale=None):
 
         """
         Find hands landmark points in input image
+        return LandmarkSet , xy array of shape (n_hands,21,2)
+        (points[8] style indexing still gives (x,y) of flattened points)
+
+        roi :- [x1,y1,x2,y2] run detection only on this crop , points are mapped back to image coordinates
+        scale :- (sx,sy) , image is resized copy of display frame , points are multiplied by scale
         """
-        results = self.__detector.process(image)
-        all_points = []
-        self.__hand_landmarks = []
+        if(self.__landmark_source is not None):
+            self.__points = self.__landmark_source.detect(image,roi)
+            return self.__points
+        def detect(crop):
+            detector = self.__detector if roi is None else self.__roi_graph()
+            results = detector.process(crop)
+            h,w = crop.shape[:2]
+            self.__hand_landmarks = list(results.multi_hand_landmarks or [])
+            return landmarks_to_array(self.__hand_landmarks,w,h,21,with_z,with_visibility)
+        self.__points = detect_in_roi(detect,image,roi)
+        if(scale is not None):
+            self.__points.scale(*scale)
+        return self.__points
 
-        if results.multi_hand_landmarks:
-            for handLms in results.multi_hand_landmarks:
-                for id,lm in enumerate(handLms.landmark):
-                    h,w,c = image.shape
-                    cx,cy = int(lm.x*w) , int(lm.y*h)
-                    all_points.append([cx,cy])                    
-                self.__hand_landmarks.append(handLms)
-        return all_points
+    def draw_landmarks(self,image,all_points):
+        """ Draw hand skeleton from pixel landmark array (works for ROI detections too) """
+        xy = all_points.xy
+        if(not len(xy)):
+            return
+        lines = xy[:,self.__hand_connections].reshape(-1,2,1,2)
+        cv2.polylines(image,list(lines),False,(0,255,0),2)
+        for x,y in all_points.flat:
+            cv2.circle(image,(int(x),int(y)),3,(0,0,255),-1)
     
 
 
+    def features(self,all_points,ids=None):
+        """
+            HandFeatures of all hands with finger states and gestures
+            computed once per frame , calls with same LandmarkSet return cached features
+            (SmartVisionApp calls it every frame , so finger count changes are reported in every mode ,
+            also drop to 0 when hands are lost)
+
+            ids :- tracked hand ids (same order as hands) , finger state hysteresis is kept per hand id
+        """
+        if(all_points is not self.__features_points):
+            self.__features = self.__classifier.classify(HandFeatures(all_points),ids)
+            self.__features_points = all_points
+            up = self.__features.fingers_up
+            self.__report_fingers(int(up.sum()),up.astype(np.int32).ravel().tolist())
+        return self.__features
+
+    def count_fingers(self,all_points):
+        """
+            Count raised fingers of all detected hands
+            return 2 things :
+            1) num_fingers :- total raised fingers - int
+            2) fingers_up_flag :- 1/0 flag of every finger (5 per hand) - list
+        """
+        if(not isinstance(all_points,LandmarkSet)):
+            all_points = LandmarkSet(np.asarray(all_points,dtype=np.int32).reshape(-1,21,2))
+        up = self.features(all_points).fingers_up
+        return int(up.sum()),up.astype(np.int32).ravel().tolist()
+
+    def __report_fingers(self,num_fingers,fingers_up_flag):
+        """ emit event when number of raised fingers changes """
+        if(num_fingers!=self.__num_fingers):
+            if(self.events is not None):
+                self.events.emit(FingerCountChangedEvent(self.__num_fingers,num_fingers,fingers_up_flag))
+            self.__num_fingers = num_fingers
+
     def draw_fingers(self,image,all_points):
         """
             Draw detected hands landmark points
         """
-        num_fingers = 0
-        fingers_up_flag = []
-        for handLms in self.__hand_landmarks:
-            self.__mpDraw.draw_landmarks(image,handLms,self.__mpHand.HAND_CONNECTIONS)
-        if(len(all_points)):
-            for i1,i2 in self.__one_hand_distance_pairs:
-                if(euclidean(all_points[i1],all_points[i2]) >50):
-                    num_fingers+=1
-                    fingers_up_flag.append(1)
-                else:
-                    fingers_up_flag.append(0)
-
-            if(len(all_points)>21):
-                for i1,i2 in (21+self.__one_hand_distance_pairs):
-                    if(euclidean(all_points[i1],all_points[i2]) >50):
-                        num_fingers+=1
-                        fingers_up_flag.append(1)
-                    else:
-                        fingers_up_flag.append(0)                        
-        cv2.rectangle(image,(3,3),(180,40),(255,255,255),-1)
-        cv2.putText(image,f"Fingers : {num_fingers}",(10,20),cv2.FONT_HERSHEY_SIMPLEX, 0.6, (145,0 , 174), 2)
+        if(not isinstance(all_points,LandmarkSet)):
+            all_points = LandmarkSet(np.asarray(all_points,dtype=np.int32).reshape(-1,21,2))
+        self.draw_landmarks(image,all_points)
+        num_fingers,fingers_up_flag = self.count_fingers(all_points)
+        panel = self.__layout.rect("fingers_panel",image.shape)
+        scale = UiLayout.text_scale(image.shape)
+        self.__overlay.apply(image,"fingers_panel",lambda layer: layer.rectangle(panel[0],panel[1],(255,255,255),-1))
+        cv2.putText(image,f"Fingers : {num_fingers}",(panel[0][0]+int(7*scale),panel[0][1]+int(17*scale)),cv2.FONT_HERSHEY_SIMPLEX, 0.6*scale, (145,0 , 174), max(1,int(round(2*scale))))
         return image
 
 
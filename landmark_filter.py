@@ -0,0 +1,169 @@
+import numpy as np
+from time import time
+from landmarks import LandmarkSet
+
+
+def _alpha(dt,cutoff):
+    """ smoothing factor of exponential filter for time step dt and cutoff frequency (Hz) """
+    tau = 1.0/(2*np.pi*cutoff)
+    return 1.0/(1.0+tau/dt)
+
+
+class OneEuroFilter:
+    """ Vectorized One-Euro filter , smooths whole landmark array (any shape , e.g. (n,21,2)) at once
+
+        slow movements are smoothed strongly (min_cutoff) , fast movements follow input
+        closely (beta) so jitter is removed without visible lag.
+        Keeps derivative , so predict(t) extrapolates landmarks for frames without inference
+
+        min_cutoff :- minimum cutoff frequency (Hz) , lower means smoother - float
+        beta :- speed coefficient , higher means less lag on fast movement - float
+        d_cutoff :- cutoff frequency of derivative - float
+    """
+    def __init__(self,min_cutoff=1.0,beta=0.05,d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.__x = None
+        self.__dx = None
+        self.__t = None
+
+    @property
+    def initialized(self):
+        return self.__x is not None
+
+    def __call__(self,x,t):
+        x = np.asarray(x,dtype=np.float32)
+        if(self.__x is None or self.__x.shape!=x.shape):
+            self.__x = x.copy()
+            self.__dx = np.zeros_like(x)
+            self.__t = t
+            return self.__x.copy()
+        dt = max(t-self.__t,1e-3)
+        dx = (x-self.__x)/dt
+        a_d = _alpha(dt,self.d_cutoff)
+        self.__dx = a_d*dx+(1-a_d)*self.__dx
+        cutoff = self.min_cutoff+self.beta*np.abs(self.__dx)
+        a = _alpha(dt,cutoff)
+        self.__x = a*x+(1-a)*self.__x
+        self.__t = t
+        return self.__x.copy()
+
+    def predict(self,t,max_horizon=0.2):
+        """ extrapolate last filtered value with filtered velocity (at most max_horizon seconds ahead) """
+        if(self.__x is None):
+            return None
+        horizon = min(max(t-self.__t,0.0),max_horizon)
+        return self.__x+self.__dx*horizon
+
+
+def hysteresis(values,active,on,off,above=True):
+    """ Vectorized two threshold switch
+
+        above=True :- becomes active when value > on , stays active until value <= off (off < on)
+        above=False :- becomes active when value < on , stays active until value >= off (off > on)
+        return new active state (bool array of values shape)
+    """
+    values = np.asarray(values)
+    active = np.asarray(active,dtype=bool)
+    if(above):
+        return np.where(active,values>off,values>on)
+    return np.where(active,values<off,values<on)
+
+
+class Hysteresis:
+    """ hysteresis() with kept state , state resets when shape of values changes """
+    def __init__(self,on,off,above=True):
+        self.on = on
+        self.off = off
+        self.above = above
+        self.__active = None
+
+    def update(self,values):
+        values = np.asarray(values)
+        if(self.__active is None or self.__active.shape!=values.shape):
+            self.__active = np.zeros(values.shape,dtype=bool)
+        self.__active = hysteresis(values,self.__active,self.on,self.off,self.above)
+        return self.__active
+
+    def reset(self):
+        self.__active = None
+
+
+class LandmarkSmoother:
+    """ Smooth LandmarkSet of every frame and fill frames where inference is skipped
+
+        infer_every :- run inference once in this many frames (1 = every frame) - int
+        smooth :- return filtered landmarks , False returns raw detections
+                  (filter still runs so skipped frames can be predicted) - bool
+
+        ids (face ids , tracked hand ids) keep filter state of every object : when same objects come
+        in other order filter state follows them , when set of ids changes filter restarts
+
+        usage:
+            if(smoother.should_infer()):
+                points = smoother.update(detector.find_hands(image))
+            else:
+                points = smoother.predict()
+    """
+    def __init__(self,infer_every=1,smooth=True,min_cutoff=1.0,beta=0.05,d_cutoff=1.0,max_horizon=0.2):
+        self.infer_every = infer_every
+        self.smooth = smooth
+        self.max_horizon = max_horizon
+        self.__filter = OneEuroFilter(min_cutoff,beta,d_cutoff)
+        self.__frame = 0
+        self.__ids = None
+        self.__order = None
+        self.__last = None
+
+    def should_infer(self):
+        """ True when inference has to run on current frame (call once per frame) """
+        infer = self.__last is None or self.__last.count==0 or self.__frame%max(1,self.infer_every)==0
+        self.__frame+=1
+        return infer
+
+    def update(self,landmarks,t=None,ids=None):
+        """ filter new detection , return smoothed LandmarkSet (int32 coordinates)
+            ids :- optional object ids (face ids , hand ids) , filter restarts when set of ids changes
+        """
+        t = time() if t is None else t
+        ids = None if ids is None else list(ids)
+        self.__order = None
+        if(landmarks.count and ids is not None and self.__ids is not None and ids!=self.__ids and sorted(ids)==sorted(self.__ids)):
+            ## same objects in other order , filter keeps its object order
+            self.__order = np.array([ids.index(object_id) for object_id in self.__ids],dtype=np.intp)
+        else:
+            if(ids!=self.__ids or not landmarks.count):
+                self.__filter.reset()
+            self.__ids = ids
+        if(not landmarks.count):
+            self.__last = landmarks
+            return landmarks
+        smoothed = self.__filter(landmarks.xy if self.__order is None else landmarks.xy[self.__order],t)
+        if(self.__order is not None):
+            smoothed = smoothed[np.argsort(self.__order)]
+        if(self.smooth):
+            self.__last = LandmarkSet(np.rint(smoothed).astype(np.int32),landmarks.z,landmarks.visibility)
+        else:
+            self.__last = landmarks
+        return self.__last
+
+    def predict(self,t=None):
+        """ return landmarks extrapolated to time t (last landmarks when nothing can be predicted) """
+        t = time() if t is None else t
+        predicted = self.__filter.predict(t,self.max_horizon)
+        if(predicted is None or self.__last is None):
+            return self.__last
+        if(self.__order is not None):
+            predicted = predicted[np.argsort(self.__order)]
+        return LandmarkSet(np.rint(predicted).astype(np.int32),self.__last.z,self.__last.visibility)
+
+    def reset(self):
+        self.__filter.reset()
+        self.__ids = None
+        self.__order = None
+        self.__last = None
+        self.__frame = 0
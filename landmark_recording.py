@@ -0,0 +1,304 @@
+import os
+import json
+import struct
+import numpy as np
+from time import time
+from landmarks import LandmarkSet
+
+## file layout (little endian):
+##   header  : magic , version , frame width , frame height , metadata length , metadata json (padded to 8 bytes)
+##   records : timestamp (f64) , frame index (u32) , n_hands (u16) , n_faces (u16) ,
+##             hand xy (n_hands,21,2) int16 , face xy (n_faces,468,2) int16 , padded to 8 bytes
+##   index   : record offsets (u64 each) , index offset (u64) , number of records (u64) , index magic
+## index is written by close() , recording cut by crash is still readable (records are scanned)
+MAGIC = b"SVLANDMK"
+INDEX_MAGIC = b"SVLINDEX"
+VERSION = 1
+HAND_POINTS = 21
+FACE_POINTS = 468
+_HEADER = struct.Struct("<8sIIII")
+_RECORD = struct.Struct("<dIHH")
+_TRAILER = struct.Struct("<QQ8s")
+
+
+def _padding(size):
+    return (-size)%8
+
+
+class LandmarkRecorder:
+    """ Stream per frame hand / face landmarks into compact binary recording
+
+        every write() appends one record directly to file , nothing is kept in memory
+        except record offsets (8 bytes per frame) which are written as index by close()
+
+        path :- output file - str
+        width , height :- frame size of recorded session - int
+        meta :- extra json metadata (e.g. landmark connections used for drawing) - dict
+    """
+    def __init__(self,path,width,height,meta=None):
+        self.path = path
+        self.__file = open(path,"wb")
+        meta_bytes = json.dumps(meta or {}).encode()
+        self.__file.write(_HEADER.pack(MAGIC,VERSION,width,height,len(meta_bytes)))
+        self.__file.write(meta_bytes+b"\0"*_padding(_HEADER.size+len(meta_bytes)))
+        self.__offsets = []
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    def write(self,hands,faces,timestamp=None):
+        """ Takes 3 parameters:
+            1) hands :- LandmarkSet of hands (or (n,21,2) array) , None when hands were not detected
+            2) faces :- LandmarkSet of faces (or (n,468,2) array) , None when faces were not detected
+            3) timestamp :- capture time of frame (default current time) - float
+        """
+        hands = np.empty((0,HAND_POINTS,2)) if hands is None else np.asarray(getattr(hands,"xy",hands))
+        faces = np.empty((0,FACE_POINTS,2)) if faces is None else np.asarray(getattr(faces,"xy",faces))
+        self.__offsets.append(self.__file.tell())
+        payload = hands.astype("<i2").tobytes()+faces.astype("<i2").tobytes()
+        self.__file.write(_RECORD.pack(time() if timestamp is None else timestamp,len(self.__offsets)-1,len(hands),len(faces)))
+        self.__file.write(payload+b"\0"*_padding(len(payload)))
+
+    def close(self):
+        if(self.__file.closed):
+            return
+        index_offset = self.__file.tell()
+        self.__file.write(np.asarray(self.__offsets,dtype="<u8").tobytes())
+        self.__file.write(_TRAILER.pack(index_offset,len(self.__offsets),INDEX_MAGIC))
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+        return False
+
+
+class LandmarkRecording:
+    """ Memory mapped reader of LandmarkRecorder files
+
+        file is mapped once , landmarks of a frame are read straight from mapping
+        (only int16 -> int32 conversion of that frame is copied)
+
+        recording[i] returns (timestamp , hands LandmarkSet , faces LandmarkSet)
+    """
+    def __init__(self,path):
+        self.path = path
+        self.__data = np.memmap(path,dtype=np.uint8,mode="r")
+        magic,version,self.width,self.height,meta_length = _HEADER.unpack_from(self.__data,0)
+        if(magic!=MAGIC or version!=VERSION):
+            raise ValueError(f"{path} is not a landmark recording (version {VERSION})")
+        self.meta = json.loads(bytes(self.__data[_HEADER.size:_HEADER.size+meta_length]).decode() or "{}")
+        self.__first = _HEADER.size+meta_length+_padding(_HEADER.size+meta_length)
+        self.__offsets = self.__read_index()
+        self.__headers = [_RECORD.unpack_from(self.__data,offset) for offset in self.__offsets]
+        self.timestamps = np.array([header[0] for header in self.__headers],dtype=np.float64)
+
+    def __read_index(self):
+        """ record offsets from index , or by scanning records when index is missing """
+        size = len(self.__data)
+        if(size>=self.__first+_TRAILER.size):
+            index_offset,count,magic = _TRAILER.unpack_from(self.__data,size-_TRAILER.size)
+            if(magic==INDEX_MAGIC and index_offset+count*8+_TRAILER.size==size):
+                return np.frombuffer(self.__data,dtype="<u8",count=count,offset=index_offset).astype(np.int64)
+        offsets = []
+        offset = self.__first
+        while offset+_RECORD.size<=size:
+            _,_,n_hands,n_faces = _RECORD.unpack_from(self.__data,offset)
+            payload = (n_hands*HAND_POINTS+n_faces*FACE_POINTS)*4
+            end = offset+_RECORD.size+payload+_padding(payload)
+            if(end>size):
+                break
+            offsets.append(offset)
+            offset = end
+        return np.array(offsets,dtype=np.int64)
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    @property
+    def duration(self):
+        return float(self.timestamps[-1]-self.timestamps[0]) if len(self) else 0.0
+
+    def __landmarks(self,offset,count,num_points):
+        view = np.frombuffer(self.__data,dtype="<i2",count=count*num_points*2,offset=offset)
+        return LandmarkSet(view.reshape(count,num_points,2).astype(np.int32))
+
+    def __getitem__(self,index):
+        offset = int(self.__offsets[index])
+        timestamp,_,n_hands,n_faces = self.__headers[index]
+        start = offset+_RECORD.size
+        hands = self.__landmarks(start,n_hands,HAND_POINTS)
+        faces = self.__landmarks(start+n_hands*HAND_POINTS*4,n_faces,FACE_POINTS)
+        return timestamp,hands,faces
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ReplayLandmarkSource:
+    """ Stand in for mediapipe inference of HandDetector / FaceAnalyzer (landmark_source parameter)
+        detect() returns recorded landmarks of frame currently selected in LandmarkReplay
+    """
+    def __init__(self,replay,kind,connections=()):
+        self.__replay = replay
+        self.__kind = kind
+        self.connections = np.array(connections,dtype=np.intp).reshape(-1,2)
+
+    def detect(self,image,roi=None):
+        """ recorded landmarks are in whole frame coordinates , roi is ignored """
+        return self.__replay.landmarks(self.__kind)
+
+    def close(self):
+        pass
+
+
+class LandmarkReplay:
+    """ Drive SmartVisionApp from LandmarkRecording at full speed without camera or mediapipe
+
+        usage:
+            replay = LandmarkReplay(LandmarkRecording("session.svlr"))
+            app = SmartVisionApp(model_registry=replay.model_registry())
+            for frame in replay.frames():
+                app.process(frame,timestamp=replay.timestamp)
+
+        frames() selects recorded frame , hand and face detectors of registry return landmarks
+        of selected frame , so replay stays in sync even when some detectors don't run on every frame.
+        Recorded timestamp is passed to process() so landmark smoothing gives same output on every replay
+
+        with FramePipeline capture runs ahead of processing , so frame is selected on processing thread:
+            FramePipeline(replay.source(),replay.synced(app.process),queue_size=2,drop_stale=False)
+    """
+    def __init__(self,recording,loop=False):
+        self.recording = recording
+        self.loop = loop
+        self.__index = -1
+        self.__hands = LandmarkSet.empty(HAND_POINTS)
+        self.__faces = LandmarkSet.empty(FACE_POINTS)
+        self.timestamp = None
+
+    def seek(self,index):
+        """ select recorded frame index , return its timestamp """
+        self.__index = index
+        self.timestamp,self.__hands,self.__faces = self.recording[index]
+        return self.timestamp
+
+    def landmarks(self,kind):
+        ## detectors may draw on / shift returned landmarks , give them a copy
+        points = self.__hands if kind=="hands" else self.__faces
+        return LandmarkSet(points.xy.copy())
+
+    def hand_source(self):
+        return ReplayLandmarkSource(self,"hands",self.recording.meta.get("hand_connections",()))
+
+    def face_source(self):
+        return ReplayLandmarkSource(self,"faces",self.recording.meta.get("face_connections",()))
+
+    def model_registry(self,max_num_faces=1):
+        """ ModelRegistry with replay backed "hands" and "face" models (never released) """
+        from model_registry import ModelRegistry
+        from hand_landmark_detection import HandDetector
+        from face_landmark_detection import FaceAnalyzer
+        registry = ModelRegistry(idle_timeout=None)
+        registry.register("hands",lambda: HandDetector(landmark_source=self.hand_source()),releasable=False)
+        registry.register("face",lambda: FaceAnalyzer(max_num_faces=max_num_faces,landmark_source=self.face_source()),releasable=False)
+        return registry
+
+    def frames(self):
+        """ yield blank frame of recorded size for every recorded frame (selects frame before yield) """
+        while True:
+            for i in range(len(self.recording)):
+                self.seek(i)
+                yield np.zeros((self.recording.height,self.recording.width,3),dtype=np.uint8)
+            if(not self.loop or not len(self.recording)):
+                break
+
+    def source(self):
+        """ FramePipeline source giving blank frame per recorded frame (use together with synced()) """
+        return _ReplayFrameSource(self.recording,self.loop)
+
+    def synced(self,process_fn):
+        """ wrap process_fn(frame , timestamp=...) so every call selects next recorded frame first
+            and passes its recorded timestamp (pipeline must keep all frames , drop_stale=False)
+        """
+        counter = [0]
+        def process(frame):
+            timestamp = self.seek(counter[0]%len(self.recording))
+            counter[0]+=1
+            return process_fn(frame,timestamp=timestamp)
+        return process
+
+
+class _ReplayFrameSource:
+    def __init__(self,recording,loop):
+        self.__shape = (recording.height,recording.width,3)
+        self.__remaining = None if loop else len(recording)
+
+    def read(self):
+        if(self.__remaining is not None):
+            if(self.__remaining<=0):
+                return None
+            self.__remaining-=1
+        return np.zeros(self.__shape,dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+### driver code
+### record : python landmark_recording.py record session.svlr --frames 600
+### replay : python landmark_recording.py replay session.svlr
+
+if __name__=="__main__":
+    import argparse
+    import cv2
+    parser = argparse.ArgumentParser(description="Record webcam landmarks / replay them through SmartVisionApp")
+    parser.add_argument("command",choices=["record","replay"])
+    parser.add_argument("path",help="recording file")
+    parser.add_argument("--frames",type=int,default=600,help="number of frames to record")
+    parser.add_argument("--max-faces",type=int,default=1)
+    parser.add_argument("--repeat",type=int,default=1,help="replay recording this many times")
+    args = parser.parse_args()
+
+    if(args.command=="record"):
+        import mediapipe as mp
+        from frame_pipeline import CameraSource
+        from hand_landmark_detection import HandDetector
+        from face_landmark_detection import FaceAnalyzer
+        source = CameraSource(0,640,480)
+        hand_detector = HandDetector(min_detection_confidence=0.7,min_tracking_confidence=0.7)
+        face_analyzer = FaceAnalyzer(max_num_faces=args.max_faces)
+        meta = {"hand_connections":sorted(mp.solutions.hands.HAND_CONNECTIONS),
+                "face_connections":sorted(mp.solutions.face_mesh.FACEMESH_CONTOURS)}
+        frame = source.read()
+        with LandmarkRecorder(args.path,frame.shape[1],frame.shape[0],meta) as recorder:
+            while frame is not None and len(recorder)<args.frames:
+                t = time()
+                hands = hand_detector.find_hands(frame)
+                faces = face_analyzer.get_face_points(frame)
+                recorder.write(hands,faces,t)
+                hand_detector.draw_landmarks(frame,hands)
+                cv2.putText(frame,f"REC {len(recorder)}/{args.frames}",(20,30),cv2.FONT_HERSHEY_SIMPLEX,0.7,(0,0,255),2)
+                cv2.imshow("record",frame)
+                if(cv2.waitKey(1)==27):
+                    break
+                frame = source.read()
+        source.release()
+        print(f"recorded {len(recorder)} frames into {args.path} ({os.path.getsize(args.path)} bytes)")
+    else:
+        from smart_vision_app import SmartVisionApp
+        from profiler import Profiler
+        recording = LandmarkRecording(args.path)
+        profiler = Profiler(enabled=True)
+        replay = LandmarkReplay(recording)
+        app = SmartVisionApp(model_registry=replay.model_registry(args.max_faces),profiler=profiler)
+        st = time()
+        for _ in range(args.repeat):
+            for frame in replay.frames():
+                app.process(frame,timestamp=replay.timestamp)
+        elapsed = time()-st
+        frames = len(recording)*args.repeat
+        print(f"replayed {frames} frames in {elapsed:.3f} s ({frames/max(elapsed,1e-9):.1f} fps)")
+        print(profiler.prometheus_text())
@@ -0,0 +1,104 @@
+import numpy as np
+from itertools import chain
+
+
+class LandmarkSet:
+    """ Landmark points of all detected hands / faces of one frame
+
+        xy :- (n_objects , N , 2) int32 pixel coordinates
+        z :- (n_objects , N) float32 relative depth (optional)
+        visibility :- (n_objects , N) float32 (optional)
+
+        Keep old list style indexing working:
+        points[8] returns (x,y) tuple of 8th point of flattened points (first hand/face),
+        points[29] returns 8th point of second hand etc, len(points) gives total number of points
+    """
+    __slots__ = ("xy","z","visibility")
+
+    def __init__(self,xy,z=None,visibility=None):
+        self.xy = xy
+        self.z = z
+        self.visibility = visibility
+
+    @classmethod
+    def empty(cls,num_points):
+        return cls(np.empty((0,num_points,2),dtype=np.int32))
+
+    @property
+    def count(self):
+        """ number of detected hands / faces """
+        return self.xy.shape[0]
+
+    @property
+    def flat(self):
+        """ (n_objects*N , 2) view of all points """
+        return self.xy.reshape(-1,2)
+
+    def shift(self,dx,dy):
+        """ move all points by (dx,dy) in place , used to map ROI coordinates back to frame """
+        if(dx or dy):
+            self.xy+=np.array([dx,dy],dtype=self.xy.dtype)
+        return self
+
+    def scale(self,sx,sy):
+        """ multiply all points by (sx,sy) in place , used to map inference resolution back to frame """
+        if(sx!=1 or sy!=1):
+            xy = self.xy*np.array([sx,sy],dtype=np.float32)
+            np.rint(xy,out=xy)
+            self.xy[:] = xy
+        return self
+
+    def __len__(self):
+        return self.xy.shape[0]*self.xy.shape[1]
+
+    def __getitem__(self,index):
+        if(isinstance(index,(int,np.integer))):
+            x,y = self.flat[index]
+            return (int(x),int(y))
+        return self.flat[index]
+
+    def __iter__(self):
+        for x,y in self.flat:
+            yield (int(x),int(y))
+
+    def __array__(self,dtype=None,copy=None):
+        flat = self.flat
+        return flat if dtype is None else flat.astype(dtype)
+
+
+def detect_in_roi(detect_fn,image,roi):
+    """ run detect_fn(image) -> LandmarkSet on ROI crop [x1,y1,x2,y2] of image (whole image when roi is None)
+        and return landmarks in coordinates of whole image
+    """
+    if(roi is None):
+        return detect_fn(image)
+    x1,y1,x2,y2 = roi
+    return detect_fn(np.ascontiguousarray(image[y1:y2,x1:x2])).shift(x1,y1)
+
+
+def landmarks_to_array(multi_landmarks,width,height,num_points,with_z=False,with_visibility=False):
+    """ Convert mediapipe landmark lists (results.multi_hand_landmarks / multi_face_landmarks)
+        into LandmarkSet
+
+        Normalized values of all points are read in one pass into preallocated buffer and
+        scaled to pixel coordinates in one vectorized step
+    """
+    if(not multi_landmarks):
+        return LandmarkSet.empty(num_points)
+    n = len(multi_landmarks)
+    num_points = len(multi_landmarks[0].landmark)
+    channels = 4 if with_visibility else 3
+    raw = np.empty((n,num_points,channels),dtype=np.float64)
+    flat_raw = raw.reshape(-1)
+    if(channels==4):
+        values = chain.from_iterable((lm.x,lm.y,lm.z,lm.visibility) for lms in multi_landmarks for lm in lms.landmark)
+    else:
+        values = chain.from_iterable((lm.x,lm.y,lm.z) for lms in multi_landmarks for lm in lms.landmark)
+    flat_raw[:] = np.fromiter(values,dtype=np.float64,count=flat_raw.size)
+    xy = np.empty((n,num_points,2),dtype=np.int32)
+    raw[...,0]*=width
+    raw[...,1]*=height
+    xy[:] = raw[...,:2]
+    return LandmarkSet(xy,
+                        raw[...,2].astype(np.float32) if with_z else None,
+                        raw[...,3].astype(np.float32) if with_visibility else None)
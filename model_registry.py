@@ -0,0 +1,117 @@
+import os
+from time import time
+
+
+def resident_memory():
+    """ return resident memory of current process in bytes (None when it can't be measured) """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+    except (OSError,ValueError,IndexError,AttributeError):
+        pass
+    try:
+        import resource
+        ## peak resident size , kilobytes on linux and bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if os.uname().sysname=="Darwin" else rss*1024
+    except (ImportError,AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """ Build detectors (HandDetector , FaceAnalyzer etc) lazily when they are used first time
+        and release them when they stay unused for idle_timeout seconds
+
+        factories are zero argument functions , heavy imports (mediapipe) can be done inside factory
+        so they are deferred until model is needed
+
+        idle_timeout :- seconds after which unused model is released , None means never release - float
+
+        models loaded with warm=True (built ahead of use , see startup.py) are not released
+        before they are used first time
+    """
+    def __init__(self,idle_timeout=60.0):
+        self.idle_timeout = idle_timeout
+        self.__factories = {}
+        self.__models = {}
+        self.__last_used = {}
+        self.__stats = {}
+        self.__warm = set()
+
+    def register(self,name,factory,releasable=True):
+        """ Takes 3 parameters:
+            1) name :- name of model - str
+            2) factory :- function which builds model - callable
+            3) releasable :- release model when it stays idle - bool
+        """
+        self.__factories[name] = (factory,releasable)
+        self.__stats.setdefault(name,{"loaded":False,"builds":0,"releases":0,"build_time":None,"memory_delta":None})
+
+    def get(self,name):
+        """ return model , build it first when it is not loaded """
+        model = self.__models.get(name)
+        if(model is None):
+            model = self.load(name)
+        self.__warm.discard(name)
+        self.__last_used[name] = time()
+        return model
+
+    def load(self,name,warm=False):
+        """ build model (if not loaded) and record build time and resident memory growth
+            warm :- model is built ahead of use , keep it until first get() - bool
+        """
+        if(warm):
+            self.__warm.add(name)
+        if(name in self.__models):
+            return self.__models[name]
+        factory,_ = self.__factories[name]
+        memory_before = resident_memory()
+        st = time()
+        model = factory()
+        build_time = time()-st
+        memory_after = resident_memory()
+        stats = self.__stats[name]
+        stats["loaded"] = True
+        stats["builds"]+=1
+        stats["build_time"] = build_time
+        stats["memory_delta"] = memory_after-memory_before if (memory_before is not None and memory_after is not None) else None
+        self.__models[name] = model
+        self.__last_used[name] = time()
+        return model
+
+    def is_loaded(self,name):
+        return name in self.__models
+
+    def release(self,name):
+        """ drop model (close underlying graph when model has close method) """
+        model = self.__models.pop(name,None)
+        if(model is None):
+            return False
+        if(hasattr(model,"close")):
+            model.close()
+        self.__last_used.pop(name,None)
+        self.__warm.discard(name)
+        self.__stats[name]["loaded"] = False
+        self.__stats[name]["releases"]+=1
+        return True
+
+    def release_idle(self,now=None):
+        """ release all releasable models unused for idle_timeout seconds , return released names """
+        if(self.idle_timeout is None):
+            return []
+        now = time() if now is None else now
+        released = []
+        for name in list(self.__models):
+            if(self.__factories[name][1] and name not in self.__warm and now-self.__last_used.get(name,now)>self.idle_timeout):
+                self.release(name)
+                released.append(name)
+        return released
+
+    def stats(self):
+        """ return {name : {loaded , builds , releases , build_time (s) , memory_delta (bytes) , idle_for (s)}} """
+        now = time()
+        stats = {}
+        for name,values in self.__stats.items():
+            stats[name] = dict(values)
+            stats[name]["idle_for"] = now-self.__last_used[name] if name in self.__last_used else None
+        return stats
@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+from time import time
+
+
+class MotionGate:
+    """ Decide whether scene changed enough to run landmark inference
+
+        frame is downscaled to width pixels and converted to grayscale , compared with running
+        average background (cv2.accumulateWeighted). Frame is static when fraction of pixels
+        differing from background by more than pixel_threshold is below min_changed ,
+        on static frames cached landmarks are reused and detectors are not called
+
+        width :- width of downscaled gray frame - int
+        pixel_threshold :- gray level difference counted as changed pixel - int
+        min_changed :- fraction of changed pixels needed to report motion - float
+        alpha :- background update rate (higher adapts faster to lighting changes) - float
+        refresh_every :- force inference after this many static frames , None disables - int
+    """
+    def __init__(self,width=80,pixel_threshold=15,min_changed=0.002,alpha=0.05,refresh_every=60):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.alpha = alpha
+        self.refresh_every = refresh_every
+        self.moving = True
+        self.changed_fraction = 1.0
+        self.__small = None
+        self.__background = None
+        self.__static = 0
+        self.__frames = 0
+        self.__static_frames = 0
+        self.__gate_time = 0.0
+        self.__inference_time = {}
+        self.__detectors = {}
+
+    def __buffers(self,shape):
+        h,w = shape[:2]
+        size = (self.width,max(1,int(round(h*self.width/w))))
+        if(self.__small is None or self.__small.shape[:2]!=(size[1],size[0])):
+            self.__small = np.empty((size[1],size[0],3),dtype=np.uint8)
+            self.__gray = np.empty((size[1],size[0]),dtype=np.uint8)
+            self.__diff = np.empty_like(self.__gray)
+            self.__background_gray = np.empty_like(self.__gray)
+            self.__background = None
+        return size
+
+    def update(self,image):
+        """ Takes 1 parameter:
+            1) image :- BGR frame
+
+            update background with frame and return True when inference has to run (motion or refresh)
+        """
+        st = time()
+        size = self.__buffers(image.shape)
+        cv2.resize(image,size,dst=self.__small,interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.__small,cv2.COLOR_BGR2GRAY,dst=self.__gray)
+        if(self.__background is None):
+            self.__background = self.__gray.astype(np.float32)
+            self.changed_fraction = 1.0
+        else:
+            cv2.convertScaleAbs(self.__background,dst=self.__background_gray)
+            cv2.absdiff(self.__gray,self.__background_gray,dst=self.__diff)
+            cv2.threshold(self.__diff,self.pixel_threshold,255,cv2.THRESH_BINARY,dst=self.__diff)
+            self.changed_fraction = cv2.countNonZero(self.__diff)/self.__diff.size
+            cv2.accumulateWeighted(self.__gray,self.__background,self.alpha)
+        moving = self.changed_fraction>=self.min_changed
+        if(moving):
+            self.__static = 0
+        else:
+            self.__static+=1
+            ## landmarks are refreshed now and then (slow drift is absorbed by background)
+            if(self.refresh_every is not None and self.__static>=self.refresh_every):
+                self.__static = 0
+                moving = True
+        self.__frames+=1
+        if(not moving):
+            self.__static_frames+=1
+        self.moving = moving
+        self.__gate_time+=time()-st
+        return moving
+
+    def report(self,detector,elapsed):
+        """ inference of detector ran in elapsed seconds (its running average estimates time saved by skips) """
+        previous = self.__inference_time.get(detector)
+        self.__inference_time[detector] = elapsed if previous is None else 0.9*previous+0.1*elapsed
+        self.__detectors.setdefault(detector,{"inferences":0,"skipped":0,"time_saved":0.0})["inferences"]+=1
+
+    def skip(self,detector):
+        """ inference of detector was skipped on static frame """
+        stats = self.__detectors.setdefault(detector,{"inferences":0,"skipped":0,"time_saved":0.0})
+        stats["skipped"]+=1
+        stats["time_saved"]+=self.__inference_time.get(detector,0.0)
+
+    def reset(self):
+        """ forget background , next frame is treated as motion """
+        self.__background = None
+        self.__static = 0
+
+    def stats(self):
+        """ return dict with frames , static_frames , skip_rate , gate_time (s) , time_saved (s) ,
+            net_time_saved (time_saved - gate_time) and per detector {inferences , skipped , time_saved}
+        """
+        time_saved = sum(stats["time_saved"] for stats in self.__detectors.values())
+        return {"frames":self.__frames,"static_frames":self.__static_frames,
+                "skip_rate":self.__static_frames/self.__frames if self.__frames else 0.0,
+                "gate_time":self.__gate_time,"time_saved":time_saved,"net_time_saved":time_saved-self.__gate_time,
+                "detectors":{name:dict(stats) for name,stats in self.__detectors.items()}}
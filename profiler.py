@@ -0,0 +1,124 @@
+import json
+import numpy as np
+from collections import deque
+from time import perf_counter, time
+
+
+class _NullSpan:
+    """ span used when profiler is disabled , does nothing """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler","name","start")
+
+    def __init__(self,profiler,name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self,*exc):
+        self.profiler.record(self.name,perf_counter()-self.start)
+        return False
+
+
+class Profiler:
+    """ Hot path instrumentation of SmartVisionApp
+
+        named spans (capture , hand_inference , face_inference , filter , overlay , display) are
+        measured with:
+            with profiler.span("hand_inference"):
+                ...
+        durations are kept per operation mode in rolling windows , p50/p95/p99 are computed on demand ,
+        count and sum of all durations since start (or reset) are kept next to window (Prometheus _count / _sum)
+        When disabled span() returns shared no-op object , so instrumentation costs one attribute check
+
+        enabled :- record spans - bool
+        window :- number of latest samples kept per (mode , span) - int
+    """
+    QUANTILES = (50,95,99)
+
+    def __init__(self,enabled=True,window=1000):
+        self.enabled = enabled
+        self.mode = "home"
+        self.__window = window
+        self.__samples = {}
+        self.__totals = {}
+
+    def span(self,name):
+        if(not self.enabled):
+            return NULL_SPAN
+        return _Span(self,name)
+
+    def record(self,name,duration,mode=None):
+        """ add one duration (seconds) of span name , mode defaults to current mode """
+        key = (self.mode if mode is None else mode,name)
+        samples = self.__samples.get(key)
+        if(samples is None):
+            samples = self.__samples.setdefault(key,deque(maxlen=self.__window))
+            self.__totals[key] = [0,0.0]
+        samples.append(duration)
+        totals = self.__totals[key]
+        totals[0]+=1
+        totals[1]+=duration
+
+    def reset(self):
+        self.__samples = {}
+        self.__totals = {}
+
+    def summary(self):
+        """ return {mode : {span : {count , mean , p50 , p95 , p99 , total_count , total_sum}}} (seconds)
+            count , mean and quantiles are of rolling window , total_count and total_sum of all durations
+        """
+        summary = {}
+        for (mode,name),samples in list(self.__samples.items()):
+            values = np.fromiter(samples,dtype=np.float64)
+            if(not len(values)):
+                continue
+            p50,p95,p99 = np.percentile(values,Profiler.QUANTILES)
+            total_count,total_sum = self.__totals[(mode,name)]
+            summary.setdefault(mode,{})[name] = {"count":len(values),"mean":float(values.mean()),
+                                                 "p50":float(p50),"p95":float(p95),"p99":float(p99),
+                                                 "total_count":total_count,"total_sum":total_sum}
+        return summary
+
+    def export_jsonl(self,file):
+        """ write one json line per (mode , span) into file path or file object """
+        timestamp = time()
+        lines = []
+        for mode,spans in self.summary().items():
+            for name,values in spans.items():
+                lines.append(json.dumps(dict(values,timestamp=timestamp,mode=mode,span=name)))
+        text = "\n".join(lines)+("\n" if lines else "")
+        if(hasattr(file,"write")):
+            file.write(text)
+        else:
+            with open(file,"a") as f:
+                f.write(text)
+
+    def prometheus_text(self,prefix="smart_vision_span_seconds"):
+        """ return summaries in Prometheus text exposition format
+            (quantiles of rolling window , monotonic _sum and _count of all durations)
+        """
+        lines = [f"# HELP {prefix} Latency of SmartVisionApp stages per mode",f"# TYPE {prefix} summary"]
+        for mode,spans in self.summary().items():
+            for name,values in spans.items():
+                labels = f'mode="{mode}",span="{name}"'
+                for q in Profiler.QUANTILES:
+                    lines.append(f'{prefix}{{{labels},quantile="{q/100}"}} {values[f"p{q}"]:.6f}')
+                lines.append(f"{prefix}_sum{{{labels}}} {values['total_sum']:.6f}")
+                lines.append(f"{prefix}_count{{{labels}}} {values['total_count']}")
+        return "\n".join(lines)+"\n"
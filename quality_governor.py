@@ -0,0 +1,64 @@
+import numpy as np
+from collections import deque
+
+## quality levels from best to fastest , each level sets
+## inference_scale (detector input size / display size) , cartoon filter tier and detector frequency (infer_every)
+LEVELS = [
+    {"inference_scale":1.0,"cartoon_quality":"quality","infer_every":1},
+    {"inference_scale":0.75,"cartoon_quality":"balanced","infer_every":1},
+    {"inference_scale":0.5,"cartoon_quality":"balanced","infer_every":1},
+    {"inference_scale":0.5,"cartoon_quality":"realtime","infer_every":2},
+    {"inference_scale":0.35,"cartoon_quality":"realtime","infer_every":3},
+]
+
+
+class QualityGovernor:
+    """ Hold target FPS by moving quality level (LEVELS) down when frames are too slow
+        and up again when there is enough headroom
+
+        decision uses median frame time of last window frames , window is cleared after every
+        change so next move is decided only by frames measured at new level
+
+        target_fps :- frame rate to hold - float
+        window :- number of frame times used for decision - int
+        headroom :- step up only when median frame time < headroom * frame budget - float
+        level :- starting level index - int
+    """
+    def __init__(self,target_fps=30.0,levels=None,window=30,headroom=0.6,level=0):
+        self.target_fps = target_fps
+        self.levels = LEVELS if levels is None else levels
+        self.headroom = headroom
+        self.level = level
+        self.__times = deque(maxlen=window)
+        self.changes = 0
+
+    @property
+    def settings(self):
+        """ settings dict of current level """
+        return self.levels[self.level]
+
+    @property
+    def budget(self):
+        return 1.0/self.target_fps
+
+    def update(self,frame_time):
+        """ add measured frame time (seconds) , return settings of new level when level changed else None """
+        self.__times.append(frame_time)
+        if(len(self.__times)<self.__times.maxlen):
+            return None
+        median = float(np.median(self.__times))
+        level = self.level
+        if(median>self.budget and level<len(self.levels)-1):
+            level+=1
+        elif(median<self.budget*self.headroom and level>0):
+            level-=1
+        if(level==self.level):
+            return None
+        self.level = level
+        self.changes+=1
+        self.__times.clear()
+        return self.settings
+
+    def stats(self):
+        return {"level":self.level,"settings":dict(self.settings),"changes":self.changes,
+                "median_frame_time":float(np.median(self.__times)) if self.__times else None}
@@ -0,0 +1,80 @@
+class RoiScheduler:
+    """ Decide whether detector runs on full frame or on region of interest (ROI) crop
+
+        Full frame detection runs every full_every frames or when tracking is lost ,
+        other frames run on padded crop around last known landmarks (detectors map
+        coordinates back to frame)
+
+        full_every :- run full frame detection at least once in this many frames - int
+        padding :- padding added around last landmarks box , fraction of box size - float
+        min_size :- minimum width/height of ROI in pixels - int
+    """
+    def __init__(self,full_every=10,padding=0.3,min_size=96):
+        self.full_every = full_every
+        self.__padding = padding
+        self.__min_size = min_size
+        self.__tracks = {}
+        self.__full_time = {}
+        self.__stats = {}
+
+    def next_roi(self,detector,frame_shape):
+        """ Takes 2 parameters:
+            1) detector :- name of detector ("hands","face") - str
+            2) frame_shape :- shape of input frame
+
+            return ROI [x1,y1,x2,y2] or None when full frame detection has to run
+        """
+        track = self.__tracks.get(detector)
+        if(track is None or track["box"] is None or track["since_full"]>=self.full_every-1):
+            return None
+        h,w = frame_shape[:2]
+        x1,y1,x2,y2 = track["box"]
+        pad_x = max((x2-x1)*self.__padding,(self.__min_size-(x2-x1))/2)
+        pad_y = max((y2-y1)*self.__padding,(self.__min_size-(y2-y1))/2)
+        roi = [int(max(0,x1-pad_x)),int(max(0,y1-pad_y)),int(min(w,x2+pad_x)),int(min(h,y2+pad_y))]
+        if(roi[2]-roi[0]<2 or roi[3]-roi[1]<2):
+            return None
+        return roi
+
+    def report(self,detector,mode,landmarks,elapsed,roi):
+        """ Takes 5 parameters:
+            1) detector :- name of detector - str
+            2) mode :- current operation mode of application (stats are kept per mode) - str
+            3) landmarks :- LandmarkSet returned by detector
+            4) elapsed :- inference time in seconds - float
+            5) roi :- ROI used for this inference (None for full frame)
+        """
+        track = self.__tracks.setdefault(detector,{"box":None,"since_full":0})
+        stats = self.__stats.setdefault(mode,{})
+        stats = stats.setdefault(detector,{"full":0,"roi":0,"full_time":0.0,"roi_time":0.0,"time_saved":0.0})
+        if(roi is None):
+            stats["full"]+=1
+            stats["full_time"]+=elapsed
+            previous = self.__full_time.get(detector)
+            self.__full_time[detector] = elapsed if previous is None else 0.9*previous+0.1*elapsed
+            track["since_full"] = 0
+        else:
+            stats["roi"]+=1
+            stats["roi_time"]+=elapsed
+            stats["time_saved"]+=max(0.0,self.__full_time.get(detector,elapsed)-elapsed)
+            track["since_full"]+=1
+
+        ## tracking lost , next inference runs on full frame
+        if(landmarks.count):
+            xy = landmarks.flat
+            mins = xy.min(axis=0)
+            maxs = xy.max(axis=0)
+            track["box"] = [int(mins[0]),int(mins[1]),int(maxs[0]),int(maxs[1])]
+        else:
+            track["box"] = None
+
+    def reset(self,detector=None):
+        """ forget last landmarks so next inference runs on full frame """
+        if(detector is None):
+            self.__tracks = {}
+        else:
+            self.__tracks.pop(detector,None)
+
+    def stats(self):
+        """ return {mode : {detector : {full , roi , full_time , roi_time , time_saved}}} """
+        return {mode:{detector:dict(values) for detector,values in detectors.items()} for mode,detectors in self.__stats.items()}
@@ -0,0 +1,344 @@
+import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
+from queue import Empty
+from time import time
+from landmarks import LandmarkSet
+from filters import FilterApplyer
+
+
+def _attach_memory(name):
+    """ attach existing shared memory without registering it for cleanup (only owner unlinks it) """
+    try:
+        return shared_memory.SharedMemory(name=name,track=False)
+    except TypeError:
+        ## python < 3.13 has no track parameter , worker processes share resource tracker
+        ## of owner so registering same name again is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRing:
+    """ Ring of frame slots in multiprocessing.shared_memory
+
+        frame is written once into slot , worker processes attach to same memory
+        and read slot as numpy view (zero copy). slot header keeps sequence number of frame
+
+        shape :- frame shape (h,w,3) - tuple
+        slots :- number of frame slots - int
+        name :- attach to ring created by other process (None creates new ring) - str
+    """
+    def __init__(self,shape,slots=4,name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = 8*slots
+        self.__owner = name is None
+        if(self.__owner):
+            self.__memory = shared_memory.SharedMemory(create=True,size=header_bytes+frame_bytes*slots)
+        else:
+            self.__memory = _attach_memory(name)
+        self.name = self.__memory.name
+        self.__seqs = np.ndarray((slots,),dtype=np.int64,buffer=self.__memory.buf)
+        self.__frames = np.ndarray((slots,)+self.shape,dtype=np.uint8,buffer=self.__memory.buf,offset=header_bytes)
+        if(self.__owner):
+            self.__seqs.fill(-1)
+
+    @property
+    def spec(self):
+        """ (shape , slots , name) , arguments to attach from other process """
+        return self.shape,self.slots,self.name
+
+    def write(self,slot,seq,frame):
+        """ copy frame into slot (the only copy of frame) """
+        np.copyto(self.__frames[slot],frame)
+        self.__seqs[slot] = seq
+
+    def view(self,slot):
+        """ numpy view of frame in slot (valid until slot is written again) """
+        return self.__frames[slot]
+
+    def seq(self,slot):
+        return int(self.__seqs[slot])
+
+    def close(self):
+        """ detach , owner also removes shared memory """
+        ## numpy views keep exported buffer alive , drop them before closing memory
+        self.__seqs = None
+        self.__frames = None
+        self.__memory.close()
+        if(self.__owner):
+            self.__memory.unlink()
+
+
+class PushLandmarkSource:
+    """ landmark_source of HandDetector / FaceAnalyzer returning landmarks computed by worker process
+        (set() before SmartVisionApp.process , keeps last landmarks when frame has no result)
+    """
+    def __init__(self,num_points,connections=()):
+        self.connections = np.array(connections,dtype=np.intp).reshape(-1,2)
+        self.__landmarks = LandmarkSet.empty(num_points)
+
+    def set(self,xy):
+        self.__landmarks = LandmarkSet(np.asarray(xy,dtype=np.int32))
+
+    def detect(self,image,roi=None):
+        ## worker detects on whole frame , roi is ignored
+        return LandmarkSet(self.__landmarks.xy.copy())
+
+    def close(self):
+        pass
+
+
+def _default_worker_model(kind,options):
+    if(kind=="hands"):
+        from hand_landmark_detection import HandDetector
+        return HandDetector(min_detection_confidence=0.7,min_tracking_confidence=0.7)
+    if(kind=="face"):
+        from face_landmark_detection import FaceAnalyzer
+        return FaceAnalyzer(max_num_faces=options.get("max_num_faces",1))
+    return FilterApplyer(output_buffers=1,cartoon_quality=options.get("cartoon_quality","quality"))
+
+
+def _worker_main(kind,ring_spec,output_spec,tasks,results,options,factory):
+    """ worker process : run one analyzer on frames of shared ring and send small results back
+
+        hands / face send landmark arrays , filter writes output into output ring slot and sends filter name
+    """
+    shape,slots,name = ring_spec
+    ring = SharedFrameRing(shape,slots,name)
+    output = SharedFrameRing(*output_spec[:2],output_spec[2]) if kind=="filter" else None
+    model = factory() if factory is not None else _default_worker_model(kind,options)
+    try:
+        while True:
+            task = tasks.get()
+            if(task is None):
+                break
+            seq,slot,argument = task
+            frame = ring.view(slot)
+            st = time()
+            if(kind=="hands"):
+                payload = model.find_hands(frame).xy
+            elif(kind=="face"):
+                payload = model.get_face_points(frame).xy
+            else:
+                filtered,payload = model.apply_filter(frame,argument,as_bgr=True)
+                np.copyto(output.view(slot),filtered)
+            results.put((seq,kind,payload,time()-st))
+    finally:
+        if(hasattr(model,"close")):
+            model.close()
+        ring.close()
+        if(output is not None):
+            output.close()
+
+
+class MultiProcessVisionApp:
+    """ Run HandDetector , FaceAnalyzer and FilterApplyer in separate worker processes
+
+        submit(frame) writes frame once into SharedFrameRing and sends (seq , slot) to workers
+        needed by current mode , workers read frame zero copy and run in parallel.
+        Results come back over one result queue and are joined by sequence number ,
+        collect() then runs SmartVisionApp.process (tracking , gestures , overlays) on joined frames
+        in submission order
+
+        frames_in_flight are limited by ring slots , submit() returns None when all slots are busy.
+        When processed frame changes mode (gesture) , frames still in flight get work of new mode
+        (e.g. face analysis) dispatched , they are still in their ring slots
+
+        shape :- frame shape (h,w,3) - tuple
+        slots :- ring slots (max frames in flight) - int
+        factories :- optional {kind : zero argument function} building worker models
+                     ("hands" , "face" , "filter") , e.g. stub detectors for benchmarks
+        app_kwargs :- arguments of SmartVisionApp
+    """
+    KINDS = ("hands","face","filter")
+
+    def __init__(self,shape=(480,640,3),slots=4,max_num_faces=1,cartoon_quality="quality",factories=None,
+                 hand_connections=(),face_connections=(),**app_kwargs):
+        from smart_vision_app import SmartVisionApp
+        from model_registry import ModelRegistry
+        from hand_landmark_detection import HandDetector
+        from face_landmark_detection import FaceAnalyzer
+        self.__ring = SharedFrameRing(shape,slots)
+        self.__output = SharedFrameRing(shape,slots)
+        self.__hands = PushLandmarkSource(21,hand_connections)
+        self.__faces = PushLandmarkSource(468,face_connections)
+        registry = ModelRegistry(idle_timeout=None)
+        registry.register("hands",lambda: HandDetector(landmark_source=self.__hands),releasable=False)
+        registry.register("face",lambda: FaceAnalyzer(max_num_faces=max_num_faces,landmark_source=self.__faces),releasable=False)
+        self.app = SmartVisionApp(model_registry=registry,cartoon_quality=cartoon_quality,**app_kwargs)
+        options = {"max_num_faces":max_num_faces,"cartoon_quality":cartoon_quality}
+        factories = factories or {}
+        self.__results = multiprocessing.Queue()
+        self.__tasks = {}
+        self.__workers = []
+        for kind in MultiProcessVisionApp.KINDS:
+            tasks = multiprocessing.Queue()
+            worker = multiprocessing.Process(target=_worker_main,name=f"vision-{kind}",daemon=True,
+                                args=(kind,self.__ring.spec,self.__output.spec,tasks,self.__results,options,factories.get(kind)))
+            self.__tasks[kind] = tasks
+            self.__workers.append(worker)
+        self.__free_slots = list(range(slots))
+        self.__pending = {}
+        self.__seq = 0
+        self.__next_seq = 0
+        self.worker_time = {kind:0.0 for kind in MultiProcessVisionApp.KINDS}
+        self.__started = False
+
+    def start(self):
+        for worker in self.__workers:
+            worker.start()
+        self.__started = True
+        return self
+
+    def __needed(self,mode):
+        kinds = ["hands"]
+        if(mode=="face"):
+            kinds.append("face")
+        elif(mode in FilterApplyer.FILTERS):
+            kinds.append("filter")
+        return kinds
+
+    def submit(self,frame):
+        """ write frame into ring and dispatch it , return sequence number (None when ring is full) """
+        if(not self.__free_slots):
+            return None
+        slot = self.__free_slots.pop(0)
+        seq = self.__seq
+        self.__seq+=1
+        mode = self.app.mode
+        self.__ring.write(slot,seq,frame)
+        kinds = self.__needed(mode)
+        self.__pending[seq] = {"slot":slot,"needed":set(kinds),"results":{}}
+        for kind in kinds:
+            self.__tasks[kind].put((seq,slot,mode))
+        return seq
+
+    @property
+    def in_flight(self):
+        return len(self.__pending)
+
+    def __receive(self,timeout):
+        try:
+            seq,kind,payload,elapsed = self.__results.get(timeout=timeout) if timeout else self.__results.get_nowait()
+        except Empty:
+            return False
+        self.__pending[seq]["results"][kind] = payload
+        self.worker_time[kind]+=elapsed
+        return True
+
+    def collect(self,timeout=0.0):
+        """ process frames whose all results arrived (in sequence order)
+            wait up to timeout seconds for first frame
+            return list of (seq , image , filtered_image) , images are copies owned by caller
+        """
+        deadline = time()+timeout
+        while self.__receive(0):
+            pass
+        outputs = []
+        while self.__next_seq in self.__pending:
+            entry = self.__pending[self.__next_seq]
+            if(entry["needed"]-entry["results"].keys()):
+                ## wait only while nothing is ready yet
+                remaining = deadline-time()
+                if(outputs or remaining<=0 or not self.__receive(remaining)):
+                    break
+                continue
+            outputs.append(self.__finish(self.__next_seq,entry))
+            self.__next_seq+=1
+        return outputs
+
+    def __finish(self,seq,entry):
+        del self.__pending[seq]
+        results = entry["results"]
+        slot = entry["slot"]
+        if("hands" in results):
+            self.__hands.set(results["hands"])
+        if("face" in results):
+            self.__faces.set(results["face"])
+        ## frame is composited in its slot , copied out before slot is reused
+        image = self.__ring.view(slot)
+        filtered = None
+        if("filter" in results and self.app.mode==results["filter"]):
+            filtered = self.__output.view(slot).copy()
+        mode = self.app.mode
+        self.app.process(image,filtered_image=filtered)
+        if(self.app.mode!=mode):
+            self.__dispatch_in_flight()
+        output = image.copy(),self.app.filtered_image
+        self.__free_slots.append(slot)
+        return (seq,)+output
+
+    def __dispatch_in_flight(self):
+        """ send frames in flight to workers needed by new mode which they were not sent to """
+        mode = self.app.mode
+        kinds = set(self.__needed(mode))
+        for seq,entry in self.__pending.items():
+            for kind in kinds-entry["needed"]:
+                self.__tasks[kind].put((seq,entry["slot"],mode))
+            entry["needed"]|=kinds
+
+    def process(self,frame,timeout=5.0):
+        """ synchronous helper : submit one frame and wait for its output (image , filtered_image) """
+        seq = self.submit(frame)
+        while seq is None:
+            self.collect(timeout)
+            seq = self.submit(frame)
+        deadline = time()+timeout
+        while time()<deadline:
+            for out_seq,image,filtered in self.collect(deadline-time()):
+                if(out_seq==seq):
+                    return image,filtered
+        raise TimeoutError(f"frame {seq} was not processed in {timeout} s")
+
+    def stop(self):
+        if(self.__started):
+            for tasks in self.__tasks.values():
+                tasks.put(None)
+            for worker in self.__workers:
+                worker.join(timeout=2.0)
+                if(worker.is_alive()):
+                    worker.terminate()
+            self.__started = False
+        self.__ring.close()
+        self.__output.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self,*exc):
+        self.stop()
+        return False
+
+
+### driver code to run SmartVisionApp with analyzers in worker processes
+### example : python shared_frame_ring.py
+
+if __name__=="__main__":
+    import cv2
+    from frame_pipeline import CameraSource
+    from ui_layout import UiLayout
+    import mediapipe as mp
+    source = CameraSource(0,640,480)
+    frame = source.read()
+    with MultiProcessVisionApp(frame.shape,slots=4,
+                               hand_connections=sorted(mp.solutions.hands.HAND_CONNECTIONS),
+                               face_connections=sorted(mp.solutions.face_mesh.FACEMESH_CONTOURS)) as vision:
+        st = time()
+        displayed = 0
+        while frame is not None:
+            ## keep ring full , capture never waits for analyzers
+            vision.submit(frame)
+            for seq,image,filtered in vision.collect(timeout=0.001 if vision.in_flight<4 else 0.05):
+                displayed+=1
+                label = UiLayout().rect("fps_label",image.shape)
+                scale = UiLayout.text_scale(image.shape)
+                cv2.putText(image,f"FPS : {int(displayed/max(time()-st,1e-3))}",(label[0][0],label[0][1]+int(30*scale)),cv2.FONT_HERSHEY_SIMPLEX,scale,(255,0,0),max(1,int(round(2*scale))))
+                cv2.imshow("image",image)
+                if(filtered is not None):
+                    cv2.imshow("Filtered image",filtered)
+            if(cv2.waitKey(1)==27):
+                break
+            frame = source.read()
+        source.release()
+        print("worker time (s) :",vision.worker_time)
@@ -2,6 +2,18 @@ from hand_landmark_detection import HandDetector
 from face_landmark_detection import FaceAnalyzer
 from virtual_drawingpad import VirtualDrawBoard
 from filters import FilterApplyer
+from frame_pipeline import FramePipeline, CameraSource
+from roi_scheduler import RoiScheduler
+from model_registry import ModelRegistry
+from profiler import Profiler
+from ui_overlay import OverlayCompositor
+from landmark_filter import LandmarkSmoother
+from ui_layout import UiLayout
+from quality_governor import QualityGovernor
+from vision_events import EventBus, ModeChangedEvent, ReadyEvent
+from motion_gate import MotionGate
+from startup import StartupTimer, WarmModelPool
+from face_tracker import FaceTracker
 import cv2
 import numpy as np
 from time import time
@@ -10,43 +22,175 @@ class SmartVisionApp:
 
     """ Manage all operations
         provide interface to communicate between different modules like FilterApplyer, HandDetecor etc
+
+        Detectors are built lazily by ModelRegistry when a mode needs them first time
+        (face mesh graph is built only when face mode is selected) and released after
+        idle_timeout seconds without use. model_registry can be passed to replace detector factories
+
+        Landmarks are smoothed with One-Euro filter (smoothing) , with infer_every > 1 hand and face
+        inference runs only on every infer_every-th frame and landmarks of other frames are predicted
+
+        UI geometry is in normalized coordinates (UiLayout) so any capture resolution works ,
+        detectors run on frame resized by inference_scale and landmarks are mapped back to frame.
+        governor (QualityGovernor) watches process time and changes inference_scale , cartoon
+        quality and infer_every to hold its target fps
+
+        events (EventBus) delivers blink , emotion change , pinch start / end , finger count change
+        and mode change events , only transitions are emitted (not every frame)
+
+        motion_gate (MotionGate) compares small gray frame with running background , on static
+        frames hand / face inference is skipped and cached landmarks are reused (motion_gate.stats())
+
+        hand_features (HandFeatures) of current frame keep normalized distances , joint angles ,
+        finger states and gestures , computed once and shared by finger counter and drawing board
+
+        select_frames :- both finger tips have to stay on same option for this many frames before its
+                         mode is selected (one frame of landmark jitter does not switch mode) - int
     """
-    def __init__(self):
-        self.__hand_detector = HandDetector(min_detection_confidence=0.7,min_tracking_confidence=0.7)
-        self.__face_analyzer = FaceAnalyzer()
-        self.__virtual_drawer = VirtualDrawBoard(self.__hand_detector)
-        self.__filter_applyer = FilterApplyer()
+    ## models needed by every operation mode
+    MODE_MODELS = {"home":["hands"],"face":["hands","face"],"hands":["hands"],"draw":["hands","draw"],"filters":["hands"]}
+    ## first inference of every model on dummy frame , run by warm_up()
+    WARMUPS = {"hands":lambda model,frame: model.find_hands(frame),"face":lambda model,frame: model.get_face_points(frame)}
+
+    def __init__(self,max_num_faces=1,roi_full_every=10,idle_timeout=60.0,model_registry=None,profiler=None,cartoon_quality="quality",
+                 smoothing=True,infer_every=1,inference_scale=1.0,governor=None,events=None,
+                 motion_gate=None,select_frames=3):
+        ## disabled profiler costs one attribute check per span
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        ## static UI chrome of every mode is rendered once and cached , cache is invalidated on mode change
+        self.__overlay = OverlayCompositor()
+        self.__models = model_registry if model_registry is not None else ModelRegistry(idle_timeout=idle_timeout)
+        self.__register_default_models(max_num_faces)
+        ## filtered output can wait in pipeline queues for a few frames , keep enough rotating output buffers
+        self.__filter_applyer = FilterApplyer(output_buffers=4,cartoon_quality=cartoon_quality)
+        self.__roi_scheduler = RoiScheduler(full_every=roi_full_every)
+        self.__hand_smoother = LandmarkSmoother(infer_every=infer_every,smooth=smoothing)
+        self.__face_smoother = LandmarkSmoother(infer_every=infer_every,smooth=smoothing)
+        ## box tracker gives hands stable ids , so smoothing never blends two hands when detector order changes
+        self.__hand_tracker = FaceTracker()
         self.__current_mode = "home"
+        self.filtered_image = None
+        self.hand_features = None
         self.__available_home_modes = ["home","face","hands","draw"]
         self.__available_filters_modes = ["filters","hsv","hls","cartoon","gray","histeq","blurry"]
+        self.__layout = UiLayout()
+        self.__frame_shape = (480,640)
+        self.inference_scale = inference_scale
+        self.__inference_buffer = None
+        self.governor = governor
+        self.events = events if events is not None else EventBus()
+        self.__frame_count = 0
+        self.motion_gate = motion_gate
+        self.__hand_points = None
+        self.__hand_ids = []
+        self.select_frames = select_frames
+        ## option under finger tips and number of consecutive frames it stayed there
+        self.__hover = None
+        self.__hover_frames = 0
+        self.__face_cached = False
+
+    def __register_default_models(self,max_num_faces):
+        """ register factories of detectors not already registered in model registry """
+        registered = self.__models.stats()
+        self.__default_models = "hands" not in registered
+        if("hands" not in registered):
+            self.__models.register("hands",lambda: HandDetector(min_detection_confidence=0.7,min_tracking_confidence=0.7,overlay=self.__overlay,layout=self.__layout))
+        if("face" not in registered):
+            self.__models.register("face",lambda: FaceAnalyzer(max_num_faces=max_num_faces,overlay=self.__overlay,layout=self.__layout))
+        if("draw" not in registered):
+            ## drawing board keeps user strokes so it is never released
+            self.__models.register("draw",lambda: VirtualDrawBoard(self.__models.get("hands"),overlay=self.__overlay,layout=self.__layout),releasable=False)
+
+    def __model(self,name):
+        """ get model from registry and connect it to event bus (models may be rebuilt after release) """
+        model = self.__models.get(name)
+        if(getattr(model,"events",False) is None):
+            model.events = self.events
+        return model
+
+    @property
+    def models(self):
+        """ ModelRegistry used by application """
+        return self.__models
+
+    def model_stats(self):
+        """ Startup time and resident memory of models
+            return dict with 2 keys:
+            1) models :- ModelRegistry.stats() , build_time (s) and memory_delta (bytes) of every model
+            2) modes :- for every mode : models used , total build_time and memory_delta of those models
+        """
+        models = self.__models.stats()
+        modes = {}
+        for mode,names in SmartVisionApp.MODE_MODELS.items():
+            build_times = [models[name]["build_time"] for name in names if models.get(name,{}).get("build_time") is not None]
+            memory = [models[name]["memory_delta"] for name in names if models.get(name,{}).get("memory_delta") is not None]
+            modes[mode] = {"models":names,
+                           "build_time":sum(build_times) if build_times else None,
+                           "memory_delta":sum(memory) if memory else None}
+        return {"models":models,"modes":modes}
+
+    def warm_up(self,models=("hands",),shape=(480,640,3),warmup_frames=2,timer=None,background=True):
+        """ Build models and run them on dummy frames so first process() runs at steady state speed
+            mediapipe import and graph builds run on background thread (camera can be opened meanwhile) ,
+            ReadyEvent is emitted when models are ready , process() must not be called before that
+
+            warmed model is kept until its first use , so only hands (used in every mode) are warmed by default ,
+            add "face" when app starts in face mode (otherwise face mesh graph stays resident without use)
+
+            return WarmModelPool , pool.wait() blocks until ready , pool.stats() keeps build / warmup times
+        """
+        warmups = {name:SmartVisionApp.WARMUPS[name] for name in models}
+        imports = ("mediapipe",) if self.__default_models else ()
+        pool = WarmModelPool(self.__models,warmups,imports=imports,shape=shape,warmup_frames=warmup_frames,timer=timer,
+                             on_ready=lambda elapsed: self.events.emit(ReadyEvent(elapsed)))
+        return pool.start() if background else pool.run()
+
+    def set_quality(self,inference_scale=None,cartoon_quality=None,infer_every=None):
+        """ change speed / quality settings (used by QualityGovernor) , None keeps current value """
+        if(inference_scale is not None):
+            self.inference_scale = inference_scale
+        if(cartoon_quality is not None):
+            self.__filter_applyer.set_cartoon_quality(cartoon_quality)
+        if(infer_every is not None):
+            self.__hand_smoother.infer_every = infer_every
+            self.__face_smoother.infer_every = infer_every
+
+    def __options(self):
+        """ return (layout name , {option : pixel rectangle}) of options shown in current mode """
+        name = "filters_options" if self.__current_mode in self.__available_filters_modes else "home_options"
+        return name,self.__layout.rect(name,self.__frame_shape)
+
+    def __inference_frame(self,image):
+        """ return frame for detectors (resized by inference_scale into reused buffer) and (sx,sy)
+            factors mapping its coordinates back to image
+        """
+        h,w = image.shape[:2]
+        if(self.inference_scale>=1.0):
+            return image,(1.0,1.0)
+        size = (max(1,int(w*self.inference_scale)),max(1,int(h*self.inference_scale)))
+        if(self.__inference_buffer is None or self.__inference_buffer.shape[:2]!=(size[1],size[0])):
+            self.__inference_buffer = np.empty((size[1],size[0],3),dtype=image.dtype)
+        cv2.resize(image,size,dst=self.__inference_buffer,interpolation=cv2.INTER_AREA)
+        return self.__inference_buffer,(w/size[0],h/size[1])
+
+    @staticmethod
+    def __inference_roi(roi,sx,sy):
+        """ map ROI of frame (RoiScheduler works in frame coordinates) to inference frame """
+        if(roi is None or (sx==1 and sy==1)):
+            return roi
+        x1,y1,x2,y2 = roi
+        return [int(x1/sx),int(y1/sy),int(x2/sx),int(y2/sy)]
 
-        self.__filters_options = {"home":[[550,20],[620,90]],
-                                        "hsv":[[550,100],[620,150]],
-                                        "hls":[[550,160],[620,210]],
-                                        "gray":[[550,220],[620,270]],
-                                        "cartoon":[[550,280],[620,330]],
-                                        "histeq":[[550,340],[620,390]],
-                                        "blurry":[[550,400],[620,450]],
-                                        }
-        self.__options_positions = {
-                                        "home":[[550,20],[620,90]],
-                                        "face":[[550,100],[620,170]],
-                                        "hands":[[550,180],[620,250]],
-                                        "draw":[[550,260],[620,330]],
-                                        "filters":[[550,340],[620,430]]
-                                    }
-                                       
     def __draw_home_options(self,image):
         """ Draw different options (home,filter,hands,draw etc) on video frame"""
-        options = {}        
-        if(self.__current_mode in self.__available_filters_modes   ):
-            options = self.__filters_options
-        elif(self.__current_mode in self.__available_home_modes):
-            options = self.__options_positions
+        name,options = self.__options()
+        scale = UiLayout.text_scale(image.shape)
 
-        for option_name,pos in options.items():
-            cv2.rectangle(image,pos[0],pos[1],(0,0,0),-1)
-            cv2.putText(image,f"{option_name}",(pos[0][0]+10 , pos[0][1]+35 ),cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 210), 1)
+        def render(layer):
+            for option_name,pos in options.items():
+                layer.rectangle(pos[0],pos[1],(0,0,0),-1)
+                layer.text(f"{option_name}",(pos[0][0]+int(10*scale) , pos[0][1]+int(35*scale) ),0.5*scale,(255, 255, 210),max(1,int(scale)))
+        self.__overlay.apply(image,name,render)
 
 
     def __controller(self,first_finger,second_finger):
@@ -56,74 +200,200 @@ class SmartVisionApp:
 
         """
 
-        if(self.__current_mode in self.__available_filters_modes):
-            options = self.__filters_options
-        elif(self.__current_mode in self.__available_home_modes):
-            try:
-                cv2.destroyWindow("Filtered image")
-            except:
-                pass
-            options = self.__options_positions
-
+        _,options = self.__options()
+        selected = None
         for option_name,pos in options.items():
             if(VirtualDrawBoard.check_inside_rectangle(pos,first_finger) and VirtualDrawBoard.check_inside_rectangle(pos,second_finger)):
-                self.__current_mode = option_name.lower()
+                selected = option_name.lower()
+        if(selected is not None and selected==self.__hover):
+            self.__hover_frames+=1
+        else:
+            self.__hover = selected
+            self.__hover_frames = 1
+        if(selected is not None and self.__hover_frames>=self.select_frames):
+            self.set_mode(selected)
 
+    @property
+    def mode(self):
+        """ current operation mode """
+        return self.__current_mode
 
+    def set_mode(self,mode):
+        """ switch operation mode (same as selecting option with fingers) """
+        if(mode not in SmartVisionApp.MODE_MODELS and mode not in self.__available_filters_modes):
+            raise ValueError(f"unknown mode {mode}")
+        if(self.__current_mode!=mode):
+            ## face may have moved while face mode was off , start with full frame detection
+            self.__roi_scheduler.reset("face")
+            self.__face_smoother.reset()
+            self.__face_cached = False
+            if(self.__current_mode=="draw" and self.__models.is_loaded("draw")):
+                self.__model("draw").end_pinch()
+            self.__overlay.invalidate()
+            self.events.emit(ModeChangedEvent(self.__current_mode,mode))
+        self.__current_mode = mode
 
+    def roi_stats(self):
+        """ per mode count of full frame vs ROI inferences and time saved by ROI inferences (see RoiScheduler.stats) """
+        return self.__roi_scheduler.stats()
 
-    def process(self,image):
+    def process(self,image,filtered_image=None,timestamp=None):
         """ 
             Perform dedicated operations based on selected operation mode
             example:
             if current operation mode = draw
             then perform operations of virtual drawing
+
+            GUI calls are not made here (so process can run on worker thread),
+            output of filter modes is kept in filtered_image instance variable
+
+            filtered_image :- filter output already computed by filter worker (multi process mode,
+                              see shared_frame_ring.py) , filter is applied here when None
+            timestamp :- capture time of frame used by landmark smoothing (recorded time when replaying ,
+                         see landmark_recording.py) , current time when None
         """
-        points = self.__hand_detector.find_hands(image)
+        frame_start = time()
+        self.__frame_count+=1
+        self.events.frame = self.__frame_count
+        self.filtered_image = None
+        self.__frame_shape = image.shape[:2]
+        profiler = self.profiler
+        profiler.mode = self.__current_mode
+        self.__models.release_idle()
+        hand_detector = self.__model("hands")
+        inference_image,(sx,sy) = self.__inference_frame(image)
+        gate = self.motion_gate
+        static = False
+        if(gate is not None):
+            with profiler.span("motion_gate"):
+                static = not gate.update(image)
+        if(static and self.__hand_points is not None):
+            gate.skip("hands")
+            points = self.__hand_points
+        elif(self.__hand_smoother.should_infer()):
+            roi = self.__roi_scheduler.next_roi("hands",image.shape)
+            st = time()
+            with profiler.span("hand_inference"):
+                points = hand_detector.find_hands(inference_image,roi=self.__inference_roi(roi,sx,sy),scale=(sx,sy))
+            self.__roi_scheduler.report("hands",self.__current_mode,points,time()-st,roi)
+            if(gate is not None):
+                gate.report("hands",time()-st)
+            self.__hand_ids = self.__hand_tracker.update(FaceTracker.boxes_from_points(points.xy))
+            points = self.__hand_smoother.update(points,t=timestamp,ids=self.__hand_ids)
+        else:
+            points = self.__hand_smoother.predict(t=timestamp)
+        self.__hand_points = points
+        with profiler.span("hand_features"):
+            ## predicted and cached landmarks keep order of last detection (and its hand ids)
+            self.hand_features = hand_detector.features(points,ids=self.__hand_ids)
         if(len(points)):
-            cv2.circle(image,points[8],2,(0,255,0),-1)
-            cv2.circle(image,points[12],2,(0,255,255),-1)
-
             self.__controller(points[8],points[12])
-            
-            if(self.__current_mode=="hands"):
-                self.__hand_detector.draw_fingers(image,points)
-            elif(self.__current_mode == "draw"):
-                self.__virtual_drawer.draw(image,points)
+
+            with profiler.span("overlay"):
+                cv2.circle(image,points[8],2,(0,255,0),-1)
+                cv2.circle(image,points[12],2,(0,255,255),-1)
+                if(self.__current_mode=="hands"):
+                    hand_detector.draw_fingers(image,points)
+                elif(self.__current_mode == "draw"):
+                    self.__model("draw").draw(image,points)
+        else:
+            ## hand lost , option selection starts again and active pinch ends
+            self.__hover = None
+            if(self.__current_mode=="draw" and self.__models.is_loaded("draw")):
+                self.__model("draw").end_pinch()
         if(self.__current_mode=="face"):
-            self.__face_analyzer.process_frame(image,draw_mesh=False)
+            face_analyzer = self.__model("face")
+            if(static and self.__face_cached):
+                ## face_points of last frame are kept by analyzer
+                gate.skip("face")
+            elif(self.__face_smoother.should_infer()):
+                roi = self.__roi_scheduler.next_roi("face",image.shape)
+                st = time()
+                with profiler.span("face_inference"):
+                    face_analyzer.get_face_points(inference_image,roi=self.__inference_roi(roi,sx,sy),scale=(sx,sy))
+                self.__roi_scheduler.report("face",self.__current_mode,face_analyzer.face_points,time()-st,roi)
+                if(gate is not None):
+                    gate.report("face",time()-st)
+                face_analyzer.face_points = self.__face_smoother.update(face_analyzer.face_points,t=timestamp,ids=face_analyzer.face_ids)
+            else:
+                face_analyzer.face_points = self.__face_smoother.predict(t=timestamp)
+            self.__face_cached = True
+            with profiler.span("overlay"):
+                face_analyzer.process_frame(image,draw_mesh=False,detect=False)
         elif(self.__current_mode in self.__available_filters_modes):
             if(self.__current_mode!="filters"):
-                new_image , filter_name = self.__filter_applyer.apply_filter(image,filter_name=self.__current_mode)
-                if(filter_name=="gray"):
-                    new_image = cv2.cvtColor(new_image,cv2.COLOR_GRAY2BGR)
-                cv2.rectangle(new_image,(20,20),(180,60),(0,0,0),-1)
-                cv2.putText(new_image,f"Filter : {filter_name}",(20,50),cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 250, 0), 2)
-                cv2.imshow("Filtered image",new_image)
-                cv2.waitKey(1)
-        self.__draw_home_options(image)
+                if(filtered_image is None):
+                    with profiler.span("filter"):
+                        new_image , filter_name = self.__filter_applyer.apply_filter(image,filter_name=self.__current_mode,as_bgr=True)
+                else:
+                    new_image , filter_name = filtered_image , self.__current_mode
+                label = self.__layout.rect("filter_label",new_image.shape)
+                scale = UiLayout.text_scale(new_image.shape)
+                cv2.rectangle(new_image,tuple(label[0]),tuple(label[1]),(0,0,0),-1)
+                cv2.putText(new_image,f"Filter : {filter_name}",(label[0][0],label[0][1]+int(30*scale)),cv2.FONT_HERSHEY_SIMPLEX, 0.7*scale, (0, 250, 0), max(1,int(round(2*scale))))
+                self.filtered_image = new_image
+        with profiler.span("overlay"):
+            self.__draw_home_options(image)
+        if(self.governor is not None):
+            settings = self.governor.update(time()-frame_start)
+            if(settings is not None):
+                self.set_quality(**settings)
+        return image
 
 
 
 
-### driver code to execute main SmartVisionApplication
-if __name__=="__main__":
-    cap = cv2.VideoCapture(0)
-    WINDOW_WIDTH , WINDOW_HEIGHT = 640,480
+def run(camera_index=0,width=640,height=480,timer=None):
+    """ run SmartVisionApp on camera , capture , processing and display run as pipeline (see frame_pipeline.py)
+        models are built and warmed up on background thread while camera opens ,
+        timer (StartupTimer) records ready and first_frame times (time to first processed frame)
+    """
+    timer = timer if timer is not None else StartupTimer()
+    profiler = Profiler(enabled=True)
+    ## governor lowers inference resolution / filter quality / detector frequency when frames get slower than 30 fps
+    ## static scenes (nobody in front of camera) skip landmark inference
+    vision_app = SmartVisionApp(profiler=profiler,governor=QualityGovernor(target_fps=30),motion_gate=MotionGate())
+    vision_app.events.subscribe(lambda event: print(f"ready in {event.startup_time:.2f} s"),types=["ready"])
+    warm_pool = vision_app.warm_up(shape=(height,width,3),timer=timer)
+    with timer.span("camera_open"):
+        source = CameraSource(camera_index,width,height)
     cv2.namedWindow("image",cv2.WINDOW_NORMAL)
-    cap.set(3,WINDOW_WIDTH)
-    cap.set(4,WINDOW_HEIGHT)
-    vision_app = SmartVisionApp()
-    while True:
-        ret,im = cap.read()
-        im = cv2.flip(im,1)
-        orig_im = im.copy()
-        st = time()
+    warm_pool.wait()
+    filtered_window = [False]
+    layout = UiLayout()
+
+    def process_frame(im):
+        """ run on processing thread , keep filtered output together with frame """
         vision_app.process(im)
-        et = time()
-        fps = int(1/(et-st))
-        cv2.putText(im,f"FPS : {fps}",(400,50),cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+        return im,vision_app.filtered_image
+
+    def display_frame(output,info):
+        """ run on main thread , return False to stop pipeline """
+        timer.mark("first_frame")
+        im,filtered_image = output
+        fps = int(1/max(info["process_time"],1e-3))
+        label = layout.rect("fps_label",im.shape)
+        scale = UiLayout.text_scale(im.shape)
+        cv2.putText(im,f"FPS : {fps}",(label[0][0],label[0][1]+int(30*scale)),cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 0, 0), max(1,int(round(2*scale))))
         cv2.imshow("image",im)
-        k = cv2.waitKey(10)
-        if(k==27):
-            break
+        if(filtered_image is not None):
+            cv2.imshow("Filtered image",filtered_image)
+            filtered_window[0] = True
+        elif(filtered_window[0]):
+            cv2.destroyWindow("Filtered image")
+            filtered_window[0] = False
+        k = cv2.waitKey(1)
+        return k!=27
+
+    pipeline = FramePipeline(source,process_frame,display_frame,queue_size=2,drop_stale=True,profiler=profiler)
+    pipeline.run()
+    print(profiler.prometheus_text())
+    print("motion gate :",vision_app.motion_gate.stats())
+    print("models :",warm_pool.stats())
+    print(timer.summary())
+
+
+### driver code to execute main SmartVisionApplication
+### per module import times are reported when started as python startup.py
+if __name__=="__main__":
+    run()
@@ -0,0 +1,164 @@
+import os
+import importlib
+import sys
+import traceback
+import numpy as np
+from threading import Thread, Event
+from time import time
+
+
+def process_start_time():
+    """ wall clock time when current process started (None when it can't be read , linux only) """
+    try:
+        with open("/proc/self/stat") as f:
+            ## fields after process name , starttime is field 22 of stat
+            fields = f.read().rsplit(")",1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time()-(uptime-int(fields[19])/os.sysconf("SC_CLK_TCK"))
+    except (OSError,ValueError,IndexError,AttributeError):
+        return None
+
+
+class _DurationSpan:
+    __slots__ = ("durations","name","st")
+
+    def __init__(self,durations,name):
+        self.durations = durations
+        self.name = name
+
+    def __enter__(self):
+        self.st = time()
+        return self
+
+    def __exit__(self,*exc):
+        self.durations[self.name] = time()-self.st
+        return False
+
+
+class StartupTimer:
+    """ Record cold start of application , all times are seconds since process start
+
+        imports :- import time of every module imported by import_module - dict
+        phases :- time of named points (mark) , e.g. ready , first_frame - dict
+        durations :- length of named spans (span) , e.g. camera_open - dict
+
+        start :- reference time , default is process start (time of StartupTimer creation when unknown) - float
+    """
+    def __init__(self,start=None):
+        if(start is None):
+            start = process_start_time()
+        self.start = start if start is not None else time()
+        self.imports = {}
+        self.phases = {}
+        self.durations = {}
+
+    def mark(self,name):
+        """ record time of phase once , return seconds since start """
+        if(name not in self.phases):
+            self.phases[name] = time()-self.start
+        return self.phases[name]
+
+    def span(self,name):
+        """ with timer.span("camera_open"): ... records duration of block """
+        return _DurationSpan(self.durations,name)
+
+    def import_module(self,name):
+        """ import module and record its import time (0 when it was imported before) """
+        st = time()
+        cached = name in sys.modules
+        module = importlib.import_module(name)
+        self.imports[name] = 0.0 if cached else time()-st
+        return module
+
+    @property
+    def time_to_first_frame(self):
+        return self.phases.get("first_frame")
+
+    def report(self):
+        return {"imports":dict(self.imports),"phases":dict(self.phases),"durations":dict(self.durations)}
+
+    def summary(self):
+        """ one line per entry , human readable report """
+        lines = [f"import {name:<20} {seconds*1000:8.1f} ms" for name,seconds in self.imports.items()]
+        lines+=[f"{name:<27} {seconds*1000:8.1f} ms" for name,seconds in self.durations.items()]
+        lines+=[f"{name+' at':<27} {seconds*1000:8.1f} ms" for name,seconds in sorted(self.phases.items(),key=lambda item: item[1])]
+        return "\n".join(lines)
+
+
+class WarmModelPool:
+    """ Build models of ModelRegistry on background thread and warm them up on dummy frames
+        (first inference of mediapipe graph is much slower than steady state)
+
+        main thread can open camera meanwhile , wait() blocks until models are ready.
+        Models must not be used by other threads before ready is set
+
+        registry :- ModelRegistry
+        warmups :- {model name : function(model , frame)} run warmup_frames times after build - dict
+        imports :- modules imported (and timed) before models are built , e.g. mediapipe - tuple
+        shape :- shape of dummy frames - tuple
+        on_ready :- function(seconds since timer start) called on background thread when ready
+    """
+    def __init__(self,registry,warmups,imports=(),shape=(480,640,3),warmup_frames=2,timer=None,on_ready=None):
+        self.__registry = registry
+        self.__warmups = warmups
+        self.__imports = imports
+        self.__shape = shape
+        self.__warmup_frames = warmup_frames
+        self.timer = timer if timer is not None else StartupTimer()
+        self.__on_ready = on_ready
+        self.ready = Event()
+        self.error = None
+        self.build_time = {}
+        self.warmup_time = {}
+        self.__thread = None
+
+    def start(self):
+        self.__thread = Thread(target=self.run,name="warm-model-pool",daemon=True)
+        self.__thread.start()
+        return self
+
+    def run(self):
+        """ import modules , build and warm up all models (runs on caller thread when start() is not used) """
+        try:
+            for name in self.__imports:
+                self.timer.import_module(name)
+            ## mid gray frame , detectors run full detection path on it
+            frame = np.full(self.__shape,127,dtype=np.uint8)
+            for name,warmup in self.__warmups.items():
+                st = time()
+                ## warmed model is kept until first use (idle release would throw warm up away)
+                model = self.__registry.load(name,warm=True)
+                self.build_time[name] = time()-st
+                st = time()
+                for _ in range(self.__warmup_frames):
+                    warmup(model,frame.copy())
+                self.warmup_time[name] = time()-st
+        except Exception as e:
+            ## app still starts , models are built lazily on first use
+            self.error = e
+            traceback.print_exc()
+        finally:
+            elapsed = self.timer.mark("ready")
+            self.ready.set()
+            if(self.__on_ready is not None):
+                self.__on_ready(elapsed)
+        return self
+
+    def wait(self,timeout=None):
+        """ block until models are ready , return True when ready """
+        return self.ready.wait(timeout)
+
+    def stats(self):
+        return {"build_time":dict(self.build_time),"warmup_time":dict(self.warmup_time),
+                "ready":self.ready.is_set(),"error":None if self.error is None else repr(self.error)}
+
+
+### driver code : cold start of SmartVisionApp with per module import timing
+### example : python startup.py
+
+if __name__=="__main__":
+    timer = StartupTimer()
+    for module_name in ("numpy","cv2","smart_vision_app"):
+        timer.import_module(module_name)
+    sys.modules["smart_vision_app"].run(timer=timer)
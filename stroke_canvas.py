@@ -0,0 +1,153 @@
+import cv2
+import numpy as np
+
+
+class StrokeStore:
+    """ Compact array backed store of drawing strokes
+
+        all points live in one growable (capacity,2) int32 array , strokes are
+        ranges of it given by start offsets. clear() only resets counters
+    """
+    def __init__(self,capacity=1024):
+        self.__points = np.empty((capacity,2),dtype=np.int32)
+        self.__starts = np.empty(64,dtype=np.int64)
+        self.__num_points = 0
+        self.__num_strokes = 0
+
+    def __len__(self):
+        return self.__num_strokes
+
+    @property
+    def num_points(self):
+        return self.__num_points
+
+    def add_point(self,point,new_stroke=False):
+        if(new_stroke or self.__num_strokes==0):
+            if(self.__num_strokes==len(self.__starts)):
+                self.__starts = np.concatenate([self.__starts,np.empty_like(self.__starts)])
+            self.__starts[self.__num_strokes] = self.__num_points
+            self.__num_strokes+=1
+        if(self.__num_points==len(self.__points)):
+            self.__points = np.concatenate([self.__points,np.empty_like(self.__points)])
+        self.__points[self.__num_points] = point
+        self.__num_points+=1
+
+    def stroke(self,index):
+        """ (n,2) view of points of one stroke """
+        if(index<0):
+            index+=self.__num_strokes
+        start = self.__starts[index]
+        end = self.__starts[index+1] if index+1<self.__num_strokes else self.__num_points
+        return self.__points[start:end]
+
+    def strokes(self):
+        return [self.stroke(i) for i in range(self.__num_strokes)]
+
+    def pop_stroke(self):
+        """ remove last stroke , return its points (copy) """
+        if(not self.__num_strokes):
+            return None
+        points = self.stroke(-1).copy()
+        self.__num_strokes-=1
+        self.__num_points = int(self.__starts[self.__num_strokes])
+        return points
+
+    def clear(self):
+        self.__num_points = 0
+        self.__num_strokes = 0
+
+    def export(self):
+        """ return (points , starts) arrays , points of stroke i are points[starts[i]:starts[i+1]] """
+        return self.__points[:self.__num_points].copy(),self.__starts[:self.__num_strokes].copy()
+
+
+class StrokeCanvas:
+    """ Persistent raster layer of drawing strokes
+
+        every new point draws only its own segment into canvas , compositing onto
+        frame is one masked copy of canvas region (cost does not grow with number of strokes).
+        Bounding box of drawn pixels is kept , composite touches only that box.
+        Mask keeps generation number of every drawn pixel and only pixels of current generation are shown ,
+        clear() starts new generation (O(1) , nothing is zeroed) , undo() starts new one and redraws strokes
+
+        area :- [[x1,y1],[x2,y2]] region where strokes can be drawn
+    """
+    def __init__(self,area,color=(255,255,0),thickness=2):
+        self.color = color
+        self.thickness = thickness
+        pad = thickness+1
+        self.__x0 = max(0,area[0][0]-pad)
+        self.__y0 = max(0,area[0][1]-pad)
+        self.__origin = np.array([self.__x0,self.__y0],dtype=np.int32)
+        w = area[1][0]+pad-self.__x0
+        h = area[1][1]+pad-self.__y0
+        self.__canvas = np.zeros((h,w,3),dtype=np.uint8)
+        self.__mask = np.zeros((h,w),dtype=np.uint16)
+        self.__generation = 1
+        ## reused bool buffer of composite
+        self.__where = np.empty((h,w,1),dtype=bool)
+        ## [x1,y1,x2,y2) of drawn pixels in canvas coordinates , None when nothing is drawn
+        self.__box = None
+        self.store = StrokeStore()
+
+    def __draw_segment(self,points):
+        """ points :- (k,2) local points , one point for stroke start or segment end points """
+        polyline = [points.reshape(-1,1,2)]
+        cv2.polylines(self.__canvas,polyline,False,self.color,self.thickness)
+        cv2.polylines(self.__mask,polyline,False,self.__generation,self.thickness)
+        h,w = self.__mask.shape
+        pad = self.thickness+1
+        x1,y1 = np.maximum(points.min(axis=0)-pad,0)
+        x2,y2 = np.minimum(points.max(axis=0)+pad+1,[w,h])
+        if(self.__box is not None):
+            x1,y1 = min(x1,self.__box[0]),min(y1,self.__box[1])
+            x2,y2 = max(x2,self.__box[2]),max(y2,self.__box[3])
+        self.__box = (int(x1),int(y1),int(x2),int(y2))
+
+    def add_point(self,point,new_stroke=False):
+        """ add point to current stroke (or start new stroke) and rasterize only new segment """
+        start_new = new_stroke or len(self.store)==0
+        previous = None if start_new else self.store.stroke(-1)[-1]
+        self.store.add_point(point,start_new)
+        segment = [point] if previous is None else [previous,point]
+        self.__draw_segment(np.array(segment,dtype=np.int32)-self.__origin)
+
+    def composite(self,image):
+        """ copy stroke pixels (inside drawn box) onto image """
+        if(self.__box is None):
+            return image
+        x1,y1,x2,y2 = self.__box
+        region = image[self.__y0+y1:self.__y0+y2,self.__x0+x1:self.__x0+x2]
+        h,w = region.shape[:2]
+        where = self.__where[y1:y1+h,x1:x1+w]
+        np.equal(self.__mask[y1:y1+h,x1:x1+w],self.__generation,out=where[...,0])
+        np.copyto(region,self.__canvas[y1:y1+h,x1:x1+w],where=where)
+        return image
+
+    def __new_generation(self):
+        """ hide all drawn pixels (canvas colors and older generations stay , mask hides them) """
+        self.__box = None
+        self.__generation+=1
+        if(self.__generation>np.iinfo(self.__mask.dtype).max):
+            ## generation number wraps around once in 65535 clears , old pixels must not show again
+            self.__mask.fill(0)
+            self.__generation = 1
+
+    def clear(self):
+        """ drop all strokes in constant time """
+        self.store.clear()
+        self.__new_generation()
+
+    def undo(self):
+        """ remove last stroke and rasterize remaining strokes again """
+        points = self.store.pop_stroke()
+        if(points is None):
+            return None
+        self.__new_generation()
+        for stroke in self.store.strokes():
+            self.__draw_segment(stroke-self.__origin)
+        return points
+
+    def export(self):
+        """ list of (n,2) point arrays , one per stroke (frame coordinates) """
+        return [stroke.copy() for stroke in self.store.strokes()]
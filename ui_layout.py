@@ -0,0 +1,70 @@
+## UI geometry in normalized frame coordinates (x / width , y / height) ,
+## values are the original 640x480 pixel positions so default layout looks same at 640x480
+REFERENCE_SIZE = (640,480)
+
+
+def _normalize(rect,reference=REFERENCE_SIZE):
+    (x1,y1),(x2,y2) = rect
+    w,h = reference
+    return ((x1/w,y1/h),(x2/w,y2/h))
+
+
+LAYOUT = {
+    "home_options":{name:_normalize(rect) for name,rect in [("home",[[550,20],[620,90]]),
+                                                            ("face",[[550,100],[620,170]]),
+                                                            ("hands",[[550,180],[620,250]]),
+                                                            ("draw",[[550,260],[620,330]]),
+                                                            ("filters",[[550,340],[620,430]])]},
+    "filters_options":{name:_normalize(rect) for name,rect in [("home",[[550,20],[620,90]]),
+                                                               ("hsv",[[550,100],[620,150]]),
+                                                               ("hls",[[550,160],[620,210]]),
+                                                               ("gray",[[550,220],[620,270]]),
+                                                               ("cartoon",[[550,280],[620,330]]),
+                                                               ("histeq",[[550,340],[620,390]]),
+                                                               ("blurry",[[550,400],[620,450]])]},
+    "draw_area":_normalize([[20,50],[300,250]]),
+    "clear_button":_normalize([[20,320],[120,400]]),
+    ## status / info panels , text inside them is placed relative to panel corner and scaled by text_scale
+    "draw_status":_normalize([[10,410],[150,450]]),
+    "filter_label":_normalize([[20,20],[180,60]]),
+    "face_panel":_normalize([[20,30],[230,200]]),
+    "fingers_panel":_normalize([[3,3],[180,40]]),
+    "fps_label":_normalize([[400,20],[600,60]]),
+}
+
+
+class UiLayout:
+    """ Convert normalized UI rectangles of LAYOUT into pixel rectangles [[x1,y1],[x2,y2]] of a frame size
+
+        pixel rectangles are computed once per frame size and cached , so UI follows capture
+        resolution (HD input , lower internal resolution) without per frame cost
+
+        layout :- {name : rect or {option : rect}} in normalized coordinates - dict
+    """
+    def __init__(self,layout=None):
+        self.layout = LAYOUT if layout is None else layout
+        self.__cache = {}
+
+    def rect(self,name,shape):
+        """ pixel rectangle (or dict of option rectangles) of layout item name for frame shape """
+        key = (name,shape[0],shape[1])
+        rect = self.__cache.get(key)
+        if(rect is None):
+            item = self.layout[name]
+            if(isinstance(item,dict)):
+                rect = {option:self.__to_pixels(value,shape) for option,value in item.items()}
+            else:
+                rect = self.__to_pixels(item,shape)
+            self.__cache[key] = rect
+        return rect
+
+    @staticmethod
+    def __to_pixels(rect,shape):
+        h,w = shape[:2]
+        (x1,y1),(x2,y2) = rect
+        return [[int(round(x1*w)),int(round(y1*h))],[int(round(x2*w)),int(round(y2*h))]]
+
+    @staticmethod
+    def text_scale(shape):
+        """ font scale factor of frame relative to 640x480 reference """
+        return shape[0]/REFERENCE_SIZE[1]
@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+
+
+class OverlayLayer:
+    """ Static UI chrome (boxes , labels) rendered once into BGR image + mask
+
+        drawing calls are mirrored into mask , blend() copies only masked pixels
+        inside bounding box of mask with one vectorized op
+    """
+    def __init__(self,shape):
+        h,w = shape[:2]
+        self.image = np.zeros((h,w,3),dtype=np.uint8)
+        self.mask = np.zeros((h,w),dtype=np.uint8)
+        self.__box = None
+        self.__where = None
+
+    def rectangle(self,pt1,pt2,color,thickness=1):
+        cv2.rectangle(self.image,tuple(pt1),tuple(pt2),color,thickness)
+        cv2.rectangle(self.mask,tuple(pt1),tuple(pt2),255,thickness)
+
+    def text(self,text,org,font_scale,color,thickness=1,font=cv2.FONT_HERSHEY_SIMPLEX):
+        cv2.putText(self.image,text,tuple(org),font,font_scale,color,thickness)
+        cv2.putText(self.mask,text,tuple(org),font,font_scale,255,thickness)
+
+    def finalize(self):
+        """ compute bounding box of drawn pixels , called once after rendering """
+        ys,xs = np.nonzero(self.mask.any(axis=1))[0],np.nonzero(self.mask.any(axis=0))[0]
+        if(not len(ys)):
+            self.__box = None
+            return
+        y1,y2,x1,x2 = ys[0],ys[-1]+1,xs[0],xs[-1]+1
+        self.__box = (y1,y2,x1,x2)
+        self.image = np.ascontiguousarray(self.image[y1:y2,x1:x2])
+        self.__where = (self.mask[y1:y2,x1:x2]>0)[...,None]
+
+    def blend(self,image):
+        if(self.__box is None):
+            return image
+        y1,y2,x1,x2 = self.__box
+        np.copyto(image[y1:y2,x1:x2],self.image,where=self.__where)
+        return image
+
+
+class OverlayCompositor:
+    """ Cache of static UI layers keyed by (layer name , frame size)
+
+        apply(image , name , render_fn) renders layer with render_fn(layer) only first time
+        and blends cached layer afterwards. invalidate() drops cached layers
+        (SmartVisionApp calls it when operation mode changes)
+    """
+    def __init__(self):
+        self.__layers = {}
+        self.renders = 0
+
+    def apply(self,image,name,render_fn):
+        key = (name,image.shape[:2])
+        layer = self.__layers.get(key)
+        if(layer is None):
+            layer = OverlayLayer(image.shape)
+            render_fn(layer)
+            layer.finalize()
+            self.__layers[key] = layer
+            self.renders+=1
+        return layer.blend(image)
+
+    def invalidate(self,name=None):
+        """ drop all cached layers , or only layers with given name """
+        if(name is None):
+            self.__layers = {}
+        else:
+            self.__layers = {key:layer for key,layer in self.__layers.items() if key[0]!=name}
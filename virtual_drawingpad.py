@@ -2,21 +2,43 @@ import cv2
 # from hand_landmark_detection import HandDetector
 from time import time
 import numpy as np
-from scipy.spatial.distance import euclidean
+from ui_overlay import OverlayCompositor
+from stroke_canvas import StrokeCanvas
+from landmark_filter import Hysteresis
+from hand_features import HandFeatures
+from ui_layout import UiLayout
+from vision_events import PinchStartEvent, PinchEndEvent
 
 class VirtualDrawBoard:
     """
         VirtualDrawBoard module responsible to manage all tasks of virtual drawing
         - draw lines of points
         - check user point exists inside drawing box boundry
+
+        strokes are rasterized incrementally into StrokeCanvas (one segment per new point)
+        and kept in array backed StrokeStore , so they can be undone and exported
+
+        drawing area and clear button come from UiLayout (normalized coordinates) , when frame size
+        changes canvas is rebuilt for new size and existing strokes are rescaled
+
+        events :- EventBus , pinch start / end events are emitted into it (None disables events)
+        pinch_threshold , pinch_margin :- index to middle finger tip distance in palm sizes (0.4 is ~36 px at
+                                          typical 90 px palm , touching tips are ~0.2 , V spread ~0.6) , features are
+                                          taken from hand_detector cache (see hand_features.py)
     """
-    def __init__(self,hand_detector):
+    def __init__(self,hand_detector=None,overlay=None,pinch_threshold=0.4,pinch_margin=0.05,layout=None,events=None):
         self.hand_detector = hand_detector
-        self.__draw_area = [[20,50],[300,250]]
-        self.__clear_button = [[20,320],[120,400]]
-        self.__history = [[]]
+        self.events = events
+        self.__overlay = overlay if overlay is not None else OverlayCompositor()
+        self.__layout = layout if layout is not None else UiLayout()
+        ## pinch starts below threshold-margin and ends above threshold+margin
+        self.__pinch = Hysteresis(on=pinch_threshold-pinch_margin,off=pinch_threshold+pinch_margin,above=False)
+        self.__frame_shape = None
+        self.__canvas = None
+        self.__set_frame_shape((480,640))
         self.__drawing_flag = 0
         self.__prev_drawing_flag = 0
+        self.__tap_point = None
         self.__Text = "Off"
 
     
@@ -33,39 +55,90 @@ class VirtualDrawBoard:
         else:
             return False
 
+    def __set_frame_shape(self,shape):
+        """ rebuild drawing geometry and canvas for frame size , keep strokes (rescaled) """
+        shape = tuple(shape[:2])
+        if(shape==self.__frame_shape):
+            return
+        self.__draw_area = self.__layout.rect("draw_area",shape)
+        self.__clear_button = self.__layout.rect("clear_button",shape)
+        self.__status_box = self.__layout.rect("draw_status",shape)
+        self.__text_scale = UiLayout.text_scale(shape)
+        old_canvas,old_shape = self.__canvas,self.__frame_shape
+        self.__canvas = StrokeCanvas(self.__draw_area,color=(255,255,0),thickness=2)
+        self.__frame_shape = shape
+        if(old_canvas is not None):
+            factor = np.array([shape[1]/old_shape[1],shape[0]/old_shape[0]])
+            for stroke in old_canvas.export():
+                for i,point in enumerate(np.rint(stroke*factor).astype(np.int32)):
+                    self.__canvas.add_point(point,new_stroke=i==0)
+
     def draw(self,image,points):
+        self.__set_frame_shape(image.shape)
         if(len(points)):
             tap_point = points[8]
             option_point = points[12]
+            self.__tap_point = tap_point
             self.__prev_drawing_flag = self.__drawing_flag
             self.__drawing_flag = 0
-            d = euclidean(option_point,tap_point)
-            if(d < 30):
+            features = self.hand_detector.features(points) if self.hand_detector is not None else HandFeatures(points)
+            d = features.distances[0,8,12]
+            if(self.__pinch.update(d)):
                 self.__drawing_flag = 1
                 self.__Text  = "ON"
+            if(self.events is not None and self.__drawing_flag!=self.__prev_drawing_flag):
+                self.events.emit((PinchStartEvent if self.__drawing_flag else PinchEndEvent)(tap_point))
             status = VirtualDrawBoard.check_inside_rectangle(self.__draw_area,tap_point)
             if(int(status) and self.__drawing_flag):
-                if(self.__prev_drawing_flag):
-                    self.__history[-1].append(tap_point)
-                else:
-                    self.__history.append([tap_point])
+                self.__canvas.add_point(tap_point,new_stroke=not self.__prev_drawing_flag)
             if(VirtualDrawBoard.check_inside_rectangle(self.__clear_button,option_point) and VirtualDrawBoard.check_inside_rectangle(self.__clear_button,tap_point)):
-                self.__history = [[]]
+                self.clear()
 
-            cv2.rectangle(image,[10,410],[150,450],(255,255,255),-1)
-            cv2.putText(image,f"Drawing : {self.__Text}",(20,430),cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0) if self.__drawing_flag else (0,0,255), 2) 
+            self.__overlay.apply(image,"draw_status",self.__render_status_box)
+            scale = self.__text_scale
+            (x1,y1),_ = self.__status_box
+            cv2.putText(image,f"Drawing : {self.__Text}",(x1+int(10*scale),y1+int(20*scale)),cv2.FONT_HERSHEY_SIMPLEX, 0.5*scale, (0,255,0) if self.__drawing_flag else (0,0,255), max(1,int(round(2*scale))))
+        else:
+            ## hand lost , pinch can't continue
+            self.end_pinch()
         
         
         
-        if(len(self.__history)>1): 
-            for hist_points in self.__history:
-                cv2.polylines(image,[np.array(hist_points).reshape(-1,1,2)],False,(255,255,0),2)
-            
-        cv2.rectangle(image,self.__draw_area[0],self.__draw_area[1],(255, 0, 0),2)
-        cv2.putText(image,f"Drawing Area",(self.__draw_area[0][0]+20,self.__draw_area[0][1]-5),cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
-
-        cv2.rectangle(image,self.__clear_button[0],self.__clear_button[1],(0,55,0),2)
-        cv2.putText(image,f"Clear Button",(self.__clear_button[0][0]+10,self.__clear_button[0][1]-5),cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,55,0), 1)
+        self.__canvas.composite(image)
+        self.__overlay.apply(image,"draw_board",self.__render_board)
+
+    def end_pinch(self):
+        """ stop active pinch (hand lost or draw mode left) , emit PinchEndEvent at last tap point """
+        self.__pinch.reset()
+        if(self.__drawing_flag and self.events is not None):
+            self.events.emit(PinchEndEvent(self.__tap_point))
+        self.__drawing_flag = 0
+        self.__prev_drawing_flag = 0
+
+    def clear(self):
+        """ remove all strokes """
+        self.__canvas.clear()
+
+    def undo(self):
+        """ remove last stroke , return its points (None when there is no stroke) """
+        return self.__canvas.undo()
+
+    def export_strokes(self):
+        """ return list of (n,2) int32 arrays , one per stroke """
+        return self.__canvas.export()
+
+    def __render_status_box(self,layer):
+        """ static background of drawing status text (rendered once by OverlayCompositor) """
+        layer.rectangle(self.__status_box[0],self.__status_box[1],(255,255,255),-1)
+
+    def __render_board(self,layer):
+        """ static drawing area box , clear button and labels (rendered once by OverlayCompositor) """
+        scale = self.__text_scale
+        layer.rectangle(self.__draw_area[0],self.__draw_area[1],(255, 0, 0),2)
+        layer.text(f"Drawing Area",(self.__draw_area[0][0]+int(20*scale),self.__draw_area[0][1]-int(5*scale)),0.5*scale,(255, 0, 0),max(1,int(scale)))
+
+        layer.rectangle(self.__clear_button[0],self.__clear_button[1],(0,55,0),2)
+        layer.text(f"Clear Button",(self.__clear_button[0][0]+int(10*scale),self.__clear_button[0][1]-int(5*scale)),0.5*scale,(0,55,0),max(1,int(scale)))
 
 
 ### driver code to test single module
@@ -0,0 +1,165 @@
+import asyncio
+import traceback
+from time import time
+
+
+class VisionEvent:
+    """ Base of events emitted on state transitions (not every frame)
+
+        type :- event type name used for filtering subscriptions - str
+        timestamp :- time of emission - float
+        frame :- number of processed frame (set by EventBus) - int
+    """
+    __slots__ = ("timestamp","frame")
+    type = "event"
+
+    def __init__(self):
+        self.timestamp = time()
+        self.frame = None
+
+    def as_dict(self):
+        values = {"type":self.type}
+        for cls in type(self).__mro__:
+            for name in getattr(cls,"__slots__",()):
+                values[name] = getattr(self,name)
+        return values
+
+    def __repr__(self):
+        fields = " , ".join(f"{name}={value!r}" for name,value in self.as_dict().items() if name!="type")
+        return f"{type(self).__name__}({fields})"
+
+
+class BlinkEvent(VisionEvent):
+    __slots__ = ("face_id","blink_count")
+    type = "blink"
+
+    def __init__(self,face_id,blink_count):
+        super().__init__()
+        self.face_id = face_id
+        self.blink_count = blink_count
+
+
+class EmotionChangedEvent(VisionEvent):
+    __slots__ = ("face_id","previous","emotion")
+    type = "emotion_changed"
+
+    def __init__(self,face_id,previous,emotion):
+        super().__init__()
+        self.face_id = face_id
+        self.previous = previous
+        self.emotion = emotion
+
+
+class _PinchEvent(VisionEvent):
+    __slots__ = ("point",)
+
+    def __init__(self,point):
+        super().__init__()
+        self.point = point
+
+
+class PinchStartEvent(_PinchEvent):
+    __slots__ = ()
+    type = "pinch_start"
+
+
+class PinchEndEvent(_PinchEvent):
+    __slots__ = ()
+    type = "pinch_end"
+
+
+class FingerCountChangedEvent(VisionEvent):
+    __slots__ = ("previous","count","fingers_up")
+    type = "finger_count_changed"
+
+    def __init__(self,previous,count,fingers_up):
+        super().__init__()
+        self.previous = previous
+        self.count = count
+        self.fingers_up = fingers_up
+
+
+class ModeChangedEvent(VisionEvent):
+    __slots__ = ("previous","mode")
+    type = "mode_changed"
+
+    def __init__(self,previous,mode):
+        super().__init__()
+        self.previous = previous
+        self.mode = mode
+
+
+class ReadyEvent(VisionEvent):
+    __slots__ = ("startup_time",)
+    type = "ready"
+
+    def __init__(self,startup_time):
+        super().__init__()
+        self.startup_time = startup_time
+
+
+class _AsyncSubscription:
+    """ bounded asyncio queue fed from any thread , oldest event is dropped when consumer falls behind """
+    def __init__(self,loop,maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def __put(self,event):
+        if(self.queue.full()):
+            self.queue.get_nowait()
+            self.dropped+=1
+        self.queue.put_nowait(event)
+
+    def __call__(self,event):
+        try:
+            self.loop.call_soon_threadsafe(self.__put,event)
+        except RuntimeError:
+            ## event loop of consumer is closed
+            pass
+
+
+class EventBus:
+    """ Deliver VisionEvents to subscribers
+
+        callbacks :- bus.subscribe(fn , types=["blink"]) , fn(event) runs on thread which emits
+                     (processing thread of SmartVisionApp) , exception of callback does not stop app
+        async :- async for event in bus.stream(types=["pinch_start","pinch_end"]): ...
+                 events are passed to event loop thread safely , stream keeps at most maxsize events
+
+        frame :- number of current frame , stamped on emitted events (SmartVisionApp sets it) - int
+    """
+    def __init__(self):
+        self.__subscribers = []
+        self.frame = 0
+        self.emitted = 0
+
+    def subscribe(self,callback,types=None):
+        """ register callback for event types (None means all) , return function which unsubscribes """
+        entry = (callback,None if types is None else frozenset(types))
+        self.__subscribers = self.__subscribers+[entry]
+        def unsubscribe():
+            self.__subscribers = [subscriber for subscriber in self.__subscribers if subscriber is not entry]
+        return unsubscribe
+
+    def emit(self,event):
+        if(event.frame is None):
+            event.frame = self.frame
+        self.emitted+=1
+        ## list is replaced (not mutated) on subscribe , iteration is safe while callbacks subscribe
+        for callback,types in self.__subscribers:
+            if(types is None or event.type in types):
+                try:
+                    callback(event)
+                except Exception:
+                    traceback.print_exc()
+
+    async def stream(self,types=None,maxsize=256):
+        """ async iterator of events , subscription ends when iteration stops """
+        subscription = _AsyncSubscription(asyncio.get_running_loop(),maxsize)
+        unsubscribe = self.subscribe(subscription,types)
+        try:
+            while True:
+                yield await subscription.queue.get()
+        finally:
+            unsubscribe()
@@ -0,0 +1,577 @@
+import json
+import struct
+import asyncio
+import cv2
+import numpy as np
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+from filters import FilterApplyer
+from shared_frame_ring import PushLandmarkSource
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+## message : header length (u32 big endian) , payload length (u32) , header , payload
+## header is json object or msgpack map (server answers with codec of request) , payload is frame / image bytes
+_LENGTHS = struct.Struct(">II")
+MAX_HEADER = 1<<20
+MAX_PAYLOAD = 64<<20
+
+
+def encode_message(header,payload=b"",codec="json"):
+    if(codec=="msgpack"):
+        if(msgpack is None):
+            raise RuntimeError("msgpack is not installed (pip install msgpack)")
+        header_bytes = msgpack.packb(header)
+    else:
+        header_bytes = json.dumps(header).encode()
+    return _LENGTHS.pack(len(header_bytes),len(payload))+header_bytes+payload
+
+
+async def read_message(reader):
+    """ read one message , return (header , payload , codec) , raises IncompleteReadError on closed stream """
+    header_length,payload_length = _LENGTHS.unpack(await reader.readexactly(_LENGTHS.size))
+    if(header_length>MAX_HEADER or payload_length>MAX_PAYLOAD):
+        raise ValueError(f"message too large ({header_length} , {payload_length})")
+    header_bytes = await reader.readexactly(header_length)
+    payload = await reader.readexactly(payload_length) if payload_length else b""
+    if(header_bytes[:1]==b"{"):
+        return json.loads(header_bytes),payload,"json"
+    if(msgpack is None):
+        raise ValueError("msgpack message received but msgpack is not installed")
+    header = msgpack.unpackb(header_bytes)
+    if(not isinstance(header,dict)):
+        raise ValueError(f"message header must be a map , got {type(header).__name__}")
+    return header,payload,"msgpack"
+
+
+def decode_frame(header,payload):
+    """ payload -> BGR frame , format "jpeg" (any cv2.imdecode format) or "raw" with header shape """
+    if(header.get("format","jpeg")=="raw"):
+        return np.frombuffer(payload,dtype=np.uint8).reshape(header["shape"]).copy()
+    frame = cv2.imdecode(np.frombuffer(payload,dtype=np.uint8),cv2.IMREAD_COLOR)
+    if(frame is None):
+        raise ValueError("payload is not a decodable image")
+    return frame
+
+
+def encode_image(image,reply_format="jpeg",quality=80):
+    """ return (payload , header fields) of image reply """
+    if(reply_format=="raw"):
+        image = np.ascontiguousarray(image)
+        return image.tobytes(),{"format":"raw","shape":list(image.shape)}
+    ok,data = cv2.imencode(".jpg",image,[cv2.IMWRITE_JPEG_QUALITY,quality])
+    return data.tobytes(),{"format":"jpeg"}
+
+
+class MicroBatcher:
+    """ Collect concurrent requests to one detector into small batches
+
+        batch is closed when max_batch requests are waiting or max_delay seconds passed since its
+        first request , and runs in executor on one free detector instance
+        (mediapipe graphs are not thread safe , every instance runs one batch at a time)
+
+        run_batch :- function(instance , items) -> list of results (same order) - callable
+        instances :- detector instances - list
+    """
+    def __init__(self,run_batch,instances,executor,max_batch=8,max_delay=0.005,max_waiting=64):
+        self.__run_batch = run_batch
+        self.__executor = executor
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.__waiting = asyncio.Queue(maxsize=max_waiting)
+        self.__free = asyncio.Queue()
+        for instance in instances:
+            self.__free.put_nowait(instance)
+        self.__task = None
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        self.__task = asyncio.ensure_future(self.__loop())
+
+    async def stop(self):
+        if(self.__task is not None):
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self,item):
+        """ queue item (waits while queue is full) and return its result """
+        future = asyncio.get_running_loop().create_future()
+        await self.__waiting.put((item,future))
+        return await future
+
+    async def __loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.__waiting.get()]
+            deadline = loop.time()+self.max_delay
+            while len(batch)<self.max_batch:
+                remaining = deadline-loop.time()
+                if(remaining<=0):
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.__waiting.get(),remaining))
+                except asyncio.TimeoutError:
+                    break
+            instance = await self.__free.get()
+            asyncio.ensure_future(self.__run(instance,batch))
+
+    async def __run(self,instance,batch):
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.__executor,self.__run_batch,instance,[item for item,_ in batch])
+            for (_,future),result in zip(batch,results):
+                if(not future.done()):
+                    future.set_result(result)
+        except Exception as error:
+            for _,future in batch:
+                if(not future.done()):
+                    future.set_exception(error)
+        finally:
+            self.__free.put_nowait(instance)
+            self.batches+=1
+            self.items+=len(batch)
+
+    def stats(self):
+        return {"batches":self.batches,"items":self.items,"mean_batch":self.items/self.batches if self.batches else 0.0}
+
+
+def _find_hands_batch(detector,frames):
+    return [detector.find_hands(frame).xy for frame in frames]
+
+
+def _find_faces_batch(analyzer,frames):
+    return [analyzer.get_face_points(frame).xy for frame in frames]
+
+
+class _Session:
+    """ state of one connection : face analysis states , filter buffers and SmartVisionApp
+        (built on first use) , post processing of its requests runs in request order
+    """
+    def __init__(self,max_num_faces,cartoon_quality):
+        self.max_num_faces = max_num_faces
+        self.cartoon_quality = cartoon_quality
+        self.hands = PushLandmarkSource(21)
+        self.faces = PushLandmarkSource(468)
+        self.__hand_detector = None
+        self.__face_analyzer = None
+        self.__filter_applyer = None
+        self.__app = None
+        self.previous = None
+
+    @property
+    def hand_detector(self):
+        if(self.__hand_detector is None):
+            from hand_landmark_detection import HandDetector
+            self.__hand_detector = HandDetector(landmark_source=self.hands)
+        return self.__hand_detector
+
+    @property
+    def face_analyzer(self):
+        if(self.__face_analyzer is None):
+            from face_landmark_detection import FaceAnalyzer
+            self.__face_analyzer = FaceAnalyzer(max_num_faces=self.max_num_faces,landmark_source=self.faces)
+        return self.__face_analyzer
+
+    @property
+    def filter_applyer(self):
+        if(self.__filter_applyer is None):
+            self.__filter_applyer = FilterApplyer(output_buffers=1,cartoon_quality=self.cartoon_quality)
+        return self.__filter_applyer
+
+    @property
+    def app(self):
+        if(self.__app is None):
+            from smart_vision_app import SmartVisionApp
+            from model_registry import ModelRegistry
+            registry = ModelRegistry(idle_timeout=None)
+            registry.register("hands",lambda: self.hand_detector,releasable=False)
+            registry.register("face",lambda: self.face_analyzer,releasable=False)
+            self.__app = SmartVisionApp(model_registry=registry,cartoon_quality=self.cartoon_quality)
+        return self.__app
+
+
+def _face_results(analyzer,with_landmarks):
+    faces = []
+    for state,xy in zip(analyzer.analyze(),analyzer.face_points.xy):
+        face = {"id":state.face_id,"blink_count":state.blink_count,"emotion":state.emotion,"mouth_open":state.mouth_open,
+                "alignment":state.alignment,"align_angle":state.align_angle}
+        if(with_landmarks):
+            face["landmarks"] = xy.tolist()
+        faces.append(face)
+    return faces
+
+
+class VisionServer:
+    """ asyncio TCP service running hand / face analysis , filters and whole SmartVisionApp headless
+
+        request header :- {"id" , "op" : "hands" | "face" | "filter" | "app" | "stats" ,
+                           "format" : "jpeg" | "raw" , "shape" (raw frames) , op parameters}
+                          payload is frame (JPEG or raw BGR bytes)
+        response header :- {"id" , "ok" , "result" | "error"} , payload is image for "filter" and
+                            "app" (with "return_image") ops
+
+        - every connection has at most max_pending requests in flight , further requests are not
+          read from socket (TCP backpressure reaches client)
+        - landmark detection of concurrent requests is micro batched per detector (MicroBatcher)
+        - decoding , detection , filters and post processing run in bounded thread pool (workers)
+        - per connection state (face ids , blink counters , app mode , drawing) lives in _Session ,
+          its post processing runs in request order
+
+        factories :- optional {"hands" / "face" : zero argument function} building shared detectors
+    """
+    def __init__(self,host="127.0.0.1",port=8765,workers=4,detector_instances=1,max_batch=8,max_delay=0.005,
+                 max_pending=4,max_num_faces=1,cartoon_quality="quality",factories=None):
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.max_num_faces = max_num_faces
+        self.cartoon_quality = cartoon_quality
+        self.__executor = ThreadPoolExecutor(max_workers=workers,thread_name_prefix="vision")
+        self.__factories = dict(factories or {})
+        self.__factories.setdefault("hands",self.__default_hands)
+        self.__factories.setdefault("face",lambda: self.__default_face(max_num_faces))
+        self.__instances = detector_instances
+        self.__batch_options = {"max_batch":max_batch,"max_delay":max_delay}
+        self.__batchers = {}
+        self.__server = None
+        self.connections = 0
+        self.requests = 0
+        self.__handlers = set()
+
+    @staticmethod
+    def __default_hands():
+        from hand_landmark_detection import HandDetector
+        ## frames of different clients are independent images
+        return HandDetector(static_image_mode=True,min_detection_confidence=0.7,min_tracking_confidence=0.7)
+
+    @staticmethod
+    def __default_face(max_num_faces):
+        from face_landmark_detection import FaceAnalyzer
+        ## frames of different clients are independent images , no tracking between them
+        return FaceAnalyzer(max_num_faces=max_num_faces,static_image_mode=True)
+
+    def __batcher(self,kind):
+        """ batcher of detector kind , detectors are built on first use """
+        batcher = self.__batchers.get(kind)
+        if(batcher is None):
+            instances = [self.__factories[kind]() for _ in range(self.__instances)]
+            run_batch = _find_hands_batch if kind=="hands" else _find_faces_batch
+            batcher = MicroBatcher(run_batch,instances,self.__executor,**self.__batch_options)
+            batcher.start()
+            self.__batchers[kind] = batcher
+        return batcher
+
+    async def start(self):
+        self.__server = await asyncio.start_server(self.__handle,self.host,self.port)
+        self.port = self.__server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if(self.__server is None):
+            await self.start()
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def stop(self):
+        if(self.__server is not None):
+            self.__server.close()
+            ## open connections are dropped , handlers finish before server is closed
+            handlers = list(self.__handlers)
+            for handler in handlers:
+                handler.cancel()
+            await asyncio.gather(*handlers,return_exceptions=True)
+            await self.__server.wait_closed()
+        for batcher in self.__batchers.values():
+            await batcher.stop()
+        self.__executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self,*exc):
+        await self.stop()
+        return False
+
+    def stats(self):
+        return {"connections":self.connections,"requests":self.requests,
+                "batchers":{kind:batcher.stats() for kind,batcher in self.__batchers.items()}}
+
+    async def __handle(self,reader,writer):
+        self.connections+=1
+        handler = asyncio.current_task()
+        self.__handlers.add(handler)
+        session = _Session(self.max_num_faces,self.cartoon_quality)
+        pending = asyncio.Queue(maxsize=self.max_pending)
+        responder = asyncio.ensure_future(self.__respond(pending,writer))
+        try:
+            try:
+                ## reading stops when responder has stopped (client does not take responses any more)
+                while not responder.done():
+                    try:
+                        header,payload,codec = await read_message(reader)
+                    except (asyncio.IncompleteReadError,ConnectionError):
+                        break
+                    self.requests+=1
+                    task = asyncio.ensure_future(self.__dispatch(session,header,payload))
+                    ## blocks reading next request while max_pending requests are in flight
+                    if(not await self.__enqueue(pending,(header.get("id"),task,codec),responder)):
+                        task.cancel()
+                        break
+            except ValueError as error:
+                ## malformed stream , answer once and drop connection
+                failed = asyncio.get_running_loop().create_future()
+                failed.set_exception(error)
+                await self.__enqueue(pending,(None,failed,"json"),responder)
+            await self.__enqueue(pending,None,responder)
+            await responder
+        except asyncio.CancelledError:
+            ## server stops (stop() cancels handlers) , responses in flight are dropped.
+            ## handler must not end cancelled , asyncio logs that as unhandled exception
+            responder.cancel()
+        finally:
+            self.__handlers.discard(handler)
+            ## requests whose responses can't be sent any more
+            while not pending.empty():
+                entry = pending.get_nowait()
+                if(entry is not None):
+                    entry[1].cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError,asyncio.CancelledError):
+                pass
+
+    @staticmethod
+    async def __enqueue(pending,entry,responder):
+        """ put entry into pending queue (waits while it is full) , return False when responder has stopped """
+        if(responder.done()):
+            return False
+        put = asyncio.ensure_future(pending.put(entry))
+        await asyncio.wait([put,responder],return_when=asyncio.FIRST_COMPLETED)
+        if(put.done()):
+            return True
+        put.cancel()
+        return False
+
+    async def __respond(self,pending,writer):
+        """ send responses in request order , drain() waits while client does not read """
+        while True:
+            entry = await pending.get()
+            if(entry is None):
+                return
+            request_id,task,codec = entry
+            try:
+                result,payload = await task
+                header = {"id":request_id,"ok":True,"result":result}
+            except Exception as error:
+                header,payload = {"id":request_id,"ok":False,"error":f"{type(error).__name__}: {error}"},b""
+            try:
+                writer.write(encode_message(header,payload,codec))
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    async def __dispatch(self,session,header,payload):
+        """ detection of request runs concurrently (batched) , post processing waits for previous
+            request of same connection
+        """
+        loop = asyncio.get_running_loop()
+        previous = session.previous
+        done = loop.create_future()
+        session.previous = done
+        try:
+            op = header.get("op","app")
+            if(op=="stats"):
+                return self.stats(),b""
+            frame = await loop.run_in_executor(self.__executor,decode_frame,header,payload)
+            if(op=="app" and header.get("mode")):
+                ## mode must be known before detection , apply it in request order
+                if(previous is not None):
+                    await asyncio.shield(previous)
+                session.app.set_mode(header["mode"])
+            mode = session.app.mode if op=="app" else None
+            hands = faces = None
+            if(op in ("hands","app")):
+                hands = asyncio.ensure_future(self.__batcher("hands").submit(frame))
+            if(op=="face" or mode=="face"):
+                faces = asyncio.ensure_future(self.__batcher("face").submit(frame))
+            hands = await hands if hands is not None else None
+            faces = await faces if faces is not None else None
+            if(previous is not None):
+                await asyncio.shield(previous)
+            if(op=="app" and faces is None and session.app.mode=="face"):
+                ## earlier request of connection switched app into face mode (gesture) after mode was read
+                faces = await self.__batcher("face").submit(frame)
+            return await loop.run_in_executor(self.__executor,self.__postprocess,session,op,header,frame,hands,faces)
+        finally:
+            done.set_result(None)
+
+    def __postprocess(self,session,op,header,frame,hands,faces):
+        with_landmarks = header.get("landmarks",True)
+        if(hands is not None):
+            session.hands.set(hands)
+        if(faces is not None):
+            session.faces.set(faces)
+        elif(op=="app"):
+            ## no face detection on this frame , gesture switching into face mode must not show stale faces
+            session.faces.set(np.empty((0,468,2),dtype=np.int32))
+        if(op=="hands"):
+            detector = session.hand_detector
+            points = detector.find_hands(frame)
+            num_fingers,fingers_up_flag = detector.count_fingers(points)
+            result = {"count":points.count,"fingers":num_fingers,"fingers_up":[int(flag) for flag in fingers_up_flag],
+                      "gestures":detector.features(points).gestures}
+            if(with_landmarks):
+                result["landmarks"] = points.xy.tolist()
+            return result,b""
+        if(op=="face"):
+            analyzer = session.face_analyzer
+            analyzer.get_face_points(frame)
+            return {"faces":_face_results(analyzer,with_landmarks)},b""
+        if(op=="filter"):
+            image,filter_name = session.filter_applyer.apply_filter(frame,header.get("filter","gray"),as_bgr=True)
+            data,fields = encode_image(image,header.get("reply_format","jpeg"))
+            return dict(fields,filter=filter_name),data
+        if(op=="app"):
+            app = session.app
+            image = app.process(frame)
+            result = {"mode":app.mode,"hands":hands.tolist() if with_landmarks else None}
+            if(app.mode=="face"):
+                result["faces"] = _face_results(session.face_analyzer,with_landmarks)
+            payload = b""
+            if(header.get("return_image")):
+                output = app.filtered_image if app.filtered_image is not None else image
+                payload,fields = encode_image(output,header.get("reply_format","jpeg"))
+                result.update(fields)
+            return result,payload
+        raise ValueError(f"unknown op {op}")
+
+
+class VisionClient:
+    """ asyncio client of VisionServer , requests can be pipelined (responses are matched by id)
+
+        usage:
+            client = await VisionClient.connect(port=8765)
+            result,payload = await client.request("hands",frame)
+    """
+    def __init__(self,reader,writer,codec="json"):
+        self.__reader = reader
+        self.__writer = writer
+        self.codec = codec
+        self.__next_id = 0
+        self.__futures = {}
+        self.__receiver = asyncio.ensure_future(self.__receive())
+
+    @classmethod
+    async def connect(cls,host="127.0.0.1",port=8765,codec="json"):
+        reader,writer = await asyncio.open_connection(host,port)
+        return cls(reader,writer,codec)
+
+    async def __receive(self):
+        try:
+            while True:
+                header,payload,_ = await read_message(self.__reader)
+                future = self.__futures.pop(header.get("id"),None)
+                if(future is not None and not future.done()):
+                    future.set_result((header,payload))
+        except (asyncio.IncompleteReadError,ConnectionError) as error:
+            for future in self.__futures.values():
+                if(not future.done()):
+                    future.set_exception(ConnectionError(f"connection closed : {error}"))
+
+    async def request(self,op,frame=None,frame_format="jpeg",**params):
+        """ send request , return (result dict , payload bytes) , raises RuntimeError on server error """
+        request_id = self.__next_id
+        self.__next_id+=1
+        header = dict(params,id=request_id,op=op,format=frame_format)
+        payload = b""
+        if(frame is not None):
+            if(frame_format=="raw"):
+                payload = np.ascontiguousarray(frame).tobytes()
+                header["shape"] = list(frame.shape)
+            else:
+                payload = cv2.imencode(".jpg",frame)[1].tobytes()
+        future = asyncio.get_running_loop().create_future()
+        self.__futures[request_id] = future
+        self.__writer.write(encode_message(header,payload,self.codec))
+        await self.__writer.drain()
+        response,payload = await future
+        if(not response.get("ok")):
+            raise RuntimeError(response.get("error"))
+        return response["result"],payload
+
+    async def close(self):
+        self.__writer.close()
+        try:
+            await self.__writer.wait_closed()
+        except ConnectionError:
+            pass
+        self.__receiver.cancel()
+
+
+### driver code
+### server : python vision_server.py serve --port 8765
+### client : python vision_server.py client --port 8765 --frames 200 --clients 4 --op hands
+
+async def _run_clients(args):
+    from frame_pipeline import SyntheticSource
+    async def one_client(index):
+        client = await VisionClient.connect(args.host,args.port,args.codec)
+        source = SyntheticSource(num_frames=args.frames)
+        latencies = []
+        in_flight = set()
+        frame = source.read()
+        while frame is not None:
+            async def timed(frame):
+                st = time()
+                await client.request(args.op,frame,args.format,filter=args.filter,landmarks=False)
+                latencies.append(time()-st)
+            in_flight.add(asyncio.ensure_future(timed(frame)))
+            if(len(in_flight)>=args.pipeline):
+                _,in_flight = await asyncio.wait(in_flight,return_when=asyncio.FIRST_COMPLETED)
+            frame = source.read()
+        await asyncio.gather(*in_flight)
+        await client.close()
+        return latencies
+    st = time()
+    results = await asyncio.gather(*[one_client(i) for i in range(args.clients)])
+    elapsed = time()-st
+    latencies = np.concatenate([np.asarray(values) for values in results])
+    print(f"{len(latencies)} requests in {elapsed:.2f} s ({len(latencies)/elapsed:.1f} req/s) ,"
+          f" latency p50 {np.percentile(latencies,50)*1000:.1f} ms p95 {np.percentile(latencies,95)*1000:.1f} ms")
+
+
+if __name__=="__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless analysis service of SmartVisionApp")
+    parser.add_argument("command",choices=["serve","client"])
+    parser.add_argument("--host",default="127.0.0.1")
+    parser.add_argument("--port",type=int,default=8765)
+    parser.add_argument("--workers",type=int,default=4,help="thread pool size")
+    parser.add_argument("--instances",type=int,default=1,help="detector instances per detector kind")
+    parser.add_argument("--max-batch",type=int,default=8)
+    parser.add_argument("--max-pending",type=int,default=4,help="requests in flight per connection")
+    parser.add_argument("--frames",type=int,default=200,help="client : synthetic frames per client")
+    parser.add_argument("--clients",type=int,default=1)
+    parser.add_argument("--pipeline",type=int,default=4,help="client : requests in flight per client")
+    parser.add_argument("--op",default="hands",choices=["hands","face","filter","app"])
+    parser.add_argument("--filter",default="gray")
+    parser.add_argument("--format",default="jpeg",choices=["jpeg","raw"])
+    parser.add_argument("--codec",default="json",choices=["json","msgpack"])
+    args = parser.parse_args()
+    if(args.command=="serve"):
+        server = VisionServer(args.host,args.port,workers=args.workers,detector_instances=args.instances,
+                              max_batch=args.max_batch,max_pending=args.max_pending)
+        print(f"listening on {args.host}:{args.port}")
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            print(server.stats())
+    else:
+        asyncio.run(_run_clients(args))